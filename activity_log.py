@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+ACTIVITY_CAPACITY = 100
+
+# A user counts as online for this long (seconds) after their last login
+ONLINE_WINDOW = 600
+
+
+def activity_time(entry):
+    """Epoch seconds of an activity entry; None if the timestamp is unreadable"""
+    try:
+        return datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00')).timestamp()
+    except (KeyError, AttributeError, ValueError):
+        return None
+
+
+class ActivityLog:
+    """Login/logout activity kept in a fixed-size ring buffer.
+
+    log() appends to a deque(maxlen=capacity) and updates a per-user
+    presence map of (latest action, epoch seconds), so neither logging nor
+    the online users query touches the disk or parses timestamps. Entries
+    are written to the store by a background thread, batched: one save per
+    interval however many entries arrived in it.
+    """
+
+    def __init__(self, store, capacity=ACTIVITY_CAPACITY):
+        self.store = store
+        self.entries = deque(maxlen=capacity)
+        self.presence = {}
+        self.lock = threading.Lock()
+        self.pending = threading.Event()
+        self.writer = None
+        for entry in store.load()[-capacity:]:
+            self.entries.append(entry)
+            self.track(entry, activity_time(entry))
+
+    def track(self, entry, when):
+        username = entry.get('username')
+        if username is None or when is None:
+            return
+        latest = self.presence.get(username)
+        if latest is None or when >= latest[1]:
+            self.presence[username] = (entry.get('action'), when)
+
+    def log(self, username, action):
+        now = time.time()
+        entry = {
+            'username': username,
+            'action': action,  # 'login' or 'logout'
+            'timestamp': datetime.fromtimestamp(now).isoformat()
+        }
+        with self.lock:
+            self.entries.append(entry)
+            self.track(entry, now)
+        self.pending.set()
+        return entry
+
+    def recent(self):
+        """The buffered entries, oldest first"""
+        with self.lock:
+            return list(self.entries)
+
+    def online_users(self, window=ONLINE_WINDOW):
+        """Users whose latest activity is a login within the window"""
+        cutoff = time.time() - window
+        with self.lock:
+            return [username for username, (action, when) in self.presence.items()
+                    if action == 'login' and when >= cutoff]
+
+    def flush(self):
+        if not self.pending.is_set():
+            return
+        self.pending.clear()
+        self.store.save(self.recent())
+
+    def start_writer(self, interval=1.0):
+        """Save pending entries at most every interval seconds in a daemon thread"""
+        def run():
+            while True:
+                self.pending.wait()
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Error saving activity log: {e}")
+
+        if self.writer is None:
+            self.writer = threading.Thread(target=run, name='activity-writer', daemon=True)
+            self.writer.start()
+            atexit.register(self.flush)
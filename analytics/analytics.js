@@ -1,5 +1,35 @@
 // MCCB Analytics Dashboard JavaScript - Clean Version
 
+// Analytics backend (analytics/server.py): mounted in the main app, or the
+// standalone server on port 8001 when the dashboard is opened from disk
+const ANALYTICS_API = window.location.protocol === 'file:' ? 'http://localhost:8001/analytics-api' : '/analytics-api';
+
+// Identifies this browser tab's saves so sessions do not overwrite each other
+function getAnalyticsSessionId() {
+    let sessionId = sessionStorage.getItem('mccbSessionId');
+    if (!sessionId) {
+        sessionId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+        sessionStorage.setItem('mccbSessionId', sessionId);
+    }
+    return sessionId;
+}
+
+function getAnalyticsUserName() {
+    return localStorage.getItem('mccbUserName') || 'Anonymous';
+}
+
+// Poll a backend job (clear, scan, merge) until it has finished
+async function waitForAnalyticsJob(jobId, interval = 500) {
+    while (true) {
+        const response = await fetch(`${ANALYTICS_API}/jobs/${jobId}`);
+        const job = await response.json();
+        if (!job.success || job.finished) {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+}
+
 // ============ GLOBAL FUNCTIONS FOR BUTTON HANDLERS ============
 // These must be defined immediately for onclick handlers to work
 
@@ -2032,11 +2062,12 @@ class MCCBAnalytics {
         // Save data to backend
         const dataToSave = {
             userName: this.userName,
+            sessionId: getAnalyticsSessionId(),
             testData: this.testData,
             timestamp: new Date().toISOString()
         };
         
-        fetch('http://localhost:8001/save-data', {
+        fetch(`${ANALYTICS_API}/save-data`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(dataToSave)
@@ -2177,6 +2208,13 @@ class MCCBAnalytics {
             return;
         }
         
+        // Tests detected from the data folders are merged by the backend from the files themselves
+        const serverFiles = this.serverResultFiles();
+        if (serverFiles) {
+            this.mergeOnServer(serverFiles);
+            return;
+        }
+        
         let mergedXML = `<?xml version="1.0" encoding="UTF-8"?>
 <MCCB_Merged_Results>
     <Session_Info>
@@ -2224,17 +2262,23 @@ class MCCBAnalytics {
         const fileName = `MCCB_Merged_${this.userName || 'Anonymous'}_${timestamp}.xml`;
         
         // Save to backend
-        fetch('http://localhost:8001/save-merged-xml', {
+        fetch(`${ANALYTICS_API}/save-merged-xml`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ xmlContent: mergedXML, fileName: fileName })
         })
         .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                this.showUploadStatus(`Merged XML saved as ${fileName}`, 'success');
-            } else {
+        .then(async data => {
+            if (!data.success) {
                 this.showUploadStatus('Failed to save merged XML', 'error');
+                return;
+            }
+            // The reply only means the write was queued; report how the job ended
+            const job = await waitForAnalyticsJob(data.jobId);
+            if (job.status === 'done' && job.result && job.result.success) {
+                this.showUploadStatus(`Merged XML saved as ${job.result.fileName}`, 'success');
+            } else {
+                this.showUploadStatus(`Failed to save merged XML: ${job.error || (job.result && job.result.message) || job.status}`, 'error');
             }
         })
         .catch(error => {
@@ -2253,6 +2297,42 @@ class MCCBAnalytics {
         });
     }
 
+    serverResultFiles() {
+        // Result file references the backend can read, or null if any test only exists in the browser
+        const files = this.testData.map(test => (test.metadata && test.metadata.folder && test.metadata.filename)
+            ? { folder: test.metadata.folder, filename: test.metadata.filename }
+            : null);
+        return files.every(file => file) ? files : null;
+    }
+
+    async mergeOnServer(files) {
+        const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
+        const fileName = `MCCB_Merged_${this.userName || 'Anonymous'}_${timestamp}.xml`;
+        
+        try {
+            const response = await fetch(`${ANALYTICS_API}/save-merged-xml`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ files: files, fileName: fileName, userName: this.userName || 'Anonymous' })
+            });
+            const data = await response.json();
+            if (!data.success) {
+                throw new Error(data.error || 'Merge could not be started');
+            }
+            
+            this.showUploadStatus(`Merging ${files.length} result files...`, 'info');
+            const job = await waitForAnalyticsJob(data.jobId);
+            if (job.status === 'done' && job.result && job.result.success) {
+                this.showUploadStatus(`Merged XML saved as ${job.result.fileName} (${job.result.merged} files)`, 'success');
+            } else {
+                this.showUploadStatus(`Merge failed: ${job.error || (job.result && job.result.message) || job.status}`, 'error');
+            }
+        } catch (error) {
+            console.log('Server merge failed:', error);
+            this.showUploadStatus('Failed to merge XML files on the server', 'error');
+        }
+    }
+
     clearAllData() {
         if (confirm('Are you sure you want to clear all imported data from the current session?')) {
             this.testData = [];
@@ -2567,11 +2647,11 @@ class MCCBAnalytics {
 
 // ============ INITIALIZATION CODE ============
 
-// Auto-load detected data on page load
+// Auto-load the current user's detected data on page load
 async function loadDetectedData() {
     try {
-        const response = await fetch('detected_data.json');
-        const testData = await response.json();
+        const response = await fetch(`${ANALYTICS_API}/detected-data?user=${encodeURIComponent(getAnalyticsUserName())}`);
+        const { testData } = await response.json();
         
         if (testData && testData.length > 0) {
             window.analytics.testData = testData;
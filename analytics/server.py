@@ -1,228 +1,890 @@
 #!/usr/bin/env python3
+import fnmatch
+import hashlib
+import io
 import os
 import json
-import glob
 import shutil
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote, unquote
+from xml.sax.saxutils import escape, quoteattr
+import xml.etree.ElementTree as ET
 import sys
 
-class DataHandler(BaseHTTPRequestHandler):
-    def do_OPTIONS(self):
-        self.send_response(200)
+ANALYTICS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(ANALYTICS_DIR)
+
+# Shared modules live in the repo root, which is not on the path when this runs standalone
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from json_store import write_json_atomic
+from mccb_results import result_timestamp, top_k
+DETECTED_DATA_DIR = os.path.join(ANALYTICS_DIR, 'detected_data')
+DEFAULT_SESSION = 'default'
+MERGED_TESTS_DIR = 'merged_tests'
+MERGE_CHUNK_SIZE = 64 * 1024
+
+# Folder names under ROOT_DIR whose XML files clear-data-folders removes
+CLEAR_FOLDER_KEYWORDS = ['test', 'data', 'bacs', 'animal', 'trail', 'cpt', 'wms']
+
+# fnmatch patterns for the folders under ROOT_DIR whose latest XML file
+# scan-test-folders reports; ANALYTICS_SCAN_FOLDERS overrides them with a
+# comma-separated list
+SCAN_FOLDER_PATTERNS = [
+    '1.cpt_ip',
+    '2.hvlt_r',
+    '3.bvmt_r',
+    '4.animal_naming',
+    '5.trail_making',
+    '6.letter_number_span',
+    '7.wms_iii_spatial_span',
+    '8.nab_mazes'
+]
+
+# Finished jobs are kept this long (seconds) for polling, at most MAX_FINISHED_JOBS of them
+JOB_RETENTION = 3600
+MAX_FINISHED_JOBS = 200
+JOB_WORKERS = 2
+
+# Where server_fixed.py mounts these routes in the main app
+MOUNT_PREFIX = '/analytics-api'
+
+
+class Job:
+    """A clear, scan or merge run in the background, polled by id"""
+
+    def __init__(self, kind, func, owner=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.func = func
+        self.owner = owner
+        self.status = 'queued'
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def report(self, done, total=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def run(self):
+        if self.cancelled:
+            self.status = 'cancelled'
+        else:
+            self.status = 'running'
+            try:
+                self.result = self.func(self)
+                self.status = 'cancelled' if self.cancelled else 'done'
+            except Exception as e:
+                print(f"Error in {self.kind} job {self.id}: {e}")
+                self.error = str(e)
+                self.status = 'failed'
+        self.finished = time.time()
+
+    def to_dict(self):
+        job = {
+            'jobId': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': {'done': self.done, 'total': self.total},
+            'created': self.created,
+            'finished': self.finished
+        }
+        if self.result is not None:
+            job['result'] = self.result
+        if self.error is not None:
+            job['error'] = self.error
+        return job
+
+
+class JobManager:
+    """Runs jobs on a small thread pool and keeps them around for polling"""
+
+    def __init__(self, workers=JOB_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analytics-job')
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, kind, func, owner=None):
+        job = Job(kind, func, owner)
+        with self.lock:
+            self.prune()
+            self.jobs[job.id] = job
+        self.executor.submit(job.run)
+        return job
+
+    def get(self, job_id, owner=None):
+        """The job with job_id; with an owner, only if it is theirs"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is not None and owner is not None and job.owner != owner:
+            return None
+        return job
+
+    def list(self, owner=None):
+        with self.lock:
+            return [job for job in self.jobs.values() if owner is None or job.owner == owner]
+
+    def cancel(self, job_id, owner=None):
+        job = self.get(job_id, owner)
+        if job is not None and job.finished is None:
+            job.cancel_event.set()
+        return job
+
+    def prune(self):
+        finished = sorted((job for job in self.jobs.values() if job.finished is not None),
+                          key=lambda job: job.finished)
+        cutoff = time.time() - JOB_RETENTION
+        excess = len(finished) - MAX_FINISHED_JOBS
+        for index, job in enumerate(finished):
+            if index < excess or job.finished < cutoff:
+                del self.jobs[job.id]
+
+
+class DetectedDataStore:
+    """Detected test data saved per user and per browser session.
+
+    Every user gets a folder holding one JSON file per session and an
+    index.json naming the latest session, each written atomically. Indexes
+    are loaded at startup and latest datasets are kept in memory once read
+    or saved, so reads do not touch the disk. Saves for one user are
+    serialized; different users never wait on each other.
+    """
+
+    def __init__(self, directory=DETECTED_DATA_DIR):
+        self.directory = directory
+        self.users = {}
+        self.user_locks = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def file_name(self, name):
+        # Dots are escaped too, so '..' or a leading '.' cannot escape the folder
+        return quote(name, safe='').replace('.', '%2E')
+
+    def user_dir(self, user_name):
+        return os.path.join(self.directory, self.file_name(user_name))
+
+    def session_path(self, user_name, session_id):
+        return os.path.join(self.user_dir(user_name), self.file_name(session_id) + '.json')
+
+    def load(self):
+        try:
+            folders = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for folder in folders:
+            if not folder.is_dir():
+                continue
+            try:
+                with open(os.path.join(folder.path, 'index.json')) as f:
+                    index = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping detected data in {folder.path}: {e}")
+                continue
+            self.users[unquote(folder.name)] = {'index': index, 'latest': None}
+
+    def user_lock(self, user_name):
+        with self.lock:
+            lock = self.user_locks.get(user_name)
+            if lock is None:
+                lock = self.user_locks[user_name] = threading.Lock()
+            return lock
+
+    def save(self, user_name, session_id, test_data):
+        """Store test_data as the user's dataset for session_id; returns its index entry"""
+        with self.user_lock(user_name):
+            os.makedirs(self.user_dir(user_name), exist_ok=True)
+            write_json_atomic(self.session_path(user_name, session_id), test_data)
+
+            entry = self.users.get(user_name)
+            index = dict(entry['index']) if entry else {'sessions': {}}
+            index['sessions'] = dict(index['sessions'])
+            index['sessions'][session_id] = {'saved': time.time(), 'testCount': len(test_data)}
+            index['latest'] = session_id
+            write_json_atomic(os.path.join(self.user_dir(user_name), 'index.json'), index)
+            self.users[user_name] = {'index': index, 'latest': test_data}
+            return index['sessions'][session_id]
+
+    def read(self, user_name, session_id=None):
+        """(session id, dataset) for the user's latest or given session, or
+        (None, None); a user or session removed by a concurrent clear() reads
+        as no data"""
+        entry = self.users.get(user_name)
+        if entry is None:
+            return None, None
+        latest_session = entry['index'].get('latest')
+        try:
+            if session_id is None or session_id == latest_session:
+                if entry['latest'] is None and latest_session is not None:
+                    with self.user_lock(user_name):
+                        entry = self.users.get(user_name)
+                        if entry is None:
+                            return None, None
+                        latest_session = entry['index'].get('latest')
+                        if entry['latest'] is None and latest_session is not None:
+                            entry['latest'] = self.read_file(user_name, latest_session)
+                return latest_session, entry['latest']
+            if session_id not in entry['index']['sessions']:
+                return None, None
+            return session_id, self.read_file(user_name, session_id)
+        except FileNotFoundError:
+            return None, None
+
+    def read_file(self, user_name, session_id):
+        with open(self.session_path(user_name, session_id)) as f:
+            return json.load(f)
+
+    def sessions(self, user_name):
+        entry = self.users.get(user_name)
+        return entry['index']['sessions'] if entry else {}
+
+    def clear(self):
+        """Forget every dataset; returns the files removed.
+
+        Each user is cleared under their own lock, so a save in progress
+        finishes first and is then removed instead of outliving the clear.
+        """
+        removed = []
+        for user_name in list(self.users):
+            with self.user_lock(user_name):
+                user_dir = self.user_dir(user_name)
+                try:
+                    names = os.listdir(user_dir)
+                except FileNotFoundError:
+                    names = []
+                removed.extend(os.path.join(user_dir, name) for name in names)
+                shutil.rmtree(user_dir, ignore_errors=True)
+                self.users.pop(user_name, None)
+        return removed
+
+
+def iter_xml_files(dir_path):
+    """Paths of the XML files directly inside dir_path; like glob, hidden
+    entries are skipped"""
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.name.endswith('.xml') and not entry.name.startswith('.') and entry.is_file():
+                    yield entry.path
+    except OSError:
+        return
+
+
+def iter_subdirs(dir_path):
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if not entry.name.startswith('.') and entry.is_dir():
+                    yield entry.path
+    except OSError:
+        return
+
+
+def clear_data_folders(job, root_dir=ROOT_DIR, analytics_dir=ANALYTICS_DIR, store=None):
+    """Delete result XMLs and detected data; same targets as the old inline
+    clear, collected first so progress has a total, cancellable between files"""
+    targets = []
+    seen = set()
+
+    def add(path):
+        if path not in seen:
+            seen.add(path)
+            targets.append(path)
+
+    # */*.xml and */*/*.xml under the root, then the analytics folder itself
+    for folder in iter_subdirs(root_dir):
+        for path in iter_xml_files(folder):
+            add(path)
+        for subfolder in iter_subdirs(folder):
+            for path in iter_xml_files(subfolder):
+                add(path)
+        if job.cancelled:
+            return {'success': False, 'message': 'Cancelled before deleting', 'deleted_files': [],
+                    'deleted_folders': []}
+    for path in iter_xml_files(analytics_dir):
+        add(path)
+    detected_data_path = os.path.join(analytics_dir, 'detected_data.json')
+    if os.path.isfile(detected_data_path):
+        add(detected_data_path)
+
+    job.report(0, len(targets))
+    deleted_files = []
+    deleted_folders = []
+    for index, file_path in enumerate(targets):
+        if job.cancelled:
+            break
+        try:
+            os.remove(file_path)
+            deleted_files.append(file_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error deleting {file_path}: {e}")
+        if index % 256 == 0:
+            job.report(index + 1)
+    job.report(len(deleted_files))
+    if store is not None and not job.cancelled:
+        deleted_files.extend(store.clear())
+
+    # Remove common test data folders left empty by the delete
+    if not job.cancelled:
+        for item_path in iter_subdirs(root_dir):
+            item = os.path.basename(item_path)
+            if any(x in item.lower() for x in CLEAR_FOLDER_KEYWORDS):
+                try:
+                    if not os.listdir(item_path):
+                        shutil.rmtree(item_path)
+                        deleted_folders.append(item_path)
+                except Exception as e:
+                    print(f"Error clearing folder {item_path}: {e}")
+
+    verb = 'Cancelled after deleting' if job.cancelled else 'Successfully deleted'
+    return {
+        'success': not job.cancelled,
+        'message': f'{verb} {len(deleted_files)} files and {len(deleted_folders)} folders',
+        'deleted_files': deleted_files,
+        'deleted_folders': deleted_folders
+    }
+
+
+def scan_folder_patterns():
+    value = os.environ.get('ANALYTICS_SCAN_FOLDERS', '')
+    patterns = [pattern.strip() for pattern in value.split(',') if pattern.strip()]
+    return patterns or SCAN_FOLDER_PATTERNS
+
+
+class LatestFileScanner:
+    """Latest XML file of each test data folder, cached per directory.
+
+    A directory is only listed again when its mtime changes, i.e. when a
+    file is added, removed or renamed; a listing is a single os.scandir
+    pass that stats each XML file once. A file rewritten in place keeps
+    its directory mtime, so it is picked up on the next change there.
+    Every scan carries a version token derived from its result, which
+    clients send back to skip unchanged responses.
+    """
+
+    def __init__(self, root_dir=ROOT_DIR, patterns=None):
+        self.root_dir = root_dir
+        self.patterns = patterns or scan_folder_patterns()
+        self.folder_cache = None
+        self.latest = {}
+        self.lock = threading.Lock()
+
+    def folders(self):
+        """Folder names under root_dir matching the patterns, re-listed when
+        the root changes"""
+        try:
+            root_mtime = os.stat(self.root_dir).st_mtime_ns
+        except OSError:
+            return []
+        if self.folder_cache is None or self.folder_cache[0] != root_mtime:
+            names = sorted(os.path.basename(path) for path in iter_subdirs(self.root_dir))
+            matched = [name for name in names
+                       if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.patterns)]
+            self.folder_cache = (root_mtime, matched)
+        return self.folder_cache[1]
+
+    def latest_file(self, dir_path):
+        """(name, mtime) of the newest XML file in dir_path, or None.
+
+        Newest by the timestamp in the file name, else by mtime, the same
+        order the main server's TestFolderScanner uses, so a copy or checkout
+        that touches mtimes does not change which result is picked.
+        """
+        try:
+            dir_mtime = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            self.latest.pop(dir_path, None)
+            return None
+        cached = self.latest.get(dir_path)
+        if cached is not None and cached[0] == dir_mtime:
+            return cached[1]
+
+        try:
+            with os.scandir(dir_path) as entries:
+                files = [(entry.name, entry.stat().st_mtime) for entry in entries
+                         if entry.name.endswith('.xml') and not entry.name.startswith('.') and entry.is_file()]
+        except OSError:
+            return None
+        latest = top_k(files, 1, key=lambda file: result_timestamp(file[0], file[1]))
+        newest = latest[0] if latest else None
+        self.latest[dir_path] = (dir_mtime, newest)
+        return newest
+
+    def scan(self, job=None, version=None):
+        with self.lock:
+            folders = self.folders()
+            if job is not None:
+                job.report(0, len(folders))
+            latest_files = {}
+            for index, folder in enumerate(folders):
+                if job is not None and job.cancelled:
+                    break
+                dir_path = os.path.join(self.root_dir, folder)
+                newest = self.latest_file(dir_path)
+                if newest is not None:
+                    latest_files[folder] = {
+                        'path': os.path.join(dir_path, newest[0]),
+                        'name': newest[0],
+                        'modified': newest[1]
+                    }
+                if job is not None:
+                    job.report(index + 1)
+
+        token = hashlib.sha1(json.dumps(latest_files, sort_keys=True).encode()).hexdigest()[:16]
+        if version == token:
+            return {'success': True, 'unchanged': True, 'version': token}
+        return {
+            'success': True,
+            'message': f'Found latest XML file from {len(latest_files)} test data folders',
+            'totalFiles': len(latest_files),
+            'latestFiles': latest_files,
+            'version': token
+        }
+
+
+def scan_test_folders(job, scanner, version=None):
+    """Latest XML file of each local test data folder"""
+    return scanner.scan(job, version)
+
+
+def merged_file_name(file_name):
+    """Plain .xml file name inside merged_tests/, whatever the client sent"""
+    file_name = os.path.basename(file_name or '') or 'merged_results.xml'
+    if not file_name.endswith('.xml'):
+        file_name += '.xml'
+    return file_name
+
+
+def save_merged_xml(job, xml_content, file_name, root_dir=ROOT_DIR):
+    """Write a merged XML document built by the browser to merged_tests/"""
+    merged_tests_dir = os.path.join(root_dir, MERGED_TESTS_DIR)
+    os.makedirs(merged_tests_dir, exist_ok=True)
+
+    job.report(0, 1)
+    file_path = os.path.join(merged_tests_dir, file_name)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(xml_content)
+    job.report(1)
+
+    return {
+        'success': True,
+        'message': f'Merged XML file saved: {file_name}',
+        'filePath': file_path,
+        'fileName': file_name,
+        'downloadUrl': f'/merged-xml/{quote(file_name)}'
+    }
+
+
+class XMLCopyTarget:
+    """ElementTree parser target that writes the parse events back out as XML.
+
+    Fed chunk by chunk, it copies a document to out without building a
+    tree. Namespace prefixes are kept; the XML declaration is dropped so
+    the copy can be nested in another document.
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.namespaces = []
+        self.pending_ns = []
+
+    def qname(self, name):
+        if not name.startswith('{'):
+            return name
+        uri, local = name[1:].split('}', 1)
+        for mapping in reversed(self.namespaces):
+            if uri in mapping:
+                prefix = mapping[uri]
+                return f'{prefix}:{local}' if prefix else local
+        return local
+
+    def start_ns(self, prefix, uri):
+        self.pending_ns.append((prefix, uri))
+
+    def start(self, tag, attrs):
+        self.namespaces.append({uri: prefix for prefix, uri in self.pending_ns})
+        parts = [self.qname(tag)]
+        for prefix, uri in self.pending_ns:
+            parts.append(f'xmlns:{prefix}={quoteattr(uri)}' if prefix else f'xmlns={quoteattr(uri)}')
+        self.pending_ns = []
+        for name, value in attrs.items():
+            parts.append(f'{self.qname(name)}={quoteattr(value)}')
+        self.out.write('<' + ' '.join(parts) + '>')
+
+    def end(self, tag):
+        self.out.write(f'</{self.qname(tag)}>')
+        self.namespaces.pop()
+
+    def data(self, text):
+        self.out.write(escape(text))
+
+    def comment(self, text):
+        self.out.write(f'<!--{text}-->')
+
+    def close(self):
+        pass
+
+
+def copy_xml(path, out, chunk_size=MERGE_CHUNK_SIZE):
+    """Stream the document at path into out, minus its XML declaration"""
+    parser = ET.XMLParser(target=XMLCopyTarget(out))
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            parser.feed(chunk)
+    parser.close()
+
+
+def resolve_result_file(reference, root_dir=ROOT_DIR):
+    """Path of a result file named by a merge request.
+
+    A reference is a path relative to root_dir, or a {folder, filename}
+    dict as in the detected test metadata (looked up in folder and
+    folder/data). Anything resolving outside root_dir is refused.
+    """
+    if isinstance(reference, dict):
+        folder = reference.get('folder', '')
+        filename = reference.get('filename', '')
+        candidates = [os.path.join(folder, filename), os.path.join(folder, 'data', filename)]
+    else:
+        candidates = [str(reference)]
+
+    root = os.path.realpath(root_dir)
+    for candidate in candidates:
+        path = os.path.realpath(os.path.join(root, candidate))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f'Not inside the data folders: {candidate}')
+        if not path.endswith('.xml'):
+            raise ValueError(f'Not an XML result file: {candidate}')
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError(f'Result file not found: {candidates[0]}')
+
+
+def merge_result_files(job, references, file_name, user_name='Anonymous', root_dir=ROOT_DIR):
+    """Merge result files on disk into merged_tests/file_name.
+
+    Sources are streamed one at a time through XMLCopyTarget, so memory
+    is bounded by the largest single result file. Unreadable sources are
+    skipped and listed; the output is written under a temporary name and
+    renamed into place only once complete.
+    """
+    merged_tests_dir = os.path.join(root_dir, MERGED_TESTS_DIR)
+    os.makedirs(merged_tests_dir, exist_ok=True)
+    file_path = os.path.join(merged_tests_dir, file_name)
+    tmp_path = file_path + '.part'
+
+    job.report(0, len(references))
+    merged = 0
+    skipped = []
+    root = os.path.realpath(root_dir)
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            out.write('<?xml version="1.0" encoding="UTF-8"?>\n<MCCB_Merged_Results>\n'
+                      '    <Session_Info>\n'
+                      f'        <User_Name>{escape(user_name)}</User_Name>\n'
+                      f'        <Merge_Date>{time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}</Merge_Date>\n'
+                      f'        <Total_Tests>{len(references)}</Total_Tests>\n'
+                      '    </Session_Info>\n    <Test_Results>')
+            for index, reference in enumerate(references):
+                if job.cancelled:
+                    break
+                try:
+                    source_path = resolve_result_file(reference, root_dir)
+                    # One source at a time, so a parse error leaves no partial element
+                    buffer = io.StringIO()
+                    copy_xml(source_path, buffer)
+                except Exception as e:
+                    skipped.append({'file': reference, 'error': str(e)})
+                else:
+                    out.write(f'\n        <Source_File path={quoteattr(os.path.relpath(source_path, root))}>')
+                    out.write(buffer.getvalue())
+                    out.write('</Source_File>')
+                    merged += 1
+                job.report(index + 1)
+            out.write('\n    </Test_Results>\n    <Merge_Summary>\n'
+                      f'        <Merged>{merged}</Merged>\n'
+                      f'        <Skipped>{len(skipped)}</Skipped>\n'
+                      '    </Merge_Summary>\n</MCCB_Merged_Results>\n')
+        if job.cancelled:
+            os.remove(tmp_path)
+            return {'success': False, 'message': f'Merge cancelled after {merged} files',
+                    'merged': merged, 'skipped': skipped}
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return {
+        'success': True,
+        'message': f'Merged {merged} result files into {file_name}',
+        'filePath': file_path,
+        'fileName': file_name,
+        'downloadUrl': f'/merged-xml/{quote(file_name)}',
+        'merged': merged,
+        'skipped': skipped
+    }
+
+
+class AnalyticsRoutes:
+    """The analytics endpoints, mixed into a request handler.
+
+    DataHandler serves them on their own port; server_fixed.py mounts them
+    under MOUNT_PREFIX in the main app. Paths are accepted with or without
+    the prefix, so analytics.js uses the same URLs against either. State
+    lives on the class, so every request in a process shares one job pool,
+    detected data store and folder scanner. It is built by create_state()
+    in the serving process only; importing this module creates nothing.
+
+    The scanner is separate from the main app's TestFolderScanner: it lists
+    the numbered analytics folders (SCAN_FOLDER_PATTERNS), not tests/, and
+    only reports file names, so there is nothing to score. The job pool runs
+    I/O-bound clear, scan and merge jobs on threads; ParseExecutor's process
+    pool is for CPU-bound XML scoring.
+    """
+
+    analytics_dir = ANALYTICS_DIR
+    root_dir = ROOT_DIR
+    jobs = None
+    detected_data = None
+    scanner = None
+
+    @classmethod
+    def create_state(cls):
+        """Create the shared job pool, detected data store and scanner"""
+        cls.jobs = JobManager()
+        cls.detected_data = DetectedDataStore()
+        cls.scanner = LatestFileScanner()
+
+    def send_cors_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-    
-    def do_POST(self):
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length)
-        
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
+
+    def send_json(self, response, status=200):
+        body = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_cors_headers()
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        
-        if self.path == '/clear-data-folders':
-            response = self.clear_data_folders()
-        elif self.path == '/save-data':
+        self.wfile.write(body)
+
+    def analytics_user(self, requested):
+        """User the data is stored under; the standalone server trusts the client"""
+        return requested or 'Anonymous'
+
+    def analytics_is_admin(self):
+        """Whether the caller may clear data and see everyone's jobs; the
+        standalone server runs locally for one user"""
+        return True
+
+    def job_owner(self):
+        """Owner to filter jobs by, None for admins who see them all"""
+        return None if self.analytics_is_admin() else self.analytics_user(None)
+
+    def analytics_path(self, path):
+        if path.startswith(MOUNT_PREFIX + '/'):
+            return path[len(MOUNT_PREFIX):]
+        return path
+
+    def handle_analytics_get(self, path, query):
+        """Serve an analytics GET; returns False for unknown paths"""
+        path = self.analytics_path(path)
+        if path == '/detected-data':
+            self.send_detected_data(parse_qs(query))
+        elif path == '/scan-test-folders':
+            # Listings are cached, so this is answered inline rather than as a job
+            version = parse_qs(query).get('version', [None])[0]
+            self.send_json(self.scanner.scan(version=version))
+        elif path.startswith('/merged-xml/'):
+            self.send_merged_xml(unquote(path[len('/merged-xml/'):]))
+        elif path == '/jobs':
+            jobs = self.jobs.list(self.job_owner())
+            self.send_json({'success': True, 'jobs': [job.to_dict() for job in jobs]})
+        elif path.startswith('/jobs/'):
+            job = self.jobs.get(path[len('/jobs/'):], self.job_owner())
+            if job is None:
+                self.send_json({'success': False, 'error': 'Unknown job'}, 404)
+            else:
+                self.send_json(dict(job.to_dict(), success=True))
+        else:
+            return False
+        return True
+
+    def handle_analytics_post(self, path, post_data):
+        """Serve an analytics POST; returns False for unknown paths"""
+        path = self.analytics_path(path)
+        if path == '/clear-data-folders':
+            # Deletes every user's result files and detected data
+            if not self.analytics_is_admin():
+                self.send_json({'success': False, 'error': 'Only admins can clear data'}, 403)
+                return True
+            response = self.start_job('clear', lambda job: clear_data_folders(
+                job, self.root_dir, self.analytics_dir, self.detected_data))
+        elif path == '/save-data':
             response = self.save_data_with_user(post_data)
-        elif self.path == '/save-merged-xml':
-            response = self.save_merged_xml(post_data)
-        elif self.path == '/scan-test-folders':
-            response = self.scan_test_folders()
+        elif path == '/save-merged-xml':
+            response = self.start_merge(post_data)
+        elif path == '/scan-test-folders':
+            version = self.posted_version(post_data)
+            response = self.start_job('scan', lambda job: scan_test_folders(job, self.scanner, version))
+        elif path.startswith('/jobs/') and path.endswith('/cancel'):
+            job = self.jobs.cancel(path[len('/jobs/'):-len('/cancel')], self.job_owner())
+            if job is None:
+                response = {'success': False, 'error': 'Unknown job'}
+            else:
+                response = dict(job.to_dict(), success=True)
         else:
-            response = {'success': False, 'error': 'Unknown endpoint'}
-        
-        self.wfile.write(json.dumps(response).encode())
-    
+            return False
+        self.send_json(response)
+        return True
+
+    def start_job(self, kind, func):
+        job = self.jobs.submit(kind, func, self.analytics_user(None))
+        return {
+            'success': True,
+            'message': f'{kind.capitalize()} job started',
+            'jobId': job.id,
+            'status': job.status,
+            'statusUrl': f'/jobs/{job.id}'
+        }
+
+    def posted_version(self, post_data):
+        """Version token the client already has, if it sent one"""
+        try:
+            return json.loads(post_data.decode('utf-8') or '{}').get('version')
+        except (ValueError, AttributeError):
+            return None
+
     def save_data_with_user(self, post_data):
         try:
             data = json.loads(post_data.decode('utf-8'))
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            detected_data_path = os.path.join(current_dir, 'detected_data.json')
-            
+
             # Add user information to each test record
-            user_name = data.get('userName', 'Anonymous')
-            for test in data.get('testData', []):
+            user_name = self.analytics_user(data.get('userName'))
+            session_id = data.get('sessionId') or DEFAULT_SESSION
+            test_data = data.get('testData', [])
+            for test in test_data:
                 test['userName'] = user_name
-            
-            # Save to detected_data.json
-            with open(detected_data_path, 'w') as f:
-                json.dump(data.get('testData', []), f, indent=2)
-            
+
+            self.detected_data.save(user_name, session_id, test_data)
+
             return {
                 'success': True,
                 'message': f'Data saved for user: {user_name}',
                 'user': user_name,
-                'testCount': len(data.get('testData', []))
+                'session': session_id,
+                'testCount': len(test_data)
             }
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
-    
-    def save_merged_xml(self, post_data):
+
+    def send_detected_data(self, query):
+        """The caller's latest (or requested session's) detected test data"""
+        user_name = self.analytics_user(query.get('user', [''])[0])
+        session_id = query.get('session', [None])[0]
         try:
-            data = json.loads(post_data.decode('utf-8'))
-            xml_content = data.get('xmlContent', '')
-            file_name = data.get('fileName', 'merged_results.xml')
-            
-            # Get paths
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            parent_dir = os.path.dirname(current_dir)
-            merged_tests_dir = os.path.join(parent_dir, 'merged_tests')
-            
-            # Ensure merged_tests directory exists
-            os.makedirs(merged_tests_dir, exist_ok=True)
-            
-            # Save the merged XML file
-            file_path = os.path.join(merged_tests_dir, file_name)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(xml_content)
-            
-            return {
-                'success': True,
-                'message': f'Merged XML file saved: {file_name}',
-                'filePath': file_path,
-                'fileName': file_name
-            }
+            session_id, test_data = self.detected_data.read(user_name, session_id)
         except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
-    
-    def scan_test_folders(self):
+            self.send_json({'success': False, 'error': str(e)}, 500)
+            return
+        self.send_json({
+            'success': True,
+            'user': user_name,
+            'session': session_id,
+            'sessions': self.detected_data.sessions(user_name),
+            'testData': test_data or []
+        })
+
+    def start_merge(self, post_data):
+        """Merge result files on the server when given references, otherwise
+        save the document the browser built"""
         try:
-            # Get current directory and look for test data folders
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            parent_dir = os.path.dirname(current_dir)
-            
-            # Define test folder patterns (only local test data folders)
-            test_folder_patterns = [
-                os.path.join(parent_dir, '1.cpt_ip', '*.xml'),
-                os.path.join(parent_dir, '2.hvlt_r', '*.xml'),
-                os.path.join(parent_dir, '3.bvmt_r', '*.xml'),
-                os.path.join(parent_dir, '4.animal_naming', '*.xml'),
-                os.path.join(parent_dir, '5.trail_making', '*.xml'),
-                os.path.join(parent_dir, '6.letter_number_span', '*.xml'),
-                os.path.join(parent_dir, '7.wms_iii_spatial_span', '*.xml'),
-                os.path.join(parent_dir, '8.nab_mazes', '*.xml')
-            ]
-            
-            latest_files = {}
-            folder_info = {}
-            
-            # Scan each test folder and find the latest file
-            for pattern in test_folder_patterns:
-                folder_files = []
-                for file_path in glob.glob(pattern):
-                    if os.path.isfile(file_path):
-                        folder_files.append(file_path)
-                
-                # Get the latest file for this folder
-                if folder_files:
-                    latest_file = max(folder_files, key=os.path.getmtime)
-                    folder_name = os.path.basename(os.path.dirname(latest_file))
-                    latest_files[folder_name] = {
-                        'path': latest_file,
-                        'name': os.path.basename(latest_file),
-                        'modified': os.path.getmtime(latest_file)
-                    }
-                    folder_info[folder_name] = [os.path.basename(latest_file)]
-            
-            return {
-                'success': True,
-                'message': f'Found latest XML file from {len(latest_files)} test data folders',
-                'totalFiles': len(latest_files),
-                'folders': folder_info,
-                'latestFiles': latest_files,
-                'files': [info['name'] for info in latest_files.values()]
-            }
+            data = json.loads(post_data.decode('utf-8'))
+            file_name = merged_file_name(data.get('fileName'))
+            references = data.get('files')
+            if references is not None and not isinstance(references, list):
+                raise ValueError('files must be a list of result file references')
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
-    
-    def clear_data_folders(self):
+        if references is not None:
+            user_name = self.analytics_user(data.get('userName'))
+            return self.start_job('merge', lambda job: merge_result_files(
+                job, references, file_name, user_name, self.root_dir))
+        xml_content = data.get('xmlContent', '')
+        return self.start_job('merge', lambda job: save_merged_xml(
+            job, xml_content, file_name, self.root_dir))
+
+    def send_merged_xml(self, file_name):
+        """Stream a merged file from merged_tests/"""
+        file_path = os.path.join(self.root_dir, MERGED_TESTS_DIR, merged_file_name(file_name))
         try:
-            # Get current directory and look for data folders
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            parent_dir = os.path.dirname(current_dir)
-            
-            # Common data folder patterns
-            data_patterns = [
-                os.path.join(parent_dir, '*', '*.xml'),
-                os.path.join(parent_dir, '*', '*', '*.xml'),
-                os.path.join(current_dir, '*.xml'),
-                os.path.join(current_dir, 'detected_data.json')
-            ]
-            
-            deleted_files = []
-            deleted_folders = []
-            
-            # Clear XML files from all subdirectories
-            for pattern in data_patterns:
-                for file_path in glob.glob(pattern):
-                    try:
-                        if os.path.isfile(file_path):
-                            os.remove(file_path)
-                            deleted_files.append(file_path)
-                    except Exception as e:
-                        print(f"Error deleting {file_path}: {e}")
-            
-            # Clear detected_data.json
-            detected_data_path = os.path.join(current_dir, 'detected_data.json')
-            if os.path.exists(detected_data_path):
-                try:
-                    os.remove(detected_data_path)
-                    deleted_files.append(detected_data_path)
-                except Exception as e:
-                    print(f"Error deleting {detected_data_path}: {e}")
-            
-            # Look for and clear common test data folders
-            for item in os.listdir(parent_dir):
-                item_path = os.path.join(parent_dir, item)
-                if os.path.isdir(item_path) and any(x in item.lower() for x in ['test', 'data', 'bacs', 'animal', 'trail', 'cpt', 'wms']):
-                    try:
-                        # Clear XML files from this directory
-                        xml_files = glob.glob(os.path.join(item_path, '*.xml'))
-                        for xml_file in xml_files:
-                            os.remove(xml_file)
-                            deleted_files.append(xml_file)
-                        
-                        # If directory is now empty, remove it
-                        if not os.listdir(item_path):
-                            shutil.rmtree(item_path)
-                            deleted_folders.append(item_path)
-                    except Exception as e:
-                        print(f"Error clearing folder {item_path}: {e}")
-            
-            return {
-                'success': True,
-                'message': f'Successfully deleted {len(deleted_files)} files and {len(deleted_folders)} folders',
-                'deleted_files': deleted_files,
-                'deleted_folders': deleted_folders
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
-    
+            f = open(file_path, 'rb')
+        except OSError:
+            self.send_json({'success': False, 'error': 'Merged file not found'}, 404)
+            return
+        with f:
+            self.send_response(200)
+            self.send_cors_headers()
+            self.send_header('Content-Type', 'application/xml')
+            self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+            self.send_header('Content-Disposition', f'attachment; filename="{os.path.basename(file_path)}"')
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile, MERGE_CHUNK_SIZE)
+
+
+
+class DataHandler(AnalyticsRoutes, BaseHTTPRequestHandler):
+    """Standalone analytics backend"""
+
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_cors_headers()
+        self.end_headers()
+
+    def do_GET(self):
+        parsed_path = urlparse(self.path)
+        if not self.handle_analytics_get(parsed_path.path, parsed_path.query):
+            self.send_json({'success': False, 'error': 'Unknown endpoint'}, 404)
+
+    def do_POST(self):
+        content_length = int(self.headers.get('Content-Length', 0))
+        post_data = self.rfile.read(content_length)
+        if not self.handle_analytics_post(urlparse(self.path).path, post_data):
+            self.send_json({'success': False, 'error': 'Unknown endpoint'})
+
     def log_message(self, format, *args):
         # Suppress default logging
         pass
 
 def run_server():
     port = 8001
+    AnalyticsRoutes.create_state()
     server_address = ('', port)
-    httpd = HTTPServer(server_address, DataHandler)
+    httpd = ThreadingHTTPServer(server_address, DataHandler)
     print(f"Backend server running on port {port}")
     print("Data clearing service available at http://localhost:8001")
     httpd.serve_forever()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Activity logging cost per page load (every dashboard/chat load logs a
+'login') and the online users query: the old load/append/slice/rewrite of
+activity.json against the ring-buffer ActivityLog.
+
+Usage: python benchmarks/bench_activity_log.py [page_loads] [users]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from activity_log import ActivityLog
+from json_store import JSONStore
+
+
+def legacy_log_activity(path, username, action):
+    """log_activity before the ring buffer"""
+    try:
+        with open(path) as f:
+            activities = json.load(f)
+    except FileNotFoundError:
+        activities = []
+    activities.append({'username': username, 'action': action, 'timestamp': datetime.now().isoformat()})
+    if len(activities) > 100:
+        activities = activities[-100:]
+    with open(path, 'w') as f:
+        json.dump(activities, f, indent=2)
+
+
+def legacy_online_users(path):
+    with open(path) as f:
+        activities = json.load(f)
+    ten_minutes_ago = datetime.now().timestamp() - 600
+    online_users = set()
+    for activity in reversed(activities):
+        activity_time = datetime.fromisoformat(activity['timestamp'].replace('Z', '+00:00')).timestamp()
+        if activity_time < ten_minutes_ago:
+            continue
+        if activity['action'] == 'login':
+            online_users.add(activity['username'])
+        elif activity['action'] == 'logout' and activity['username'] in online_users:
+            online_users.remove(activity['username'])
+    return online_users
+
+
+def timed(label, func, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f'{label:>34}: {elapsed * 1000000:10.2f} us')
+
+
+def main():
+    page_loads = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as dir_path:
+        legacy_path = os.path.join(dir_path, 'legacy.json')
+        timed('page load, old log_activity', lambda i: legacy_log_activity(legacy_path, f'user{i % users}', 'login'),
+              page_loads)
+        timed('online users, old', lambda i: legacy_online_users(legacy_path), 1000)
+
+        store = JSONStore(os.path.join(dir_path, 'activity.json'))
+        activity_log = ActivityLog(store)
+        activity_log.start_writer(interval=0.5)
+        saves = [0]
+        save = store.save
+
+        def counted_save(data):
+            saves[0] += 1
+            save(data)
+        store.save = counted_save
+
+        start = time.perf_counter()
+        timed('page load, ActivityLog.log', lambda i: activity_log.log(f'user{i % users}', 'login'), page_loads)
+        timed('online users, presence map', lambda i: activity_log.online_users(), 1000)
+        time.sleep(1.2)
+        elapsed = time.perf_counter() - start
+        print(f'{page_loads} entries written with {saves[0]} saves in {elapsed:.2f}s')
+        with open(store.path) as f:
+            assert json.load(f) == activity_log.recent()
+        assert len(activity_log.online_users()) == min(users, page_loads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Issue /save-data requests against the analytics backend while a large
+clear-data-folders job runs, and check that a second clear can be cancelled.
+
+Runs on a throwaway copy of the folder layout; nothing in the repo is touched.
+
+Usage: python benchmarks/bench_analytics_clear.py [files]
+"""
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+spec = importlib.util.spec_from_file_location('analytics_server', os.path.join(ROOT, 'analytics', 'server.py'))
+analytics_server = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(analytics_server)
+
+FOLDERS = ['1.cpt_ip', '2.hvlt_r', 'test_data', 'bacs_results']
+
+
+def populate(root_dir, count):
+    for index, folder in enumerate(FOLDERS):
+        data_dir = os.path.join(root_dir, folder, 'data')
+        os.makedirs(data_dir, exist_ok=True)
+        for i in range(index, count, len(FOLDERS)):
+            # Half the files directly in the folder, half in data/
+            target = data_dir if i % 2 else os.path.join(root_dir, folder)
+            with open(os.path.join(target, f'result_{i:07d}.xml'), 'w') as f:
+                f.write('<r><Results><Percentage>50</Percentage></Results></r>')
+    os.makedirs(os.path.join(root_dir, 'analytics'), exist_ok=True)
+
+
+def request(base_url, path, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(base_url + path, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req) as response:
+        return json.loads(response.read())
+
+
+def wait_for(base_url, job_id):
+    while True:
+        job = request(base_url, f'/jobs/{job_id}')
+        if job['finished'] is not None:
+            return job
+        time.sleep(0.01)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as root_dir:
+        populate(root_dir, count)
+
+        class Handler(analytics_server.DataHandler):
+            pass
+        Handler.root_dir = root_dir
+        Handler.analytics_dir = os.path.join(root_dir, 'analytics')
+        Handler.jobs = analytics_server.JobManager()
+        Handler.detected_data = analytics_server.DetectedDataStore(
+            os.path.join(root_dir, 'analytics', 'detected_data'))
+
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{httpd.server_address[1]}'
+        print(f'{count} result files')
+
+        start = time.perf_counter()
+        job_id = request(base_url, '/clear-data-folders', {})['jobId']
+        started = time.perf_counter() - start
+
+        latencies = []
+        during_clear = 0
+        payload = {'userName': 'bench', 'sessionId': 'clear', 'testData': [{'type': 'HVLT-R', 'score': 20}]}
+        while True:
+            job = request(base_url, f'/jobs/{job_id}')
+            if job['finished'] is not None:
+                break
+            t = time.perf_counter()
+            assert request(base_url, '/save-data', payload)['success']
+            latencies.append(time.perf_counter() - t)
+            during_clear += 1
+        cleared = time.perf_counter() - start
+
+        # The clear wipes the detected data store too; a save after it must be readable
+        request(base_url, '/save-data', payload)
+        saved = request(base_url, '/detected-data?user=bench')
+        assert [test['score'] for test in saved['testData']] == [20], saved
+        print(f'clear job accepted in {started * 1000:.1f} ms, finished in {cleared:.2f}s: '
+              f"{job['result']['message']}")
+        if latencies:
+            print(f'{during_clear} saves during the clear: median {statistics.median(latencies) * 1000:.2f} ms, '
+                  f'max {max(latencies) * 1000:.2f} ms')
+        assert during_clear > 0, 'the clear finished before any save was issued'
+
+        # A second clear, cancelled as soon as it starts deleting
+        populate(root_dir, count)
+        job_id = request(base_url, '/clear-data-folders', {})['jobId']
+        while request(base_url, f'/jobs/{job_id}')['progress']['total'] is None:
+            time.sleep(0.001)
+        request(base_url, f'/jobs/{job_id}/cancel', {})
+        job = wait_for(base_url, job_id)
+        print(f"cancelled clear: status {job['status']}, {job['result']['message']}")
+        assert job['status'] == 'cancelled'
+        httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Latest-file scan of the analytics test folders: the old glob + isfile +
+getmtime scan against LatestFileScanner cold, cached, and after one file
+lands in a folder.
+
+Runs on a throwaway folder layout; nothing in the repo is touched.
+
+Usage: python benchmarks/bench_analytics_scan.py [files_per_folder] [folders]
+"""
+import glob
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+spec = importlib.util.spec_from_file_location('analytics_server', os.path.join(ROOT, 'analytics', 'server.py'))
+analytics_server = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(analytics_server)
+
+
+def populate(root_dir, folders, count):
+    for folder in folders:
+        dir_path = os.path.join(root_dir, folder)
+        os.makedirs(dir_path)
+        for i in range(count):
+            path = os.path.join(dir_path, f'result_{i:06d}.xml')
+            with open(path, 'w') as f:
+                f.write('<r/>')
+            os.utime(path, ns=(i * 1000, i * 1000))
+
+
+def glob_scan(root_dir, folders):
+    """The scan before the cache: glob, isfile, then getmtime inside max()"""
+    latest_files = {}
+    for folder in folders:
+        files = [f for f in glob.glob(os.path.join(root_dir, folder, '*.xml')) if os.path.isfile(f)]
+        if files:
+            latest_file = max(files, key=os.path.getmtime)
+            latest_files[folder] = {'name': os.path.basename(latest_file),
+                                    'modified': os.path.getmtime(latest_file)}
+    return latest_files
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f'{label:>32}: {elapsed * 1000:10.3f} ms')
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    folder_count = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    folders = analytics_server.SCAN_FOLDER_PATTERNS[:folder_count]
+    with tempfile.TemporaryDirectory() as root_dir:
+        populate(root_dir, folders, count)
+        print(f'{len(folders)} folders x {count} result files')
+
+        legacy = timed('glob + getmtime', lambda: glob_scan(root_dir, folders))
+        scanner = analytics_server.LatestFileScanner(root_dir, folders)
+        result = timed('LatestFileScanner, cold', scanner.scan)
+        assert {f: info['name'] for f, info in result['latestFiles'].items()} == \
+            {f: info['name'] for f, info in legacy.items()}
+        timed('LatestFileScanner, cached', scanner.scan, repeat=1000)
+        unchanged = timed('cached, client version current', lambda: scanner.scan(version=result['version']),
+                          repeat=1000)
+        assert unchanged.get('unchanged')
+
+        # A new result in one folder: only that directory is listed again
+        time.sleep(0.01)
+        with open(os.path.join(root_dir, folders[0], 'new_result.xml'), 'w') as f:
+            f.write('<r/>')
+        updated = timed('one folder changed', scanner.scan)
+        assert updated['latestFiles'][folders[0]]['name'] == 'new_result.xml'
+        assert updated['version'] != result['version']
+
+
+if __name__ == '__main__':
+    main()
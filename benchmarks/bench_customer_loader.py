@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Compare startup time and peak RSS of the customer loaders.
+
+Usage: python benchmarks/bench_customer_loader.py [customer_count]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD_SCRIPT = r'''
+import resource
+import sys
+import time
+import xml.etree.ElementTree as ET
+sys.path.insert(0, sys.argv[1])
+from customer_store import iter_customers, load_customer_page
+
+def dom_load(path):
+    # Previous implementation of parse_xml_customers
+    root = ET.parse(path).getroot()
+    customers = []
+    for customer_elem in root.findall('customer'):
+        customers.append({child.tag: child.text for child in customer_elem})
+    return customers
+
+mode, path = sys.argv[2], sys.argv[3]
+start = time.perf_counter()
+if mode == 'dom':
+    count = len(dom_load(path))
+elif mode == 'iterparse':
+    count = sum(1 for _ in iter_customers(path))
+else:
+    count = len(load_customer_page(path, 0, 50))
+elapsed = time.perf_counter() - start
+print(count, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def write_customers(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("<?xml version='1.0' encoding='utf-8'?>\n<customers>")
+        for i in range(1, count + 1):
+            f.write(
+                f'<customer><id>{i}</id><name>Name{i}</name><surname>Surname{i}</surname>'
+                f'<email>user{i}@example.com</email><newsletter>{"true" if i % 2 else "false"}</newsletter>'
+                f'<timestamp>2026-01-02T14:16:43.591594</timestamp></customer>'
+            )
+        f.write('</customers>')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'customers.xml')
+        write_customers(path, count)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"customers.xml: {count} customers, {size_mb:.1f} MB")
+
+        for mode in ('dom', 'iterparse', 'first-page'):
+            output = subprocess.check_output(
+                [sys.executable, '-c', CHILD_SCRIPT, ROOT_DIR, mode, path], text=True
+            )
+            loaded, elapsed, max_rss_kb = output.split()
+            print(f"{mode:>10}: {int(loaded):>9} records  {float(elapsed):7.3f}s  peak RSS {int(max_rss_kb) / 1024:8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Compare bytes per customer for dicts, CustomerRecord and CustomerColumns.
+
+Usage: python benchmarks/bench_customer_records.py [customer_count]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from customer_store import CustomerColumns, CustomerRecord
+
+DOMAINS = ['gmail.com', 'outlook.com', 'yahoo.com', 'web.de', 'example.org']
+
+
+def raw_fields(count):
+    # Strings are built per record, as they would be when parsed from XML
+    for i in range(count):
+        yield (
+            i + 1,
+            f'Name{i}',
+            f'Surname{i}',
+            f'user{i}@{DOMAINS[i % len(DOMAINS)]}',
+            i % 2 == 0,
+            '2026-01-02T14:16:43.591594'[:-1] + str(i % 10)
+        )
+
+
+def build_dicts(count):
+    return [
+        {'id': id, 'name': name, 'surname': surname, 'email': email,
+         'newsletter': newsletter, 'timestamp': timestamp}
+        for id, name, surname, email, newsletter, timestamp in raw_fields(count)
+    ]
+
+
+def build_records(count):
+    return [CustomerRecord(*fields) for fields in raw_fields(count)]
+
+
+def build_columns(count):
+    columns = CustomerColumns()
+    for fields in raw_fields(count):
+        columns.append(CustomerRecord(*fields))
+    return columns
+
+
+def measure(builder, count):
+    tracemalloc.start()
+    records = builder(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(f"{count} customers")
+    for name, builder in (('dict', build_dicts), ('CustomerRecord', build_records), ('CustomerColumns', build_columns)):
+        print(f"{name:>15}: {measure(builder, count):7.1f} bytes/record")
+
+
+if __name__ == '__main__':
+    main()
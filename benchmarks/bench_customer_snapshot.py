@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Compare cold (XML) and warm (snapshot) customer repository startup.
+
+Usage: python benchmarks/bench_customer_snapshot.py [customer_count]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_customer_loader import write_customers
+from customer_store import CustomerRepository
+
+
+def timed_start(path):
+    start = time.perf_counter()
+    repository = CustomerRepository(path)
+    count = len(repository)
+    first_page = repository.page(0, 50)
+    return count, len(first_page), time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'customers.xml')
+        write_customers(path, count)
+        snapshot_path = os.path.join(tmp, 'customers.snapshot')
+
+        loaded, _, cold = timed_start(path)
+        print(f"cold start (parse XML, write snapshot): {loaded} customers in {cold:.3f}s")
+        print(f"snapshot size: {os.path.getsize(snapshot_path) / (1024 * 1024):.1f} MB, "
+              f"XML size: {os.path.getsize(path) / (1024 * 1024):.1f} MB")
+
+        loaded, _, warm = timed_start(path)
+        print(f"warm start (load snapshot):             {loaded} customers in {warm:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
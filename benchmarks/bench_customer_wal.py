@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Registrations/sec with 50 concurrent clients: WAL versus full XML rewrite.
+
+Usage: python benchmarks/bench_customer_wal.py [existing_customers] [registrations_per_client]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_customer_loader import write_customers
+from customer_store import CustomerRepository
+
+CLIENTS = 50
+
+
+def legacy_add(path, lock, data):
+    # Previous add_customer_to_xml: parse, append, rewrite the whole file
+    with lock:
+        tree = ET.parse(path)
+        root = tree.getroot()
+        next_id = max((int(c.findtext('id')) for c in root.findall('customer')), default=0) + 1
+        customer_elem = ET.SubElement(root, 'customer')
+        for key, value in (('id', next_id), ('name', data['name']), ('surname', data['surname']),
+                           ('email', data['email']), ('newsletter', 'false'), ('timestamp', 'now')):
+            ET.SubElement(customer_elem, key).text = str(value)
+        tree.write(path, encoding='utf-8', xml_declaration=True)
+
+
+def run_clients(register, per_client):
+    def client(client_id):
+        for i in range(per_client):
+            register({'name': f'C{client_id}', 'surname': f'R{i}', 'email': f'c{client_id}.{i}@example.com'})
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(CLIENTS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return CLIENTS * per_client / (time.perf_counter() - start)
+
+
+def main():
+    existing = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"{CLIENTS} clients x {per_client} registrations on top of {existing} customers")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'customers.xml')
+        write_customers(path, existing)
+        lock = threading.Lock()
+        rate = run_clients(lambda data: legacy_add(path, lock, data), per_client)
+        print(f"  XML rewrite per registration: {rate:9.1f} registrations/sec")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'customers.xml')
+        write_customers(path, existing)
+        repository = CustomerRepository(path)
+        len(repository)
+        rate = run_clients(
+            lambda data: repository.add(data['name'], data['surname'], data['email'], False, 'now'),
+            per_client
+        )
+        print(f"  WAL with group commit:        {rate:9.1f} registrations/sec")
+
+        start = time.perf_counter()
+        repository.checkpoint()
+        print(f"  checkpoint to XML:            {time.perf_counter() - start:9.3f}s")
+
+        reloaded = CustomerRepository(path)
+        expected = existing + CLIENTS * per_client
+        print(f"  customers after reload:       {len(reloaded)} (expected {expected})")
+
+
+if __name__ == '__main__':
+    main()
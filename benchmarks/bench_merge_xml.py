@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Merge many result files with the streaming server-side merge and with the
+legacy path (whole merged document built as a string, sent as JSON, parsed
+and written), comparing time and peak memory.
+
+Runs on a throwaway folder; nothing in the repo is touched.
+
+Usage: python benchmarks/bench_merge_xml.py [files]
+"""
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+spec = importlib.util.spec_from_file_location('analytics_server', os.path.join(ROOT, 'analytics', 'server.py'))
+analytics_server = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(analytics_server)
+
+RESULT_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<HVLT_R_Results xmlns:m="urn:mccb">
+    <Participant>p{index}</Participant>
+    <m:Trials>{trials}</m:Trials>
+    <Results><Percentage>{score}</Percentage></Results>
+</HVLT_R_Results>
+'''
+
+
+class BenchJob:
+    cancelled = False
+
+    def report(self, done, total=None):
+        pass
+
+
+def populate(root_dir, count):
+    data_dir = os.path.join(root_dir, '2.hvlt_r', 'data')
+    os.makedirs(data_dir)
+    trials = ''.join(f'<Trial n="{n}">word{n}</Trial>' for n in range(40))
+    references = []
+    for i in range(count):
+        name = f'result_{i:06d}.xml'
+        with open(os.path.join(data_dir, name), 'w') as f:
+            f.write(RESULT_XML.format(index=i, trials=trials, score=i % 100))
+        references.append({'folder': '2.hvlt_r', 'filename': name})
+    return references
+
+
+def legacy_merge(root_dir, references, file_name):
+    """What the browser-built merge costs: every file in one string, through JSON"""
+    parts = []
+    for reference in references:
+        with open(analytics_server.resolve_result_file(reference, root_dir), encoding='utf-8') as f:
+            parts.append(f.read())
+    xml_content = '<MCCB_Merged_Results>' + ''.join(parts) + '</MCCB_Merged_Results>'
+    body = json.dumps({'xmlContent': xml_content, 'fileName': file_name})
+    return analytics_server.save_merged_xml(BenchJob(), json.loads(body)['xmlContent'], file_name, root_dir)
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:>10}: {elapsed:7.2f} s, peak {peak / 1024 / 1024:8.2f} MiB')
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as root_dir:
+        references = populate(root_dir, count)
+        size = sum(os.path.getsize(analytics_server.resolve_result_file(r, root_dir)) for r in references)
+        print(f'{count} result files, {size / 1024 / 1024:.1f} MiB')
+
+        result = measure('streaming', lambda: analytics_server.merge_result_files(
+            BenchJob(), references, 'streamed.xml', 'bench', root_dir))
+        assert result['merged'] == count and not result['skipped'], result
+        measure('legacy', lambda: legacy_merge(root_dir, references, 'legacy.xml'))
+
+        merged_path = os.path.join(root_dir, analytics_server.MERGED_TESTS_DIR, 'streamed.xml')
+        print(f'merged file: {os.path.getsize(merged_path) / 1024 / 1024:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
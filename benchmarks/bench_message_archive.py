@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Chat retention: posting into a hot window that rolls into the archive,
+the live messages read, and paging back through the archive with before=.
+Also checks that paging returns every archived message exactly once.
+
+Usage: python benchmarks/bench_message_archive.py [messages] [hot_limit]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_store import JSONStore
+from message_archive import MessageArchive, MessageRetention, archive_page_response
+
+
+def messages(count, days=90):
+    start = datetime(2026, 1, 1)
+    step = timedelta(days=days) / count
+    for i in range(count):
+        yield {'username': f'user{i % 50}', 'content': f'message number {i} ' + 'x' * 60,
+               'timestamp': (start + step * i).isoformat(timespec='microseconds')}
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f'{label:>34}: {elapsed * 1000:10.3f} ms')
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    hot_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    with tempfile.TemporaryDirectory() as dir_path:
+        store = JSONStore(os.path.join(dir_path, 'messages.json'))
+        archive = MessageArchive(os.path.join(dir_path, 'archive'), retention_days=0)
+        retention = MessageRetention(store, archive, hot_limit)
+
+        latencies = []
+        for message in messages(count):
+            start = time.perf_counter()
+            retention.append(message)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f'{count} messages posted, hot window {hot_limit}')
+        print(f"{'post message':>34}: median {latencies[len(latencies) // 2] * 1000:.3f} ms, "
+              f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f} ms, max {latencies[-1] * 1000:.1f} ms')
+
+        timed('live messages load', store.load, repeat=1000)
+        hot_size = os.path.getsize(store.path)
+        archive_size = sum(os.path.getsize(os.path.join(archive.directory, name))
+                           for name in os.listdir(archive.directory))
+        raw_size = len(json.dumps(list(messages(count))))
+        print(f'live file {hot_size / 1024:.0f} KiB, archive {archive_size / 1024 / 1024:.1f} MiB '
+              f'in {len(archive.segments)} segments (raw JSON {raw_size / 1024 / 1024:.1f} MiB)')
+
+        timed('newest archive page', lambda: archive_page_response(archive, None, 50), repeat=100)
+        middle = list(messages(count))[count // 2]['timestamp']
+        timed('archive page, before= midpoint', lambda: archive_page_response(archive, middle, 50), repeat=100)
+        cold = MessageArchive(archive.directory)
+        timed('cold archive page, before= midpoint', lambda: archive_page_response(cold, middle, 50))
+
+        # Page through the whole archive, 500 at a time
+        seen = []
+        before = None
+        start = time.perf_counter()
+        while True:
+            page = archive_page_response(archive, before, 500)
+            seen[:0] = page['messages']
+            if not page['hasMore']:
+                break
+            before = page['before']
+        print(f"{'full archive walk':>34}: {(time.perf_counter() - start):10.2f} s")
+        expected = list(messages(count))[:archive.count()]
+        assert seen == expected, (len(seen), len(expected))
+        assert archive.count() + len(store.load()) == count
+
+
+if __name__ == '__main__':
+    main()
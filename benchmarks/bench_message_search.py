@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Query latency of MessageSearchIndex over a large chat history: common
+and rare words, AND of two words, prefixes, phrases, a private-only search
+and a deep page, plus the worst cases for visibility and positions: common
+words searched by a user with no private messages, and a phrase of the
+three most common words. Words follow a Zipf-like distribution over a
+synthetic vocabulary; one message in ten is private.
+
+Usage: python benchmarks/bench_message_search.py [messages]
+"""
+import os
+import random
+import statistics
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_search import MessageSearchIndex, message_fields, tokenize
+
+USERS = 200
+VOCABULARY = 20000
+
+
+def word(rank):
+    # Distinct, pronounceable-ish words; low ranks are the common ones
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    text = ''
+    rank += 1
+    while rank:
+        rank, digit = divmod(rank, 26)
+        text += letters[digit]
+    return text + 'o'
+
+
+def populate(index, count):
+    """Index count synthetic messages; returns them oldest first"""
+    rng = random.Random(50)
+    weights = [1 / (rank + 1) for rank in range(VOCABULARY)]
+    ranks = rng.choices(range(VOCABULARY), weights, k=count * 8)
+    public = []
+    private = {}
+    messages = []
+    for i in range(count):
+        content = ' '.join(word(rank) for rank in ranks[i * 8:(i + 1) * 8])
+        if i % 1000 == 0:
+            content += ' quarterly budget review'
+        sender = f'user{i % USERS}'
+        message = {'username': sender, 'content': content, 'timestamp': f'{i:012d}'}
+        if i % 10 == 0:
+            message = {'from_user': sender, 'to_user': f'user{(i + 1) % USERS}',
+                       'content': content, 'timestamp': f'{i:012d}'}
+            if i % 100 == 0:
+                message['originalname'] = f'report_{i}.pdf'
+            private.setdefault(f'{sender}_{message["to_user"]}', []).append(message)
+        else:
+            public.append(message)
+        messages.append(message)
+    index.build(public, private)
+    return messages
+
+
+def timed(label, index, query, repeat=50, user='user1', **kwargs):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hits, has_more = index.search(query, user, **kwargs)
+        times.append(time.perf_counter() - start)
+    print(f'{label:>28} {query!r:>28}: median {statistics.median(times) * 1000:7.3f} ms, '
+          f'max {max(times) * 1000:7.3f} ms, {len(hits)} hits{" +" if has_more else ""}')
+    return times
+
+
+def contains_phrase(tokens, words):
+    return any(tokens[start:start + len(words)] == words for start in range(len(tokens)))
+
+
+def visible(message, user, scope):
+    if 'from_user' not in message:
+        return scope != 'private'
+    return scope != 'public' and user in (message['from_user'], message['to_user'])
+
+
+def scan(messages, query, user, scope='all'):
+    """Brute-force answer for the few query shapes checked below"""
+    hits = []
+    for message in reversed(messages):
+        if not visible(message, user, scope):
+            continue
+        fields = [tokenize(field) for field in message_fields(message)]
+        words = [token for tokens in fields for token in tokens]
+        if query.startswith('"'):
+            matched = any(contains_phrase(tokens, tokenize(query)) for tokens in fields)
+        elif query.endswith('*'):
+            matched = any(token.startswith(query[:-1]) for token in words)
+        else:
+            matched = all(term in words for term in tokenize(query))
+        if matched:
+            hits.append(message)
+    return hits
+
+
+def check(index, messages, queries):
+    for query in queries:
+        for scope in ('all', 'private'):
+            expected = scan(messages, query, 'user1', scope)
+            hits, has_more = index.search(query, 'user1', offset=5, limit=30, scope=scope)
+            assert [message for message, _ in hits] == expected[5:35], (query, scope)
+            assert has_more == (len(expected) > 35), (query, scope)
+
+
+def verify(directory):
+    index = MessageSearchIndex(os.path.join(directory, 'verify.db'))
+    messages = populate(index, 20000)
+    queries = [word(0), word(900), f'{word(3)} {word(40)}', 'ab*', '"quarterly budget review"',
+               'report', f'"{word(0)} {word(1)}"']
+    check(index, messages, queries)
+    # Expiring archived public messages takes them out of the results
+    removed = index.remove_public_until(f'{9999:012d}')
+    messages = [message for message in messages
+                if 'from_user' in message or message['timestamp'] > f'{9999:012d}']
+    check(index, messages, queries)
+    assert removed == 9000 and index.count() == len(messages)
+    print(f'{len(queries) * 4} queries match a full scan of 20000 messages, '
+          f'before and after removing {removed}')
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    verify(directory)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    path = os.path.join(directory, 'messages.db')
+    index = MessageSearchIndex(path)
+    start = time.perf_counter()
+    populate(index, count)
+    print(f'{count} messages indexed in {time.perf_counter() - start:.1f}s, '
+          f'{os.path.getsize(path) / 1e6:.0f} MB on disk')
+
+    worst = []
+    worst += timed('common word', index, word(0))
+    worst += timed('rare word', index, word(15000))
+    worst += timed('two words', index, f'{word(3)} {word(40)}')
+    worst += timed('prefix', index, 'ab*')
+    worst += timed('phrase', index, '"quarterly budget review"')
+    worst += timed('attachment name', index, 'report')
+    worst += timed('private only', index, word(1), scope='private')
+    worst += timed('page 50', index, word(0), offset=1000)
+    worst += timed('no match', index, 'zzzzzz')
+    worst += timed('private, no private messages', index, word(0), user='nobody', scope='private')
+    worst += timed('all, no private messages', index, word(0), user='nobody')
+    worst += timed('common phrase', index, f'"{word(0)} {word(1)} {word(2)}"')
+    worst += timed('common phrase, private', index, f'"{word(0)} {word(1)} {word(2)}"', scope='private')
+    print(f'slowest query: {max(worst) * 1000:.3f} ms')
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
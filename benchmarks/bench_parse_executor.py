@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Scaling of ParseExecutor over a batch of uploaded result files.
+
+Usage: python benchmarks/bench_parse_executor.py [file_count] [trials_per_file]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mccb_results import ParseExecutor, score_uploaded_file
+
+
+def cpt_ip_export(trials):
+    # CPT-IP style export: a summary plus one element per trial
+    rows = ''.join(
+        f'<Trial><Index>{i}</Index><Stimulus>{i % 10:04d}</Stimulus>'
+        f'<Response>{i % 2}</Response><ReactionTime>{400 + i % 50}</ReactionTime></Trial>'
+        for i in range(trials)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><CPT_IP_Results>'
+        f'<Trials>{rows}</Trials>'
+        '<Summary><Percentage>72.5</Percentage></Summary></CPT_IP_Results>'
+    ).encode('utf-8')
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    trials = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    data = cpt_ip_export(trials)
+    jobs = [(f'cpt_ip_{i:05d}.xml', data) for i in range(file_count)]
+    print(f"{file_count} files of {len(data) / 1024:.1f} KB, {os.cpu_count()} CPUs available")
+
+    baseline = None
+    for workers in (1, 2, 4, 8):
+        executor = ParseExecutor(workers=workers)
+        # Start the pool outside the timed region
+        executor.map(score_uploaded_file, jobs[:executor.min_parallel])
+        start = time.perf_counter()
+        results = executor.map(score_uploaded_file, jobs)
+        elapsed = time.perf_counter() - start
+        executor.shutdown()
+        baseline = baseline or elapsed
+        print(f"{workers} worker(s): {len(results)} results in {elapsed:.2f}s ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
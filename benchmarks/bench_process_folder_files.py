@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Compare the legacy in-memory multipart split with the streaming reader.
+
+Usage: python benchmarks/bench_process_folder_files.py [file_count]
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multipart_stream import read_multipart
+
+BOUNDARY = b'----WebKitFormBoundary7MA4YWxkTrZu0gW'
+SAMPLE_XML = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'tests', 'mccb-002-animal_naming', 'data', 'animal_naming_sample_dev.xml'
+)
+
+
+def build_body(file_count):
+    with open(SAMPLE_XML, 'rb') as f:
+        content = f.read()
+    parts = []
+    for i in range(file_count):
+        parts.append(
+            b'--' + BOUNDARY + b'\r\n'
+            b'Content-Disposition: form-data; name="files[]"; filename="animal_naming_' + str(i).encode() + b'.xml"\r\n'
+            b'Content-Type: text/xml\r\n\r\n' + content + b'\r\n'
+        )
+    parts.append(b'--' + BOUNDARY + b'--\r\n')
+    return b''.join(parts)
+
+
+def legacy_parse(stream, content_length):
+    # Previous handle_process_folder_files parsing loop. The original started
+    # the body at the blank line right after the boundary, which made every
+    # part unparseable; that line is skipped here so both paths parse XML.
+    data = stream.read(content_length)
+    roots = []
+    for part in data.split(b'--' + BOUNDARY):
+        if b'Content-Disposition: form-data' in part and b'filename=' in part:
+            lines = part.split(b'\r\n')[1:]
+            file_content = None
+            for line in lines:
+                if line.strip() == b'' and file_content is None:
+                    content_start = lines.index(line) + 1
+                    file_content = b'\r\n'.join(lines[content_start:])
+                    if file_content.endswith(b'\r\n'):
+                        file_content = file_content[:-2]
+                    break
+            roots.append(ET.fromstring(file_content.decode('utf-8')))
+    return len(roots)
+
+
+class CountingSink:
+    def __init__(self, counter):
+        self.counter = counter
+        self.parser = ET.XMLParser()
+
+    def feed(self, data):
+        self.parser.feed(data)
+
+    def close(self):
+        self.parser.close()
+        self.counter.append(1)
+
+
+def streaming_parse(stream, content_length):
+    counter = []
+    read_multipart(stream, BOUNDARY, content_length, lambda headers: CountingSink(counter))
+    return len(counter)
+
+
+def measure(label, func, body):
+    stream = io.BufferedReader(io.BytesIO(body))
+    # The request body already sits in the socket buffer, so only count parser memory
+    tracemalloc.start()
+    start = time.perf_counter()
+    parsed = func(stream, len(body))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>10}: {parsed} files in {elapsed:.3f}s, peak {peak / (1024 * 1024):.1f} MB")
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    body = build_body(file_count)
+    print(f"request body: {file_count} files, {len(body) / (1024 * 1024):.1f} MB")
+    measure('legacy', legacy_parse, body)
+    measure('streaming', streaming_parse, body)
+
+
+if __name__ == '__main__':
+    main()
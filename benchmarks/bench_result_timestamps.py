@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Microbenchmark of filename timestamp extraction over result filenames.
+
+Usage: python benchmarks/bench_result_timestamps.py [filenames]
+"""
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mccb_results import filename_timestamp, result_timestamp
+
+PREFIXES = ['BACS_Test_Results_', 'animal_naming_', 'trail_making_a_', 'cpt_ip_', 'hvlt_r_']
+
+
+def legacy_get_file_date(filename):
+    # Previous get_file_date: date only, patterns compiled (cached) per call
+    date_patterns = [
+        r'(\d{4}-\d{2}-\d{2})',
+        r'(\d{2}-\d{2}-\d{4})',
+    ]
+    for pattern in date_patterns:
+        match = re.search(pattern, filename)
+        if match:
+            date_str = match.group(1)
+            if len(date_str.split('-')[0]) == 4:
+                return date_str
+            parts = date_str.split('-')
+            return f"{parts[2]}-{parts[0]:0>2}-{parts[1]:0>2}"
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def filenames(count):
+    rng = random.Random(40)
+    start = datetime(2025, 1, 1)
+    names = []
+    for _ in range(count):
+        taken = start + timedelta(milliseconds=rng.randrange(365 * 24 * 3600 * 1000))
+        stamp = taken.isoformat(timespec='milliseconds').replace(':', '-').replace('.', '-')
+        names.append(f'{rng.choice(PREFIXES)}{stamp}Z.xml')
+    return names
+
+
+def timed(label, func, names):
+    start = time.perf_counter()
+    for name in names:
+        func(name)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<36} {elapsed * 1000:8.1f} ms  ({elapsed / len(names) * 1e6:.2f} us/name)')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    names = filenames(count)
+    print(f'{count} filenames')
+    timed('legacy get_file_date (date only)', legacy_get_file_date, names)
+    filename_timestamp.cache_clear()
+    timed('filename_timestamp, cold cache', filename_timestamp, names)
+    timed('filename_timestamp, warm cache', filename_timestamp, names)
+    timed('result_timestamp (path), warm', lambda name: result_timestamp('data/' + name), names)
+
+
+if __name__ == '__main__':
+    main()
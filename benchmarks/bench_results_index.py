@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Time the latest-per-type, history and aggregated history queries of
+ResultsIndex.
+
+Usage: python benchmarks/bench_results_index.py [results] [participants]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mccb_results import TEST_FOLDERS
+from results_index import ResultsIndex
+
+BATCH = 250000
+
+
+def generate(count, participants):
+    rng = random.Random(35)
+    test_types = list(TEST_FOLDERS)
+    start = date(2020, 1, 1)
+    for i in range(count):
+        taken = start + timedelta(days=rng.randrange(2000))
+        yield f'p{rng.randrange(participants)}', {
+            'testType': rng.choice(test_types),
+            'score': round(rng.uniform(0, 100), 2),
+            'date': taken.isoformat(),
+            'filename': f'result_{i}.xml',
+            'fileHash': f'{i:040x}'
+        }
+
+
+def fill(index, count, participants):
+    # Group by participant so add_results can be called the way the server does
+    pending = {}
+    for i, (participant, result) in enumerate(generate(count, participants), 1):
+        pending.setdefault(participant, []).append(result)
+        if i % BATCH == 0:
+            for key, batch in pending.items():
+                index.add_results(batch, key, source='bench')
+            pending = {}
+    for key, batch in pending.items():
+        index.add_results(batch, key, source='bench')
+
+
+def timed(label, func, repeat=20):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f'{label:<40} {elapsed * 1000:8.3f} ms  ({len(result)} rows)')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    participants = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ResultsIndex(os.path.join(tmp, 'results_index.db'))
+        start = time.perf_counter()
+        fill(index, count, participants)
+        print(f'indexed {index.count()} results in {time.perf_counter() - start:.1f}s')
+
+        timed('latest_per_type()', index.latest_per_type)
+        timed('latest_per_type(participant)', lambda: index.latest_per_type('p7'))
+        timed('history(type, participant)',
+              lambda: index.history('HVLT-R', 'p7'))
+        timed('history(type, limit=100)',
+              lambda: index.history('HVLT-R', limit=100))
+        timed('aggregate_history(type, day)',
+              lambda: index.aggregate_history('HVLT-R'))
+        timed('aggregate_history(type, week, 100 pts)',
+              lambda: index.aggregate_history('HVLT-R', bucket='week', max_points=100))
+        timed('aggregate_history(type, participant)',
+              lambda: index.aggregate_history('HVLT-R', 'p7', bucket='week'))
+
+
+if __name__ == '__main__':
+    main()
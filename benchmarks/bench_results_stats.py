@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Time CohortStatistics over a results index: the first load, a cold
+summary, a cached answer and the refresh after a small ingest.
+
+Usage: python benchmarks/bench_results_stats.py [results] [participants]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_results_index import fill, generate
+from results_index import ResultsIndex
+from results_stats import CohortStatistics, numpy
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f'{label:<36} {(time.perf_counter() - start) * 1000:9.2f} ms')
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    participants = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    print(f"bulk sorts and moments use {'numpy' if numpy is not None else 'pure Python'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ResultsIndex(os.path.join(tmp, 'results_index.db'))
+        fill(index, count, participants)
+        print(f'{index.count()} results indexed')
+
+        statistics = CohortStatistics(index)
+        timed('load columns from index', statistics.catch_up)
+        timed('summaries, cold', statistics.summaries)
+        timed('summaries, cached', statistics.summaries)
+        summaries = timed('summaries, other percentiles', lambda: statistics.summaries((1, 50, 99)))
+        timed('participant z-scores', lambda: statistics.participant_z_scores('p7', summaries))
+
+        new_results = [dict(result, fileHash=f'new{i}')
+                       for i, (_, result) in enumerate(generate(100, participants))]
+        index.add_results(new_results, 'p7')
+        timed('summaries after 100 new results', statistics.summaries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Scan endpoint cost with and without the background ResultsWatcher, and
+how long a new result file takes to show up with inotify and with polling.
+
+Usage: python benchmarks/bench_results_watcher.py [files_per_folder]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_scan_test_folders import RESULT_XML, populate, timed
+from mccb_results import TEST_FOLDERS, ParseExecutor, TestFolderScanner
+from results_watcher import InotifyWatch, PollingWatch, ResultsWatcher
+
+
+def drop_latency(base_dir, watcher, name, score):
+    data_dir = os.path.join(base_dir, TEST_FOLDERS['CPT-IP'], 'data')
+    version = watcher.version
+    start = time.perf_counter()
+    with open(os.path.join(data_dir, name), 'w') as f:
+        f.write(RESULT_XML.format(score=score))
+    while watcher.version == version:
+        time.sleep(0.001)
+    return time.perf_counter() - start
+
+
+def main():
+    files_per_folder = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    executor = ParseExecutor(workers=1)
+    with tempfile.TemporaryDirectory() as base_dir:
+        populate(base_dir, files_per_folder)
+        print(f"{len(TEST_FOLDERS)} folders x {files_per_folder} result files")
+
+        scanner = TestFolderScanner(base_dir=base_dir, executor=executor)
+        scanner.scan()
+        timed('scanner.scan, unchanged', scanner.scan, repeat=1000)
+
+        for label, watch in (('inotify', InotifyWatch()), ('polling 0.5s', PollingWatch())):
+            watcher = ResultsWatcher(TestFolderScanner(base_dir=base_dir, executor=executor),
+                                     interval=0.5, watch=watch)
+            watcher.start()
+            while watcher.results is None:
+                time.sleep(0.01)
+            timed(f'watcher.latest ({label})', watcher.latest, repeat=1000)
+            latencies = [drop_latency(base_dir, watcher, f'{label[:4]}_{i}.xml', 50 + i)
+                         for i in range(5)]
+            print(f"{'new file visible after':>28}: {sum(latencies) / len(latencies) * 1000:9.2f} ms"
+                  f" (max {max(latencies) * 1000:.2f} ms)")
+            watcher.stop()
+    executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
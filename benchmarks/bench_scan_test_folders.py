@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Compare the legacy glob/getmtime scan with the cached TestFolderScanner.
+
+Usage: python benchmarks/bench_scan_test_folders.py [files_per_folder]
+"""
+import glob
+import os
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mccb_results import TEST_FOLDERS, TestFolderScanner
+
+RESULT_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<BACS_Test_Results>
+    <Results>
+        <Score>{score}</Score>
+        <Max_Score>150</Max_Score>
+        <Percentage>{score}</Percentage>
+    </Results>
+</BACS_Test_Results>
+'''
+
+
+def extract_score(root, test_name):
+    element = root.find('.//Percentage')
+    return float(element.text) if element is not None else 0
+
+
+def legacy_scan(base_dir):
+    # Previous handle_scan_test_folders body
+    results = []
+    for test_name, folder_path in TEST_FOLDERS.items():
+        folder_path = os.path.join(base_dir, folder_path)
+        xml_files = glob.glob(os.path.join(folder_path, '*.xml'))
+        if not xml_files:
+            xml_files = glob.glob(os.path.join(folder_path, 'data', '*.xml'))
+        latest_file = max(xml_files, key=os.path.getmtime)
+        root = ET.parse(latest_file).getroot()
+        results.append((test_name, extract_score(root, test_name)))
+    return results
+
+
+def populate(base_dir, files_per_folder):
+    for folder_path in TEST_FOLDERS.values():
+        data_dir = os.path.join(base_dir, folder_path, 'data')
+        os.makedirs(data_dir)
+        for i in range(files_per_folder):
+            with open(os.path.join(data_dir, f'result_{i:06d}.xml'), 'w') as f:
+                f.write(RESULT_XML.format(score=i % 100))
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    print(f"{label:>28}: {(time.perf_counter() - start) / repeat * 1000:9.2f} ms/scan")
+
+
+def main():
+    files_per_folder = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as base_dir:
+        populate(base_dir, files_per_folder)
+        print(f"{len(TEST_FOLDERS)} folders x {files_per_folder} result files")
+
+        scanner = TestFolderScanner(base_dir=base_dir)
+        timed('legacy glob + getmtime', lambda: legacy_scan(base_dir), repeat=3)
+        timed('scanner, cold', scanner.scan)
+        timed('scanner, unchanged', scanner.scan, repeat=100)
+
+        data_dir = os.path.join(base_dir, TEST_FOLDERS['CPT-IP'], 'data')
+        with open(os.path.join(data_dir, 'result_new.xml'), 'w') as f:
+            f.write(RESULT_XML.format(score=99))
+        timed('scanner, one new file', scanner.scan)
+
+
+if __name__ == '__main__':
+    main()
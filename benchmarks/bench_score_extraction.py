@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Compare the legacy if/elif score extraction with the rule registry.
+
+Runs both over every sample result file in tests/*/data.
+
+Usage: python benchmarks/bench_score_extraction.py [repeat]
+"""
+import glob
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from mccb_results import determine_test_type, extract_score_from_xml
+
+
+def legacy_extract(root, test_type):
+    # Previous extract_score_from_xml, condensed: every branch ran .// searches
+    try:
+        if test_type in ('BACS Symbol Coding', 'Trail Making', 'CPT-IP', 'HVLT-R', 'BVMT-R'):
+            percentage_elem = root.find('.//Percentage')
+            return float(percentage_elem.text) if percentage_elem is not None else 0
+        if test_type == 'Animal Naming':
+            percentage_elem = root.find('.//Percentage')
+            if percentage_elem is not None:
+                return float(percentage_elem.text)
+        score_elem = root.find('.//Score')
+        max_elem = root.find('.//Max')
+        if score_elem is not None and max_elem is not None:
+            return (float(score_elem.text) / float(max_elem.text)) * 100
+        return 0
+    except Exception:
+        return 0
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    files = sorted(glob.glob(os.path.join(ROOT_DIR, 'tests', '*', 'data', '*.xml')))
+    samples = []
+    for path in files:
+        root = ET.parse(path).getroot()
+        samples.append((root, determine_test_type(os.path.basename(path), root)))
+    print(f"{len(samples)} sample files, {repeat} passes")
+
+    for label, extract in (('legacy', legacy_extract), ('registry', extract_score_from_xml)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for root, test_type in samples:
+                extract(root, test_type)
+        elapsed = time.perf_counter() - start
+        per_file = elapsed / (repeat * len(samples)) * 1e6
+        nonzero = sum(1 for root, test_type in samples if extract(root, test_type))
+        print(f"{label:>9}: {per_file:6.2f} us/file, {nonzero}/{len(samples)} files with a score")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Per-operation latency of the JSON and SQLite storage backends with a
+large chat history: posting a message, a private message and a login
+(user update), reading messages warm, and the first read after a restart.
+The SQLite database is filled with migrate_storage.py from the JSON files.
+
+Usage: python benchmarks/bench_storage_backends.py [messages]
+"""
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_store import JSONStore
+from migrate_storage import migrate
+from sqlite_store import SQLiteGroupedStore, SQLiteListStore, StorageDatabase
+
+USERS = 200
+
+
+def message(i):
+    return {'username': f'user{i % USERS}', 'content': f'message number {i}',
+            'timestamp': f'2026-01-01T00:00:{i % 60:02d}.{i:06d}'}
+
+
+def write_fixtures(data_dir, count):
+    users = [{'username': f'user{i}', 'password': 'p', 'email': f'user{i}@test.com'} for i in range(USERS)]
+    private = {}
+    for i in range(count // 10):
+        private.setdefault(f'user{i % USERS}', []).append(
+            {'from_user': f'user{(i + 1) % USERS}', 'to_user': f'user{i % USERS}',
+             'content': f'private {i}', 'timestamp': f'2026-01-01T00:00:{i % 60:02d}'})
+    for name, data in (('users.json', users), ('private_messages.json', private),
+                       ('messages.json', [message(i) for i in range(count)])):
+        with open(os.path.join(data_dir, name), 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+def timed(label, func, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f'{label:>34}: {elapsed * 1000:10.3f} ms')
+
+
+def login(store):
+    users = store.load()
+    users[0]['lastSeen'] = time.time()
+    store.save(users)
+
+
+def run(label, messages, private, users, repeat):
+    print(label)
+    timed('first messages load', lambda i: messages.load(), 1)
+    private.load()
+    users.load()
+    timed('messages load (warm)', lambda i: messages.load(), 1000)
+    timed('post message', lambda i: messages.append(message(10 ** 9 + i)), repeat)
+    timed('send private message', lambda i: private.append_to(
+        [('user1', {'from_user': 'user2', 'to_user': 'user1', 'content': 'hi'}),
+         ('user2', {'from_user': 'user2', 'to_user': 'user1', 'content': 'hi', 'sent': 'true'})]), repeat)
+    timed('login (users update)', lambda i: login(users), repeat)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_fixtures(data_dir, count)
+        size = os.path.getsize(os.path.join(data_dir, 'messages.json'))
+        print(f'{count} messages, messages.json {size / 1024 / 1024:.0f} MiB')
+
+        run('json', JSONStore(os.path.join(data_dir, 'messages.json')),
+            JSONStore(os.path.join(data_dir, 'private_messages.json'), default=dict),
+            JSONStore(os.path.join(data_dir, 'users.json')), repeat=3)
+        gc.collect()
+
+        db_path = os.path.join(data_dir, 'storage.db')
+        start = time.perf_counter()
+        migrate(data_dir, db_path)
+        print(f'migration: {time.perf_counter() - start:.2f}s')
+        database = StorageDatabase(db_path)
+        run('sqlite', SQLiteListStore(database, 'messages'), SQLiteGroupedStore(database, 'private_messages'),
+            SQLiteListStore(database, 'users'), repeat=200)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Bytes read and time per file: early-stopping extraction versus full parse.
+
+Usage: python benchmarks/bench_streaming_extraction.py [items_per_file] [repeat]
+"""
+import io
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mccb_results import extract_score_from_xml, extract_score_streaming
+
+
+def export(items, summary_first):
+    # BACS-style export with a per-item log, summary before or after it
+    summary = '<Results><Score>68</Score><Max_Score>150</Max_Score><Percentage>45.33%</Percentage></Results>'
+    log = '<Items>' + ''.join(
+        f'<Item id="{i}"><Symbol>{i % 9}</Symbol><Answer>{i % 9}</Answer><Time>0.6</Time></Item>'
+        for i in range(items)
+    ) + '</Items>'
+    body = summary + log if summary_first else log + summary
+    return f'<?xml version="1.0" encoding="UTF-8"?><BACS_Test_Results>{body}</BACS_Test_Results>'.encode()
+
+
+def full_parse(data):
+    root = ET.parse(io.BytesIO(data)).getroot()
+    return extract_score_from_xml(root, 'BACS Symbol Coding'), len(data)
+
+
+def streaming(data):
+    return extract_score_streaming(io.BytesIO(data), 'BACS Symbol Coding')
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    for summary_first in (True, False):
+        data = export(items, summary_first)
+        layout = 'summary first' if summary_first else 'summary last'
+        print(f"{layout}: {len(data) / 1024:.0f} KB, {items} logged items")
+        for label, func in (('full parse', full_parse), ('streaming', streaming)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                score, bytes_read = func(data)
+            per_file = (time.perf_counter() - start) / repeat * 1000
+            print(f"  {label:>10}: score {score}, {bytes_read:>8} bytes read, {per_file:7.3f} ms/file")
+
+
+if __name__ == '__main__':
+    main()
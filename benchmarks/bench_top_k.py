@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Compare the old group-then-sort latest-per-type selection with the
+streaming TopKPerGroup, in time and peak traced memory.
+
+Usage: python benchmarks/bench_top_k.py [results] [keep]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mccb_results import TEST_FOLDERS, TopKPerGroup, result_recency
+
+
+def generate(count):
+    rng = random.Random(39)
+    test_types = list(TEST_FOLDERS)
+    for i in range(count):
+        yield {
+            'testType': rng.choice(test_types),
+            'score': rng.uniform(0, 100),
+            'date': f'2025-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}',
+            'filename': f'result_{i}.xml',
+            'status': 'Processed'
+        }
+
+
+def legacy(results, keep):
+    # Previous handle_process_folder_files grouping, generalized to keep
+    all_results = list(results)
+    results_by_type = {}
+    for result in all_results:
+        results_by_type.setdefault(result['testType'], []).append(result)
+    latest = []
+    for type_results in results_by_type.values():
+        type_results = sorted(type_results, key=lambda r: (r['date'], r['filename']), reverse=True)
+        latest.extend(type_results[:keep])
+    return latest
+
+
+def streaming(results, keep):
+    return TopKPerGroup(keep, result_recency, group=lambda r: r['testType']).extend(results).items()
+
+
+def measure(label, func, results, count, keep):
+    start = time.perf_counter()
+    selected = func(results, keep)
+    elapsed = time.perf_counter() - start
+
+    # Peak memory while consuming a stream, as the upload path does
+    tracemalloc.start()
+    func(generate(count), keep)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'{label:<12} {elapsed * 1000:9.1f} ms  peak {peak / 1e6:8.2f} MB  ({len(selected)} kept)')
+    return selected
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    keep = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    print(f'{count} results, keep {keep} per test type')
+    results = list(generate(count))
+    expected = measure('sort', legacy, results, count, keep)
+    selected = measure('heap', streaming, results, count, keep)
+    assert sorted(r['filename'] for r in expected) == sorted(r['filename'] for r in selected)
+
+
+if __name__ == '__main__':
+    main()
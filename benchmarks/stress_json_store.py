@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Torture test for JSONStore: one thread rewrites a messages file as fast
+as it can while other threads read it, both straight from disk (as another
+process would) and through the store. Every read must parse and must never
+go backwards. The same run with the old open('w') + json.dump writer shows
+what readers used to see.
+
+Usage: python benchmarks/stress_json_store.py [seconds] [messages]
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_store import JSONStore
+
+
+def legacy_save(path, messages):
+    with open(path, 'w') as f:
+        json.dump(messages, f, indent=2)
+
+
+def run(label, path, save, seconds, size, store_readers=2):
+    store = JSONStore(path)
+    messages = [{'username': 'u', 'content': 'x' * 40, 'timestamp': str(i)} for i in range(size)]
+    save(messages)
+    stop = threading.Event()
+    counts = {'writes': 0, 'disk reads': 0, 'store reads': 0, 'partial': 0, 'missing': 0, 'stale': 0}
+
+    def writer():
+        while not stop.is_set():
+            messages.append({'username': 'u', 'content': 'y', 'timestamp': str(len(messages))})
+            save(list(messages))
+            counts['writes'] += 1
+
+    def disk_reader():
+        last = 0
+        while not stop.is_set():
+            try:
+                with open(path) as f:
+                    length = len(json.load(f))
+            except ValueError:
+                counts['partial'] += 1
+                continue
+            except FileNotFoundError:
+                counts['missing'] += 1
+                continue
+            if length < last:
+                counts['stale'] += 1
+            last = length
+            counts['disk reads'] += 1
+
+    def store_reader():
+        last = 0
+        while not stop.is_set():
+            length = len(store.load())
+            if length < last:
+                counts['stale'] += 1
+            last = length
+            counts['store reads'] += 1
+
+    threads = [threading.Thread(target=writer)]
+    threads += [threading.Thread(target=disk_reader) for _ in range(2)]
+    threads += [threading.Thread(target=store_reader) for _ in range(store_readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    print(f'{label:>10}: ' + ', '.join(f'{count} {name}' for name, count in counts.items()))
+    return counts
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    with tempfile.TemporaryDirectory() as dir_path:
+        path = os.path.join(dir_path, 'messages.json')
+        writer_store = JSONStore(path)
+        atomic = run('atomic', path, writer_store.save, seconds, size)
+        assert atomic['partial'] == atomic['missing'] == atomic['stale'] == 0, atomic
+        leftovers = [name for name in os.listdir(dir_path) if name.startswith('.tmp-')]
+        assert not leftovers, leftovers
+
+        os.remove(path)
+        run('open("w")', path, lambda data: legacy_save(path, data), seconds, size, store_readers=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+import json
+import marshal
+import os
+import sys
+import threading
+import time
+from array import array
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+from json_store import fsync_dir
+
+CUSTOMERS_XML = 'customers.xml'
+
+SNAPSHOT_MAGIC = b'CUSTSNAP'
+SNAPSHOT_VERSION = 1
+
+
+class CustomerRecord:
+    """Compact in-memory customer.
+
+    The email is split into local part and domain so the domain string can be
+    interned and shared by every customer of the same provider.
+    """
+    __slots__ = ('id', 'name', 'surname', 'email_local', 'email_domain', 'newsletter', 'timestamp')
+
+    def __init__(self, id, name, surname, email, newsletter, timestamp):
+        self.id = id
+        self.name = name
+        self.surname = surname
+        local, at, domain = email.rpartition('@')
+        if at:
+            self.email_local = local
+            self.email_domain = sys.intern(domain)
+        else:
+            self.email_local = email
+            self.email_domain = ''
+        self.newsletter = bool(newsletter)
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_parts(cls, id, name, surname, email_local, email_domain, newsletter, timestamp):
+        """Build a record from already split fields, skipping email parsing"""
+        record = cls.__new__(cls)
+        record.id = id
+        record.name = name
+        record.surname = surname
+        record.email_local = email_local
+        record.email_domain = email_domain
+        record.newsletter = newsletter
+        record.timestamp = timestamp
+        return record
+
+    @property
+    def email(self):
+        if self.email_domain:
+            return f"{self.email_local}@{self.email_domain}"
+        return self.email_local
+
+    def to_dict(self):
+        """JSON-ready representation used at the response boundary"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'surname': self.surname,
+            'email': self.email,
+            'newsletter': self.newsletter,
+            'timestamp': self.timestamp
+        }
+
+
+def customer_from_element(customer_elem):
+    """Build a CustomerRecord from a <customer> element"""
+    values = {}
+    for child in customer_elem:
+        values[child.tag] = child.text
+
+    id_text = values.get('id')
+    newsletter_text = values.get('newsletter')
+
+    return CustomerRecord(
+        int(id_text) if id_text else 0,
+        values.get('name') or '',
+        values.get('surname') or '',
+        values.get('email') or '',
+        (newsletter_text or 'false').lower() == 'true' if 'newsletter' in values else False,
+        values.get('timestamp') or ''
+    )
+
+
+def iter_customers(path=CUSTOMERS_XML):
+    """Yield customers one at a time without building the whole XML tree.
+
+    Each <customer> element is cleared from the root as soon as it has been
+    read, so memory stays bounded by a single record regardless of file size.
+    """
+    if not os.path.exists(path):
+        return
+
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        # Only direct children of <customers> are records
+        if depth == 1 and elem.tag == 'customer':
+            yield customer_from_element(elem)
+            root.clear()
+
+
+def load_customer_page(path=CUSTOMERS_XML, offset=0, limit=None):
+    """Return one page of customers, stopping the parse once it is filled"""
+    page = []
+    for index, customer in enumerate(iter_customers(path)):
+        if index < offset:
+            continue
+        if limit is not None and len(page) >= limit:
+            break
+        page.append(customer)
+    return page
+
+
+def customer_to_xml(record):
+    """Serialize one record as a <customer> element string"""
+    return (
+        '<customer>'
+        f'<id>{record.id}</id>'
+        f'<name>{escape(record.name)}</name>'
+        f'<surname>{escape(record.surname)}</surname>'
+        f'<email>{escape(record.email)}</email>'
+        f'<newsletter>{"true" if record.newsletter else "false"}</newsletter>'
+        f'<timestamp>{escape(record.timestamp)}</timestamp>'
+        '</customer>'
+    )
+
+
+class CustomerColumns:
+    """Columnar customer storage.
+
+    Each field lives in its own list or array and email domains are stored
+    once in a string pool, so there is no per-customer object overhead.
+    Records are only materialized for the rows a response actually needs.
+    """
+
+    def __init__(self):
+        self.ids = array('q')
+        self.names = []
+        self.surnames = []
+        self.email_locals = []
+        self.domain_ids = array('I')
+        self.domains = []
+        self.domain_index = {}
+        self.newsletters = bytearray()
+        self.timestamps = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, record):
+        domain_id = self.domain_index.get(record.email_domain)
+        if domain_id is None:
+            domain_id = len(self.domains)
+            self.domains.append(record.email_domain)
+            self.domain_index[record.email_domain] = domain_id
+
+        self.ids.append(record.id)
+        self.names.append(record.name)
+        self.surnames.append(record.surname)
+        self.email_locals.append(record.email_local)
+        self.domain_ids.append(domain_id)
+        self.newsletters.append(1 if record.newsletter else 0)
+        self.timestamps.append(record.timestamp)
+
+    def record(self, index):
+        return CustomerRecord.from_parts(
+            self.ids[index],
+            self.names[index],
+            self.surnames[index],
+            self.email_locals[index],
+            self.domains[self.domain_ids[index]],
+            bool(self.newsletters[index]),
+            self.timestamps[index]
+        )
+
+    def records(self, start=0, stop=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [self.record(index) for index in range(start, stop)]
+
+    def matching_indexes(self, query):
+        """Yield row indexes whose name, surname or email contains query"""
+        query = query.lower()
+        domains = [domain.lower() for domain in self.domains]
+        domain_ids = self.domain_ids
+        for index, (name, surname, local) in enumerate(zip(self.names, self.surnames, self.email_locals)):
+            if (query in name.lower()
+                    or query in surname.lower()
+                    or query in f"{local.lower()}@{domains[domain_ids[index]]}"):
+                yield index
+
+    def to_snapshot(self, stop=None):
+        """Columns as marshal-friendly values, optionally only the first stop rows"""
+        stop = len(self) if stop is None else stop
+        return (
+            self.ids[:stop].tobytes(),
+            self.names[:stop],
+            self.surnames[:stop],
+            self.email_locals[:stop],
+            self.domain_ids[:stop].tobytes(),
+            list(self.domains),
+            bytes(self.newsletters[:stop]),
+            self.timestamps[:stop]
+        )
+
+    @classmethod
+    def from_snapshot(cls, data):
+        columns = cls()
+        ids, names, surnames, email_locals, domain_ids, domains, newsletters, timestamps = data
+        columns.ids.frombytes(ids)
+        columns.names = names
+        columns.surnames = surnames
+        columns.email_locals = email_locals
+        columns.domain_ids.frombytes(domain_ids)
+        columns.domains = [sys.intern(domain) for domain in domains]
+        columns.domain_index = {domain: index for index, domain in enumerate(columns.domains)}
+        columns.newsletters = bytearray(newsletters)
+        columns.timestamps = timestamps
+        return columns
+
+
+def snapshot_path_for(path):
+    return os.path.splitext(path)[0] + '.snapshot'
+
+
+def wal_path_for(path):
+    return os.path.splitext(path)[0] + '.wal'
+
+
+def write_snapshot(columns, snapshot_path, stop=None):
+    """Atomically write a binary snapshot of the customer columns"""
+    tmp_path = snapshot_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(bytes([SNAPSHOT_VERSION]))
+        f.write(marshal.dumps(columns.to_snapshot(stop)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, snapshot_path)
+    fsync_dir(os.path.dirname(snapshot_path) or '.')
+
+
+def read_snapshot(snapshot_path):
+    """Load customer columns from a snapshot, or None if it is unusable"""
+    try:
+        with open(snapshot_path, 'rb') as f:
+            header = f.read(len(SNAPSHOT_MAGIC) + 1)
+            if header[:-1] != SNAPSHOT_MAGIC or header[-1] != SNAPSHOT_VERSION:
+                return None
+            return CustomerColumns.from_snapshot(marshal.loads(f.read()))
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        print(f"Ignoring customer snapshot {snapshot_path}: {e}")
+        return None
+
+
+def write_customers_xml(columns, path, stop=None):
+    """Atomically write the first stop rows of columns as customers.xml"""
+    stop = len(columns) if stop is None else stop
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write("<?xml version='1.0' encoding='utf-8'?>\n<customers>")
+        for index in range(stop):
+            f.write(customer_to_xml(columns.record(index)))
+        f.write('</customers>')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(os.path.dirname(path) or '.')
+
+
+def open_wal_for_append(wal_path, chunk_size=65536):
+    """Open the write-ahead log for appending.
+
+    A crash mid-append can leave a torn final line. It is cut back to the
+    last newline first, otherwise the next entry would be glued onto it and
+    dropped on replay together with the torn bytes.
+    """
+    f = open(wal_path, 'a+b')
+    end = f.seek(0, os.SEEK_END)
+    keep = 0
+    position = end
+    while position > 0:
+        start = max(0, position - chunk_size)
+        f.seek(start)
+        newline = f.read(position - start).rfind(b'\n')
+        if newline != -1:
+            keep = start + newline + 1
+            break
+        position = start
+    if keep != end:
+        print(f"Truncating incomplete WAL entry in {wal_path}")
+        f.truncate(keep)
+        f.flush()
+        os.fsync(f.fileno())
+    f.seek(0, os.SEEK_END)
+    return f
+
+
+def read_wal(wal_path):
+    """Yield customer dicts from the write-ahead log.
+
+    A torn final line left by a crash mid-append is skipped.
+    """
+    try:
+        f = open(wal_path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Skipping incomplete WAL entry in {wal_path}")
+
+
+class CustomerWAL:
+    """Append-only customer log with group commit.
+
+    Callers queue entries and wait; a single writer thread writes everything
+    queued since its last pass and fsyncs once, so concurrent registrations
+    share the cost of one fsync.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.cond = threading.Condition()
+        self.file_lock = threading.Lock()
+        self.pending = []
+        self.enqueued = 0
+        self.committed = 0
+        self.failed_range = (1, 0)
+        self.failure = None
+        self.file = open_wal_for_append(path)
+        self.writer = threading.Thread(target=self.run, name='customer-wal', daemon=True)
+        self.writer.start()
+
+    def append(self, entry):
+        """Queue one entry and return its sequence number"""
+        line = (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8')
+        with self.cond:
+            self.pending.append(line)
+            self.enqueued += 1
+            self.cond.notify_all()
+            return self.enqueued
+
+    def wait(self, seq):
+        """Block until entry seq is durable on disk"""
+        with self.cond:
+            while self.committed < seq:
+                self.cond.wait()
+            first, last = self.failed_range
+            if first <= seq <= last:
+                raise IOError(f"Customer WAL write failed: {self.failure}")
+
+    def sync(self):
+        """Wait for everything queued so far and return the durable log size"""
+        with self.cond:
+            seq = self.enqueued
+        self.wait(seq)
+        with self.file_lock:
+            return self.file.tell()
+
+    def has_entries(self):
+        with self.cond:
+            if self.pending:
+                return True
+        with self.file_lock:
+            return self.file.tell() > 0
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                batch = self.pending
+                self.pending = []
+                last = self.enqueued
+
+            failure = None
+            try:
+                with self.file_lock:
+                    self.file.write(b''.join(batch))
+                    self.file.flush()
+                    os.fsync(self.file.fileno())
+            except OSError as e:
+                print(f"Error writing customer WAL: {e}")
+                failure = e
+
+            with self.cond:
+                if failure is not None:
+                    self.failed_range = (last - len(batch) + 1, last)
+                    self.failure = failure
+                self.committed = last
+                self.cond.notify_all()
+
+    def truncate(self, position):
+        """Drop the first position bytes, keeping entries written after them"""
+        with self.file_lock:
+            self.file.flush()
+            with open(self.path, 'rb') as f:
+                f.seek(position)
+                remaining = f.read()
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(remaining)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            fsync_dir(os.path.dirname(self.path) or '.')
+            self.file.close()
+            self.file = open_wal_for_append(self.path)
+
+
+class CustomerRepository:
+    """In-memory customer list shared by the list, search and export paths.
+
+    customers.xml stays the canonical interchange format. A binary snapshot
+    is kept next to it and used on startup whenever it is newer than the XML;
+    otherwise the XML is parsed and the snapshot rebuilt.
+
+    New customers are made durable in a write-ahead log and folded into the
+    XML and snapshot by checkpoint(), normally from a background thread.
+    """
+
+    def __init__(self, path=CUSTOMERS_XML, snapshot_path=None, wal_path=None):
+        self.path = path
+        self.snapshot_path = snapshot_path or snapshot_path_for(path)
+        self.wal_path = wal_path or wal_path_for(path)
+        self.wal = None
+        self.columns = CustomerColumns()
+        self.max_id = 0
+        self.loaded = False
+        self.loaded_mtime = None
+        self.lock = threading.RLock()
+        self.checkpoint_lock = threading.Lock()
+        self.checkpointer = None
+
+    def refresh(self):
+        """Reload records if the XML file changed on disk"""
+        with self.lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = None
+            if not self.loaded or mtime != self.loaded_mtime:
+                columns = self.load_columns(mtime) if mtime is not None else CustomerColumns()
+                max_id = max(columns.ids, default=0)
+                # Replay registrations not yet checkpointed into the XML
+                for entry in read_wal(self.wal_path):
+                    if entry.get('id', 0) > max_id:
+                        columns.append(CustomerRecord(
+                            entry['id'], entry['name'], entry['surname'], entry['email'],
+                            entry['newsletter'], entry['timestamp']
+                        ))
+                        max_id = entry['id']
+                self.columns = columns
+                self.max_id = max_id
+                self.loaded = True
+                self.loaded_mtime = mtime
+
+    def load_columns(self, xml_mtime):
+        try:
+            snapshot_fresh = os.path.getmtime(self.snapshot_path) >= xml_mtime
+        except OSError:
+            snapshot_fresh = False
+
+        if snapshot_fresh:
+            columns = read_snapshot(self.snapshot_path)
+            if columns is not None:
+                return columns
+
+        columns = CustomerColumns()
+        for record in iter_customers(self.path):
+            columns.append(record)
+        try:
+            write_snapshot(columns, self.snapshot_path)
+        except OSError as e:
+            print(f"Error writing customer snapshot: {e}")
+        return columns
+
+    def __len__(self):
+        self.refresh()
+        return len(self.columns)
+
+    def all(self):
+        self.refresh()
+        return self.columns.records()
+
+    def page(self, offset=0, limit=None):
+        if not self.loaded and limit is not None and self.wal_is_empty():
+            # Nothing cached yet: stream just this page instead of the whole file
+            return load_customer_page(self.path, offset, limit)
+        self.refresh()
+        stop = None if limit is None else offset + limit
+        return self.columns.records(offset, stop)
+
+    def wal_is_empty(self):
+        try:
+            return os.path.getsize(self.wal_path) == 0
+        except OSError:
+            return True
+
+    def search(self, query, offset=0, limit=None):
+        self.refresh()
+        matches = []
+        for position, index in enumerate(self.columns.matching_indexes(query)):
+            if position < offset:
+                continue
+            if limit is not None and len(matches) >= limit:
+                break
+            matches.append(self.columns.record(index))
+        return matches
+
+    def next_id(self):
+        self.refresh()
+        return self.max_id + 1
+
+    def open_wal(self):
+        with self.lock:
+            if self.wal is None:
+                self.wal = CustomerWAL(self.wal_path)
+            return self.wal
+
+    def add(self, name, surname, email, newsletter, timestamp):
+        """Append a customer and wait until it is durable in the WAL"""
+        with self.lock:
+            self.open_wal()
+            record = CustomerRecord(self.next_id(), name, surname, email, newsletter, timestamp)
+            # Queue under the lock so WAL order matches id order
+            seq = self.wal.append(record.to_dict())
+            self.columns.append(record)
+            self.max_id = record.id
+        self.wal.wait(seq)
+        return record
+
+    def checkpoint(self):
+        """Fold logged registrations into customers.xml and the snapshot.
+
+        Returns True if anything was written.
+        """
+        with self.checkpoint_lock:
+            with self.lock:
+                self.refresh()
+                if self.wal is None and not os.path.exists(self.wal_path):
+                    return False
+                self.open_wal()
+                if not self.wal.has_entries():
+                    return False
+                columns = self.columns
+                stop = len(columns)
+                position = self.wal.sync()
+
+            # Rows before stop never change, so the export can run unlocked
+            write_customers_xml(columns, self.path, stop)
+            with self.lock:
+                if self.columns is columns:
+                    self.loaded_mtime = os.path.getmtime(self.path)
+            try:
+                write_snapshot(columns, self.snapshot_path, stop)
+            except OSError as e:
+                print(f"Error writing customer snapshot: {e}")
+            self.wal.truncate(position)
+            return True
+
+    def start_checkpointer(self, interval=5.0):
+        """Run checkpoint() every interval seconds in a daemon thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.checkpoint()
+                except Exception as e:
+                    print(f"Error checkpointing customers: {e}")
+
+        if self.checkpointer is None:
+            self.checkpointer = threading.Thread(target=run, name='customer-checkpointer', daemon=True)
+            self.checkpointer.start()
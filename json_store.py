@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+import copy
+import json
+import os
+import tempfile
+import threading
+
+# Read once at import: os.umask can only be queried by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def fsync_dir(dir_path):
+    """Make a rename in dir_path durable; not supported everywhere"""
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_json_atomic(path, data, indent=None):
+    """Write JSON to a temp file in the same folder, fsync, then rename over path.
+
+    Readers see either the old file or the new one, never a truncated or
+    half-written file, and a crash leaves at most a stray .tmp- file. The
+    file keeps its permissions; new files get the usual 0666 minus umask
+    rather than mkstemp's 0600.
+    """
+    dir_path = os.path.dirname(path) or '.'
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+    fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix='.tmp-', suffix='.json')
+    try:
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    fsync_dir(dir_path)
+
+
+class JSONStore:
+    """One JSON file on disk with an in-memory copy for readers.
+
+    load() returns the copy and only parses the file again when its stat
+    signature changed, i.e. when another process replaced it. save() writes
+    atomically and updates the copy. The returned object is shared and must
+    not be changed in place; read-modify-write goes through update(), so a
+    failed save or a concurrent writer never sees a half-applied change.
+    """
+
+    def __init__(self, path, default=list, indent=2):
+        self.path = path
+        self.default = default
+        self.indent = indent
+        self.data = None
+        self.signature = None
+        # Reentrant so update() can load and save while holding it
+        self.lock = threading.RLock()
+
+    def stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def exists(self):
+        return self.stat_signature() is not None
+
+    def load(self):
+        signature = self.stat_signature()
+        with self.lock:
+            if self.data is not None and signature == self.signature:
+                return self.data
+            if signature is None:
+                self.data = self.default()
+                self.signature = None
+                return self.data
+            try:
+                with open(self.path, 'r') as f:
+                    self.data = json.load(f)
+                self.signature = signature
+            except (OSError, ValueError) as e:
+                # Only an outside edit can leave a broken file; keep serving the last good copy
+                print(f"Error loading {self.path}: {e}")
+                if self.data is None:
+                    self.data = self.default()
+            return self.data
+
+    def save(self, data):
+        with self.lock:
+            write_json_atomic(self.path, data, self.indent)
+            self.data = data
+            self.signature = self.stat_signature()
+
+    def append(self, item):
+        """Add one record to a list file.
+
+        The new list is a copy, so if saving fails the cached copy is left
+        as it is on disk.
+        """
+        self.save(self.load() + [item])
+
+    def append_to(self, pairs):
+        """Add each (key, item) pair to a file holding a dict of lists"""
+        data = dict(self.load())
+        copied = set()
+        for key, item in pairs:
+            if key not in copied:
+                data[key] = list(data.get(key, []))
+                copied.add(key)
+            data[key].append(item)
+        self.save(data)
+
+    def update(self, fn):
+        """Change the data under the store lock and return fn's result.
+
+        fn gets a deep copy to change in place and returns a true value if
+        it should be saved; concurrent updates run one after another, and
+        the cached copy only changes once the save succeeded.
+        """
+        with self.lock:
+            data = copy.deepcopy(self.load())
+            result = fn(data)
+            if result:
+                self.save(data)
+            return result
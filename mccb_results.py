@@ -0,0 +1,663 @@
+#!/usr/bin/env python3
+import functools
+import heapq
+import io
+import multiprocessing
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from results_index import file_hash, file_hash_from_path
+
+# Registry of MCCB test types. Each entry names the folder holding its
+# result XMLs, the filename keywords that identify an uploaded file (checked
+# in list order), and ordered score rules; the first rule that yields a
+# number wins. Rules are ('percentage', path) or ('ratio', score_path,
+# max_path). Paths are relative to the document root; known export layouts
+# come first, descendant ('.//') searches only as a last resort.
+TEST_TYPES = [
+    {
+        'name': 'BACS Symbol Coding',
+        'folder': 'tests/mccb-001-symbol-coding',
+        'keywords': ('bacs', 'symbol'),
+        'rules': [
+            ('percentage', 'Results/Percentage'),
+            ('ratio', 'Results/Score', 'Results/Max_Score'),
+            ('percentage', './/Percentage'),
+        ],
+    },
+    {
+        'name': 'Animal Naming',
+        'folder': 'tests/mccb-002-animal_naming',
+        'keywords': ('animal',),
+        'rules': [
+            ('percentage', 'Percentage'),
+            ('percentage', './/Percentage'),
+            ('ratio', './/Score', './/Max'),
+        ],
+    },
+    {
+        'name': 'Trail Making',
+        'folder': 'tests/mccb-003-trail-making',
+        'keywords': ('trail',),
+        'rules': [
+            ('percentage', 'Results/Percentage'),
+            ('percentage', './/Percentage'),
+        ],
+    },
+    {
+        'name': 'CPT-IP',
+        'folder': 'tests/mccb-004-cpt-ip',
+        'keywords': ('cpt',),
+        'rules': [
+            ('percentage', 'Results/Percentage'),
+            ('percentage', './/Percentage'),
+        ],
+    },
+    {
+        'name': 'WMS-III Spatial Span',
+        'folder': 'tests/mccb-005-wms-iii-spatial-span',
+        'keywords': ('wms', 'spatial'),
+        'rules': [
+            ('ratio', 'Results/Score', 'Results/Max'),
+            ('ratio', './/Score', './/Max'),
+        ],
+    },
+    {
+        'name': 'Letter-Number Span',
+        'folder': 'tests/mccb-006-letter-number-span',
+        'keywords': ('letter', 'span'),
+        'rules': [
+            ('ratio', 'Results/Score', 'Results/Max'),
+            ('ratio', './/Score', './/Max'),
+        ],
+    },
+    {
+        'name': 'HVLT-R',
+        'folder': 'tests/mccb-007-hvlt-r',
+        'keywords': ('hvlt',),
+        'rules': [
+            ('percentage', 'Results/Percentage'),
+            ('percentage', './/Percentage'),
+        ],
+    },
+    {
+        'name': 'BVMT-R',
+        'folder': 'tests/mccb-008-bvmt-r',
+        'keywords': ('bvmt',),
+        'rules': [
+            ('percentage', 'Results/Percentage'),
+            ('percentage', './/Percentage'),
+        ],
+    },
+    {
+        'name': 'NAB Mazes',
+        'folder': 'tests/mccb-009-nab-mazes',
+        'keywords': ('nab', 'maze'),
+        'rules': [
+            ('ratio', 'Results/Score', 'Results/Max'),
+            ('ratio', './/Score', './/Max'),
+        ],
+    },
+]
+
+UNKNOWN_TEST = 'Unknown Test'
+
+
+def parse_number(text):
+    """Parse a score value, accepting forms like '45.33%' or '45,33'"""
+    if text is None:
+        return None
+    text = text.strip().rstrip('%').strip()
+    if ',' in text and '.' not in text:
+        text = text.replace(',', '.')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def compile_path(path):
+    """Turn a rule path into a function root -> text of the first match.
+
+    Child steps go straight to Element.find with a plain tag and './/Tag'
+    to Element.iter, both of which stay in C, rather than through
+    ElementPath's parser and selector generators on every call.
+    """
+    if path.startswith('.//'):
+        tag = path[3:]
+
+        def lookup(root):
+            for elem in root.iter(tag):
+                if elem is not root:
+                    return elem.text
+            return None
+    else:
+        tags = tuple(path.split('/'))
+
+        def lookup(root):
+            elem = root
+            for tag in tags:
+                elem = elem.find(tag)
+                if elem is None:
+                    return None
+            return elem.text
+    return lookup
+
+
+class ScoreRule:
+    """One compiled score rule: the element paths it needs and how to combine them"""
+    __slots__ = ('kind', 'paths', 'lookups')
+
+    def __init__(self, rule):
+        self.kind = rule[0]
+        if self.kind not in ('percentage', 'ratio'):
+            raise ValueError(f"Unknown score rule type: {self.kind}")
+        self.paths = tuple(rule[1:3] if self.kind == 'ratio' else rule[1:2])
+        self.lookups = tuple(compile_path(path) for path in self.paths)
+
+    def evaluate(self, texts):
+        """Compute the score from {path: text}, or None if it cannot be"""
+        if self.kind == 'percentage':
+            return parse_number(texts.get(self.paths[0]))
+
+        score = parse_number(texts.get(self.paths[0]))
+        if score is None:
+            return None
+        maximum = parse_number(texts.get(self.paths[1]))
+        if not maximum:
+            return None
+        return (score / maximum) * 100
+
+    def text(self, root, index, texts):
+        """Text at paths[index], looked up once per document and shared via texts"""
+        path = self.paths[index]
+        if path in texts:
+            return texts[path]
+        text = texts[path] = self.lookups[index](root)
+        return text
+
+    def __call__(self, root, texts=None):
+        texts = {} if texts is None else texts
+        score = parse_number(self.text(root, 0, texts))
+        if self.kind == 'percentage' or score is None:
+            # A ratio without its score cannot match, so its max is never looked up
+            return score
+        maximum = parse_number(self.text(root, 1, texts))
+        if not maximum:
+            return None
+        return (score / maximum) * 100
+
+
+# Built once at import
+TEST_FOLDERS = {test['name']: test['folder'] for test in TEST_TYPES}
+SCORE_RULES = {test['name']: [ScoreRule(rule) for rule in test['rules']] for test in TEST_TYPES}
+FILENAME_KEYWORDS = [(keyword, test['name']) for test in TEST_TYPES for keyword in test['keywords']]
+
+
+def extract_score_from_xml(root, test_type):
+    """Extract percentage score from XML based on test type"""
+    texts = {}
+    for rule in SCORE_RULES.get(test_type, ()):
+        score = rule(root, texts)
+        if score is not None:
+            return score
+    return 0
+
+
+def first_decided_score(rules, texts, finished):
+    """Apply rules in order to the texts seen so far.
+
+    Returns (decided, score). A rule whose paths have not all been seen can
+    still match later in the document, so nothing is decided until either it
+    matches or the document has been read to the end.
+    """
+    for rule in rules:
+        if not finished and any(path not in texts for path in rule.paths):
+            return False, None
+        score = rule.evaluate(texts)
+        if score is not None:
+            return True, score
+    return True, 0
+
+
+def extract_score_streaming(stream, test_type, chunk_size=4096):
+    """Extract a score by reading XML events only until it is known.
+
+    Returns (score, bytes_read). Elements are discarded as soon as they
+    close, and reading stops once the highest-priority rule that can match
+    has been satisfied, so summary fields near the top of a large export are
+    found without reading the trial or word lists after them.
+    """
+    rules = SCORE_RULES.get(test_type)
+    if not rules:
+        return 0, 0
+
+    # Direct paths are matched against the tag path below the root;
+    # './/Tag' paths against the first element with that tag
+    direct_paths = {}
+    descendant_tags = {}
+    for rule in rules:
+        for path in rule.paths:
+            if path.startswith('.//'):
+                descendant_tags.setdefault(path[3:], path)
+            else:
+                direct_paths.setdefault(tuple(path.split('/')), path)
+
+    max_direct_depth = max((len(path) for path in direct_paths), default=0)
+
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    texts = {}
+    stack = []
+    capturing = {}
+    bytes_read = 0
+
+    while True:
+        data = stream.read(chunk_size)
+        if data:
+            bytes_read += len(data)
+            parser.feed(data)
+        else:
+            parser.close()
+
+        found = False
+        for event, elem in parser.read_events():
+            if event == 'start':
+                stack.append(elem.tag)
+                depth = len(stack) - 1
+                wanted = None
+                if 0 < depth <= max_direct_depth:
+                    path = direct_paths.get(tuple(stack[1:]))
+                    if path is not None and path not in texts:
+                        wanted = [path]
+                if descendant_tags and depth > 0:
+                    path = descendant_tags.get(elem.tag)
+                    if path is not None and path not in texts:
+                        wanted = (wanted or []) + [path]
+                if wanted:
+                    capturing[elem] = wanted
+            else:
+                stack.pop()
+                if capturing:
+                    for path in capturing.pop(elem, ()):
+                        texts.setdefault(path, elem.text)
+                        found = True
+                elem.clear()
+
+        if found or not data:
+            decided, score = first_decided_score(rules, texts, not data)
+            if decided:
+                return score, bytes_read
+
+
+def determine_test_type(filename, root):
+    """Determine test type based on filename or XML content"""
+    filename_lower = filename.lower()
+    for keyword, test_type in FILENAME_KEYWORDS:
+        if keyword in filename_lower:
+            return test_type
+    return UNKNOWN_TEST
+
+
+# Timestamps in result filenames. The tests name their exports after
+# toISOString() with ':' and '.' replaced, e.g.
+# BACS_Test_Results_2025-12-27T21-24-01-250Z.xml; plain dates are also seen.
+FILENAME_TIMESTAMP = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})T(\d{2})[-:](\d{2})[-:](\d{2})(?:[-.](\d{1,6}))?Z?')
+FILENAME_DATE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')  # YYYY-MM-DD
+FILENAME_US_DATE = re.compile(r'(\d{2})-(\d{2})-(\d{4})')  # MM-DD-YYYY
+
+
+@functools.lru_cache(maxsize=1 << 17)
+def filename_timestamp(name):
+    """UTC datetime embedded in a result filename, or None"""
+    match = FILENAME_TIMESTAMP.search(name)
+    if match:
+        year, month, day, hour, minute, second, fraction = match.groups()
+        try:
+            return datetime.fromisoformat(
+                f'{year}-{month}-{day}T{hour}:{minute}:{second}.{(fraction or "0").ljust(6, "0")}+00:00')
+        except ValueError:
+            pass
+
+    match = FILENAME_DATE.search(name)
+    if match:
+        year, month, day = match.groups()
+    else:
+        match = FILENAME_US_DATE.search(name)
+        if match is None:
+            return None
+        month, day, year = match.groups()
+    try:
+        return datetime.fromisoformat(f'{year}-{month}-{day}T00:00:00+00:00')
+    except ValueError:
+        return None
+
+
+def result_timestamp(filename, mtime=None):
+    """When a result was taken: the timestamp in its filename, else the
+    file's mtime, else now"""
+    taken = filename_timestamp(os.path.basename(filename))
+    if taken is None:
+        if mtime is not None:
+            taken = datetime.fromtimestamp(mtime, timezone.utc)
+        else:
+            taken = datetime.now(timezone.utc)
+    return taken
+
+
+def format_timestamp(taken):
+    """Fixed-width UTC ISO-8601 string, so results sort as text"""
+    return taken.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def result_file_metadata(filename, mtime=None):
+    """(test type, taken-at datetime) of a result file, from its name"""
+    return determine_test_type(filename, None), result_timestamp(filename, mtime)
+
+
+def get_file_date(filename):
+    """Timestamp of an uploaded result file, as stored in results"""
+    return format_timestamp(result_timestamp(filename))
+
+
+class TopKPerGroup:
+    """Keeps the k items with the largest key per group, in one streaming pass.
+
+    Every group holds a min-heap of at most k entries, so memory stays at k
+    items per group however many are fed in. On equal keys the item seen
+    first wins, like taking the head of a stable descending sort.
+    """
+
+    def __init__(self, k, key, group=None):
+        self.k = k
+        self.key = key
+        self.group = group
+        self.heaps = {}
+        self.seen = 0
+
+    def add(self, item):
+        self.seen += 1
+        entry = (self.key(item), -self.seen, item)
+        heap = self.heaps.setdefault(self.group(item) if self.group else None, [])
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+        return self
+
+    def groups(self):
+        """{group: items, largest key first}, groups in first-seen order"""
+        return {group: [entry[2] for entry in sorted(heap, key=lambda entry: entry[:2], reverse=True)]
+                for group, heap in self.heaps.items()}
+
+    def items(self):
+        return [item for items in self.groups().values() for item in items]
+
+
+def top_k(items, k, key):
+    """The k items with the largest key, largest first"""
+    return TopKPerGroup(k, key).extend(items).items()
+
+
+def result_recency(result):
+    """Sort key putting the newest scored result last"""
+    return (result['date'], result['filename'])
+
+
+def score_result_file(job):
+    """Score a result file on disk; job is (path, test_name)"""
+    path, test_name = job
+    try:
+        with open(path, 'rb') as f:
+            score, _ = extract_score_streaming(f, test_name)
+        return (score, 'Found data')
+    except Exception as e:
+        return (0, f'Parse error: {str(e)}')
+
+
+def score_uploaded_file(job):
+    """Parse an uploaded result file; job is (filename, xml_bytes)"""
+    filename, data = job
+    test_type, taken_at = result_file_metadata(filename)
+    try:
+        score, _ = extract_score_streaming(io.BytesIO(data), test_type)
+    except Exception as e:
+        print(f"Error parsing XML {filename}: {e}")
+        return None
+
+    return {
+        'testType': test_type,
+        'score': score,
+        'date': format_timestamp(taken_at),
+        'filename': filename,
+        'status': 'Processed',
+        'fileHash': file_hash(data)
+    }
+
+
+class ParseExecutor:
+    """Runs XML parse jobs inline or on a process pool sized to the CPU count.
+
+    Batches smaller than min_parallel are parsed in the calling thread, where
+    pickling and pool overhead would outweigh the gain. Results always come
+    back in job order. Callers that buffer job payloads flush a batch once
+    it holds batch_bytes, whatever its length.
+    """
+
+    def __init__(self, workers=None, min_parallel=64, batch_bytes=16 * 1024 * 1024):
+        self.workers = workers or int(os.environ.get('PARSE_WORKERS', 0)) or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self.batch_bytes = batch_bytes
+        self.pool = None
+        self.lock = threading.Lock()
+
+    @property
+    def batch_size(self):
+        """How many jobs callers should collect before calling map()"""
+        return max(self.min_parallel, self.workers * 64)
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                # spawn rather than fork: the server process is multi-threaded
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self.pool
+
+    def map(self, func, jobs):
+        jobs = list(jobs)
+        if self.workers <= 1 or len(jobs) < self.min_parallel:
+            return [func(job) for job in jobs]
+        chunksize = max(1, len(jobs) // (self.workers * 4))
+        return list(self.get_pool().map(func, jobs, chunksize=chunksize))
+
+    def shutdown(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+
+
+class UploadedResultBatch:
+    """Collects uploaded result files and scores them a batch at a time.
+
+    Uploaded files are held whole until their batch is scored, so a batch is
+    flushed at executor.batch_size files or executor.batch_bytes bytes,
+    whichever comes first; memory is bounded by that plus one file. Scored
+    results are handed to on_scored a batch at a time and only the keep most
+    recent per test type are held on to.
+    """
+
+    def __init__(self, executor, keep=1, on_scored=None):
+        self.executor = executor
+        self.on_scored = on_scored
+        self.pending = []
+        self.pending_bytes = 0
+        self.latest = TopKPerGroup(keep, result_recency, group=lambda result: result['testType'])
+        self.total = 0
+        self.processed = 0
+
+    def add(self, filename, data):
+        self.pending.append((filename, data))
+        self.pending_bytes += len(data)
+        self.total += 1
+        if (len(self.pending) >= self.executor.batch_size
+                or self.pending_bytes >= self.executor.batch_bytes):
+            self.flush()
+
+    def flush(self):
+        """Score what is pending; returns the kept results, newest first per type"""
+        if self.pending:
+            scored = [result for result in self.executor.map(score_uploaded_file, self.pending)
+                      if result is not None]
+            self.pending = []
+            self.pending_bytes = 0
+            self.processed += len(scored)
+            if self.on_scored is not None and scored:
+                self.on_scored(scored)
+            self.latest.extend(scored)
+        return self.latest.items()
+
+
+class TestFolderScanner:
+    """Cached scanner for the MCCB test result folders.
+
+    The newest files of each directory are cached by directory mtime and
+    their parsed scores by (path, mtime, size), so a scan with no new files only
+    stats the folders and each new result file is parsed once. Adding,
+    removing or renaming a file updates the directory mtime; files rewritten
+    in place under the same name are only picked up once their directory
+    changes.
+    """
+
+    def __init__(self, test_folders=None, base_dir='.', executor=None, index=None):
+        self.test_folders = test_folders or TEST_FOLDERS
+        self.base_dir = base_dir
+        self.executor = executor or ParseExecutor()
+        self.index = index
+        self.listings = {}
+        self.scores = {}
+        self.lock = threading.Lock()
+
+    def latest_xml_files(self, dir_path, keep=1):
+        """Return (path, mtime, size) of the keep newest XML files in dir_path,
+        newest first by the timestamp in their names, else by mtime"""
+        try:
+            dir_mtime = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            self.listings.pop(dir_path, None)
+            return []
+
+        cached = self.listings.get(dir_path)
+        if cached is None or cached[0] != dir_mtime:
+            cached = self.listings[dir_path] = (dir_mtime, {})
+        latest = cached[1].get(keep)
+        if latest is not None:
+            return latest
+
+        with os.scandir(dir_path) as entries:
+            files = ((entry.path, stat.st_mtime, stat.st_size)
+                     for entry in entries
+                     if entry.name.endswith('.xml') and entry.is_file()
+                     for stat in (entry.stat(),))
+            latest = cached[1][keep] = top_k(files, keep,
+                                             key=lambda file: result_timestamp(file[0], file[1]))
+        return latest
+
+    def invalidate(self, dir_path):
+        """Forget the cached listing of dir_path so the next scan re-reads it"""
+        with self.lock:
+            self.listings.pop(dir_path, None)
+
+    def record(self, scored):
+        """Add newly scored files to the results index.
+
+        Hashing reads the whole file, so it is only done for files that have
+        no row yet; scoring itself stops as soon as the score is found.
+        """
+        results = []
+        for test_name, (path, mtime, size) in scored:
+            score, status = self.scores[(path, mtime, size)]
+            if status != 'Found data':
+                continue
+            date = format_timestamp(result_timestamp(path, mtime))
+            filename = os.path.basename(path)
+            if self.index.has_result('', test_name, date, filename):
+                continue
+            try:
+                results.append({
+                    'testType': test_name,
+                    'score': score,
+                    'date': date,
+                    'filename': filename,
+                    'fileHash': file_hash_from_path(path)
+                })
+            except OSError as e:
+                print(f"Error indexing {path}: {e}")
+        if results:
+            self.index.add_results(results, source='scan')
+
+    def scan(self, keep=1):
+        """Return the keep latest results per test folder, newest first, as
+        /api/scan-test-folders reports them"""
+        with self.lock:
+            found = []
+            for test_name, folder_path in self.test_folders.items():
+                folder_path = os.path.join(self.base_dir, folder_path)
+                if not os.path.isdir(folder_path):
+                    continue
+
+                # XML files in the main folder win over the data subfolder
+                latest = self.latest_xml_files(folder_path, keep)
+                if not latest:
+                    latest = self.latest_xml_files(os.path.join(folder_path, 'data'), keep)
+                found.append((test_name, latest))
+
+            # Parse the files whose score is not cached yet, in parallel if many
+            unscored = [(test_name, file) for test_name, latest in found
+                        for file in latest if file not in self.scores]
+            new_scores = self.executor.map(
+                score_result_file, [(file[0], test_name) for test_name, file in unscored]
+            )
+            for (_, file), score in zip(unscored, new_scores):
+                self.scores[file] = score
+            if self.index is not None:
+                self.record(unscored)
+
+            results = []
+            for test_name, latest in found:
+                if not latest:
+                    results.append({
+                        'testType': test_name,
+                        'score': 0,
+                        'date': 'No data',
+                        'status': 'No file found'
+                    })
+                    continue
+
+                for file in latest:
+                    score, status = self.scores[file]
+                    results.append({
+                        'testType': test_name,
+                        'score': score,
+                        'date': format_timestamp(result_timestamp(file[0], file[1])),
+                        'status': status
+                    })
+
+            # Forget scores only for files gone from every cached listing, so
+            # scans with different keep values do not evict each other
+            live_keys = {file for _, listings in self.listings.values()
+                         for latest in listings.values() for file in latest}
+            if len(self.scores) > len(live_keys):
+                self.scores = {key: score for key, score in self.scores.items() if key in live_keys}
+        return results
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+import gzip
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from json_store import fsync_dir, write_json_atomic
+
+ARCHIVE_DIR = 'message_archive'
+
+# Messages kept in the live store; older ones are rolled into the archive
+HOT_MESSAGES = int(os.environ.get('MESSAGE_HOT_LIMIT', 1000))
+
+# Archived days older than this are deleted; 0 keeps the archive forever
+ARCHIVE_DAYS = int(os.environ.get('MESSAGE_ARCHIVE_DAYS', 365))
+
+# A roll adding to a day whose latest segment holds fewer messages than
+# this rewrites that segment instead of starting another small one
+SEGMENT_MESSAGES = 5000
+
+# Decompressed segments kept in memory for paging
+SEGMENT_CACHE_SIZE = 16
+
+ARCHIVE_PAGE_SIZE = 50
+MAX_ARCHIVE_PAGE_SIZE = 500
+
+
+def message_time(message):
+    """ISO timestamp messages are ordered and partitioned by"""
+    return message.get('timestamp') or ''
+
+
+class MessageArchive:
+    """Chat history rolled out of the live store, one gzip'd JSON segment
+    per day per roll.
+
+    index.json lists every segment with its day, first and last timestamp
+    and count, so a page of history only decompresses the segments that
+    can hold it. Segments never change once written; recently read ones
+    stay cached. on_prune, if given, is called with the last timestamp of
+    the expired segments after prune() deletes them.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR, retention_days=ARCHIVE_DAYS, on_prune=None):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.on_prune = on_prune
+        self.index_path = os.path.join(directory, 'index.json')
+        self.segments = []
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        try:
+            with open(self.index_path) as f:
+                self.segments = json.load(f)
+        except FileNotFoundError:
+            pass
+
+    def write_segment(self, file_name, messages):
+        path = os.path.join(self.directory, file_name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(gzip.compress(json.dumps(messages).encode('utf-8')))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def add(self, messages):
+        """Archive messages, split into one segment per day"""
+        by_day = {}
+        for message in messages:
+            by_day.setdefault(message_time(message)[:10] or 'undated', []).append(message)
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            segments = list(self.segments)
+            replaced = []
+            for day, day_messages in sorted(by_day.items()):
+                # Top up the day's latest segment while it is small
+                latest = None
+                for segment in segments:
+                    if segment['day'] == day and (latest is None or segment['file'] > latest['file']):
+                        latest = segment
+                if latest is not None and latest['count'] < SEGMENT_MESSAGES:
+                    day_messages = self.read_segment(latest['file'], locked=True) + day_messages
+                    segments.remove(latest)
+                    replaced.append(latest['file'])
+                day_messages.sort(key=message_time)
+                file_name = self.segment_name(day, segments, replaced)
+                self.write_segment(file_name, day_messages)
+                segments.append({
+                    'file': file_name,
+                    'day': day,
+                    'start': message_time(day_messages[0]),
+                    'end': message_time(day_messages[-1]),
+                    'count': len(day_messages)
+                })
+            fsync_dir(self.directory)
+            segments.sort(key=lambda segment: (segment['end'], segment['file']))
+            write_json_atomic(self.index_path, segments)
+            self.segments = segments
+            # Replaced segments go only once the index no longer names them
+            for file_name in replaced:
+                self.cache.pop(file_name, None)
+                os.remove(os.path.join(self.directory, file_name))
+
+    def segment_name(self, day, segments, replaced):
+        """Unique segment file name for day; later names sort after earlier ones"""
+        taken = {segment['file'] for segment in segments}
+        taken.update(replaced)
+        sequence = int(time.time() * 1000)
+        while f'{day}-{sequence}.json.gz' in taken:
+            sequence += 1
+        return f'{day}-{sequence}.json.gz'
+
+    def prune(self, today=None):
+        """Delete segments for days past the retention period"""
+        if not self.retention_days:
+            return 0
+        cutoff = ((today or date.today()) - timedelta(days=self.retention_days)).isoformat()
+        with self.lock:
+            expired = [segment for segment in self.segments if segment['day'] < cutoff]
+            if not expired:
+                return 0
+            self.segments = [segment for segment in self.segments if segment['day'] >= cutoff]
+            write_json_atomic(self.index_path, self.segments)
+            for segment in expired:
+                self.cache.pop(segment['file'], None)
+                try:
+                    os.remove(os.path.join(self.directory, segment['file']))
+                except FileNotFoundError:
+                    pass
+        if self.on_prune is not None:
+            self.on_prune(max(segment['end'] for segment in expired))
+        return len(expired)
+
+    def read_segment(self, file_name, locked=False):
+        """Messages of one segment; locked when the caller holds self.lock"""
+        if not locked:
+            with self.lock:
+                return self.read_segment(file_name, locked=True)
+        messages = self.cache.get(file_name)
+        if messages is not None:
+            self.cache.move_to_end(file_name)
+            return messages
+        with open(os.path.join(self.directory, file_name), 'rb') as f:
+            messages = json.loads(gzip.decompress(f.read()))
+        self.cache[file_name] = messages
+        while len(self.cache) > SEGMENT_CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return messages
+
+    def page(self, before=None, limit=ARCHIVE_PAGE_SIZE):
+        """The limit newest archived messages older than before, oldest first,
+        and whether older ones remain"""
+        newest = []
+        remaining = False
+        with self.lock:
+            # Newest segments first; once a page is full, segments ending
+            # before its oldest message cannot contribute
+            for segment in reversed(self.segments):
+                if before is not None and segment['start'] >= before:
+                    continue
+                if len(newest) >= limit and segment['end'] < message_time(newest[-1]):
+                    remaining = True
+                    break
+                messages = self.read_segment(segment['file'], locked=True)
+                newest.extend(message for message in messages
+                              if before is None or message_time(message) < before)
+                newest.sort(key=message_time, reverse=True)
+                if len(newest) > limit:
+                    del newest[limit:]
+                    remaining = True
+        newest.reverse()
+        return newest, remaining
+
+    def count(self):
+        return sum(segment['count'] for segment in self.segments)
+
+    def messages(self):
+        """Every archived message, segment by segment from the oldest"""
+        with self.lock:
+            segments = sorted(self.segments, key=lambda segment: (segment['start'], segment['file']))
+        for segment in segments:
+            with open(os.path.join(self.directory, segment['file']), 'rb') as f:
+                yield from json.loads(gzip.decompress(f.read()))
+
+
+class MessageRetention:
+    """Keeps the live message store to a hot window.
+
+    Messages are appended to the store as before; once it holds hot_limit
+    plus a tenth more, everything but the newest hot_limit is rolled into
+    the archive, so a roll happens every hot_limit / 10 messages rather
+    than on each one. The archive is written before the store is trimmed:
+    a crash in between duplicates messages instead of losing them.
+    """
+
+    def __init__(self, store, archive, hot_limit=HOT_MESSAGES):
+        self.store = store
+        self.archive = archive
+        self.hot_limit = hot_limit
+        self.slack = max(1, hot_limit // 10)
+        self.lock = threading.Lock()
+
+    def append(self, message):
+        with self.lock:
+            self.store.append(message)
+            if len(self.store.load()) < self.hot_limit + self.slack:
+                return
+            rolled = self.trim()
+        if rolled:
+            self.archive.prune()
+
+    def trim(self):
+        messages = self.store.load()
+        excess = len(messages) - self.hot_limit
+        if excess <= 0:
+            return 0
+        self.archive.add(messages[:excess])
+        self.store.save(messages[excess:])
+        return excess
+
+    def roll(self):
+        """Move everything but the hot window into the archive"""
+        with self.lock:
+            rolled = self.trim()
+        self.archive.prune()
+        return rolled
+
+
+def archive_page_params(query):
+    """(before, limit) from a parsed /api/messages/archive query string;
+    ValueError if limit is not a positive integer"""
+    before = query.get('before', [''])[0].strip() or None
+    limit = int(query.get('limit', [ARCHIVE_PAGE_SIZE])[0])
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return before, min(limit, MAX_ARCHIVE_PAGE_SIZE)
+
+
+def archive_page_response(archive, before, limit):
+    messages, remaining = archive.page(before, limit)
+    return {
+        'messages': messages,
+        'hasMore': remaining,
+        # Pass back as before= for the next older page
+        'before': message_time(messages[0]) if messages else before
+    }
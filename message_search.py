@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+import heapq
+import json
+import re
+import sqlite3
+import threading
+
+SEARCH_DB = 'message_search.db'
+
+# Words are runs of letters and digits; underscores split attachment names
+TOKEN = re.compile(r'[^\W_]+')
+QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+SEARCH_SCOPES = ('all', 'public', 'private')
+
+# Rows inserted per transaction while indexing existing history
+BUILD_BATCH = 10000
+
+SCHEMA = '''
+-- One row per indexed message, holding the message itself
+CREATE TABLE IF NOT EXISTS search_messages (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    timestamp TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS search_messages_kind_time ON search_messages (kind, timestamp);
+
+-- Postings only (contentless), keyed by search_messages.id. Private
+-- messages have their own table, so private searches never walk public
+-- postings; audience holds a token per participant.
+CREATE VIRTUAL TABLE IF NOT EXISTS search_public USING fts5(
+    content, originalname, content='', prefix='2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_private USING fts5(
+    content, originalname, audience, content='', prefix='2 3'
+);
+'''
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return TOKEN.findall(str(text).lower())
+
+
+def message_fields(message):
+    """Searchable text of a message: its content and attachment name"""
+    return [message.get('content'), message.get('originalname')]
+
+
+def message_time(message):
+    return message.get('timestamp') or ''
+
+
+def audience_token(user):
+    """Single FTS token for a user name, whatever characters it holds"""
+    return 'u' + str(user).encode('utf-8').hex()
+
+
+def text_columns(message):
+    return tuple(str(field) if field else '' for field in message_fields(message))
+
+
+def private_audience(message):
+    return ' '.join(audience_token(user) for user in (message.get('from_user'), message.get('to_user')) if user)
+
+
+def match_expression(clauses):
+    """FTS5 query for parsed clauses; every word is quoted, so nothing in
+    user input is read as query syntax"""
+    parts = []
+    for kind, value in clauses:
+        if kind == 'phrase':
+            parts.append('"' + ' '.join(value) + '"')
+        elif kind == 'prefix':
+            parts.append(f'"{value}" *')
+        else:
+            parts.append(f'"{value}"')
+    return ' AND '.join(parts)
+
+
+def parse_query(query):
+    """Clauses of a query, all of which must match: ('term', word),
+    ('prefix', start) for word*, and ('phrase', words) for "quoted words" """
+    clauses = []
+    for phrase, word in QUERY_PART.findall(query):
+        if phrase:
+            words = tokenize(phrase)
+            if len(words) == 1:
+                clauses.append(('term', words[0]))
+            elif words:
+                clauses.append(('phrase', words))
+            continue
+        prefix = word.endswith('*')
+        words = tokenize(word)
+        for index, token in enumerate(words):
+            last = index == len(words) - 1
+            clauses.append(('prefix' if prefix and last else 'term', token))
+    return clauses
+
+
+class MessageSearchIndex:
+    """Full-text index over public and private chat messages.
+
+    Kept in SQLite (FTS5) next to the other stores, so memory does not grow
+    with the history and the index survives restarts: only messages newer
+    than the last indexed one are added by build(). Messages get ids in the
+    order they are added, so newest-first is descending id. Words of the
+    content and attachment name are matched, phrases by position.
+
+    Private messages are indexed once, in a table of their own with their
+    sender and recipient as audience tokens, and only ever returned to those
+    two users. Visibility is part of the full-text query, so private
+    searches only walk private postings. Public messages whose archive days
+    expire are removed by remove_public_until().
+    """
+
+    def __init__(self, path=SEARCH_DB):
+        self.path = path
+        self.local = threading.local()
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def insert(self, connection, entries):
+        """Index (kind, message) pairs inside the caller's transaction"""
+        last = None
+        for kind, message in entries:
+            last = connection.execute(
+                'INSERT INTO search_messages (kind, timestamp, data) VALUES (?, ?, ?)',
+                (kind, message_time(message), json.dumps(message))
+            ).lastrowid
+            if kind == 'public':
+                connection.execute(
+                    'INSERT INTO search_public (rowid, content, originalname) VALUES (?, ?, ?)',
+                    (last,) + text_columns(message)
+                )
+            else:
+                connection.execute(
+                    'INSERT INTO search_private (rowid, content, originalname, audience) VALUES (?, ?, ?, ?)',
+                    (last,) + text_columns(message) + (private_audience(message),)
+                )
+        return last
+
+    def add_public(self, message):
+        connection = self.connection()
+        with connection:
+            return self.insert(connection, [('public', message)])
+
+    def add_private(self, message):
+        connection = self.connection()
+        with connection:
+            return self.insert(connection, [('private', message)])
+
+    def newest(self, kind):
+        row = self.connection().execute(
+            'SELECT MAX(timestamp) FROM search_messages WHERE kind = ?', (kind,)
+        ).fetchone()
+        return row[0] or ''
+
+    def build(self, public_messages, private_messages):
+        """Index history newer than anything indexed so far, oldest first.
+
+        public_messages is iterated once and should be in time order, e.g.
+        the archive followed by the live store, so it is never held in
+        memory. private_messages is the store's dict of conversations;
+        sender copies are skipped. Returns the number of messages added.
+        """
+        newest_public = self.newest('public')
+        newest_private = self.newest('private')
+        public = (('public', message) for message in public_messages
+                  if message_time(message) > newest_public)
+        private = sorted(
+            (('private', message) for conversation in private_messages.values()
+             for message in conversation
+             if message.get('sent') != 'true' and message_time(message) > newest_private),
+            key=lambda entry: message_time(entry[1])
+        )
+
+        added = 0
+        batch = []
+        connection = self.connection()
+        for entry in heapq.merge(public, private, key=lambda entry: message_time(entry[1])):
+            batch.append(entry)
+            if len(batch) >= BUILD_BATCH:
+                with connection:
+                    self.insert(connection, batch)
+                added += len(batch)
+                batch = []
+        if batch:
+            with connection:
+                self.insert(connection, batch)
+            added += len(batch)
+        return added
+
+    def remove_public_until(self, timestamp):
+        """Drop public messages at or before timestamp, e.g. once their
+        archive segments expire; returns how many were removed"""
+        connection = self.connection()
+        with connection:
+            rows = connection.execute(
+                "SELECT id, data FROM search_messages WHERE kind = 'public' AND timestamp <= ?",
+                (timestamp,)
+            ).fetchall()
+            # A contentless table is told the indexed values to remove
+            connection.executemany(
+                "INSERT INTO search_public (search_public, rowid, content, originalname) "
+                "VALUES ('delete', ?, ?, ?)",
+                ((doc,) + text_columns(json.loads(data)) for doc, data in rows)
+            )
+            connection.execute(
+                "DELETE FROM search_messages WHERE kind = 'public' AND timestamp <= ?", (timestamp,)
+            )
+        return len(rows)
+
+    def count(self):
+        return self.connection().execute('SELECT COUNT(*) FROM search_messages').fetchone()[0]
+
+    def search(self, query, user=None, offset=0, limit=SEARCH_PAGE_SIZE, scope='all'):
+        """One page of matching messages, newest first, as (hits, has_more);
+        each hit is (message, 'public' or 'private')"""
+        clauses = parse_query(query)
+        if not clauses:
+            return [], False
+        text = match_expression(clauses)
+        queries = []
+        params = []
+        if scope != 'private':
+            queries.append('SELECT rowid FROM search_public WHERE search_public MATCH ?')
+            params.append(text)
+        if scope != 'public' and user is not None:
+            queries.append('SELECT rowid FROM search_private WHERE search_private MATCH ?')
+            params.append(f'audience : {audience_token(user)} AND {{content originalname}} : ({text})')
+        if not queries:
+            return [], False
+
+        # Each table yields at most one page past the offset, newest first,
+        # before the two are merged
+        window = offset + limit + 1
+        sql = ' UNION ALL '.join(f'SELECT * FROM ({query} ORDER BY rowid DESC LIMIT {window})'
+                                 for query in queries)
+        connection = self.connection()
+        ids = [row[0] for row in connection.execute(
+            f'{sql} ORDER BY 1 DESC LIMIT ? OFFSET ?', params + [limit + 1, offset]
+        )]
+        has_more = len(ids) > limit
+        ids = ids[:limit]
+        if not ids:
+            return [], False
+        rows = dict((doc, (kind, data)) for doc, kind, data in connection.execute(
+            f'SELECT id, kind, data FROM search_messages WHERE id IN ({", ".join("?" * len(ids))})', ids
+        ))
+        hits = [(json.loads(rows[doc][1]), rows[doc][0]) for doc in ids if doc in rows]
+        return hits, has_more
+
+
+def search_params(query):
+    """(q, offset, limit, scope) from a parsed /api/messages/search query
+    string; ValueError for anything invalid"""
+    q = query.get('q', [''])[0].strip()
+    if not q:
+        raise ValueError('q is required')
+    offset = int(query.get('offset', ['0'])[0])
+    limit = int(query.get('limit', [SEARCH_PAGE_SIZE])[0])
+    scope = query.get('scope', ['all'])[0]
+    if offset < 0 or limit < 1 or scope not in SEARCH_SCOPES:
+        raise ValueError('offset must be >= 0, limit positive and scope one of all, public, private')
+    return q, offset, min(limit, MAX_SEARCH_PAGE_SIZE), scope
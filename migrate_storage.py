@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Copy users.json, messages.json, private_messages.json and activity.json
+into the SQLite storage database, for running the servers with
+MCCB_STORAGE=sqlite.
+
+Tables are replaced, so running it again re-imports the JSON files. Files
+that do not exist are skipped.
+
+Usage: python migrate_storage.py [data_dir] [database]
+"""
+import json
+import os
+import sys
+import time
+
+from sqlite_store import STORAGE_DB, SQLiteGroupedStore, SQLiteListStore, StorageDatabase
+
+JSON_FILES = [
+    ('users', 'users.json', SQLiteListStore),
+    ('messages', 'messages.json', SQLiteListStore),
+    ('private_messages', 'private_messages.json', SQLiteGroupedStore),
+    ('activity', 'activity.json', SQLiteListStore),
+]
+
+
+def migrate(data_dir='.', path=None):
+    database = StorageDatabase(path or os.environ.get('MCCB_SQLITE_PATH', STORAGE_DB))
+    counts = {}
+    for table, file_name, store_class in JSON_FILES:
+        json_path = os.path.join(data_dir, file_name)
+        if not os.path.exists(json_path):
+            print(f"{file_name}: not found, skipped")
+            continue
+        with open(json_path) as f:
+            data = json.load(f)
+        store_class(database, table).save(data)
+        if isinstance(data, dict):
+            counts[table] = sum(len(records) for records in data.values())
+        else:
+            counts[table] = len(data)
+        print(f"{file_name}: {counts[table]} records -> {table}")
+    database.connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return counts
+
+
+if __name__ == '__main__':
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else '.'
+    path = sys.argv[2] if len(sys.argv) > 2 else None
+    start = time.perf_counter()
+    migrate(data_dir, path)
+    print(f"Migrated in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+_PARAM_PATTERN = re.compile(rb'(\w+)="([^"]*)"')
+
+
+class MultipartError(ValueError):
+    pass
+
+
+def parse_part_headers(header_block):
+    """Parse a part's header block into a dict with lower-case keys.
+
+    Content-Disposition parameters (name, filename) are added as their own
+    entries so callers do not have to re-parse the header.
+    """
+    headers = {}
+    for line in header_block.split(b'\r\n'):
+        if b':' not in line:
+            continue
+        key, value = line.split(b':', 1)
+        headers[key.strip().lower().decode('latin-1')] = value.strip().decode('utf-8', 'replace')
+
+    disposition = headers.get('content-disposition', '').encode('utf-8')
+    for key, value in _PARAM_PATTERN.findall(disposition):
+        headers[key.decode('latin-1').lower()] = value.decode('utf-8', 'replace')
+    return headers
+
+
+def read_multipart(stream, boundary, content_length, on_part, chunk_size=CHUNK_SIZE):
+    """Stream a multipart/form-data body from stream, part by part.
+
+    on_part(headers) is called at the start of every part and returns a sink
+    with feed(data) and close() methods, or None to skip the part. Part bodies
+    are passed to the sink in chunks as they are read, so at most about one
+    chunk of the request is held in memory at a time. Returns the number of
+    parts seen.
+    """
+    if isinstance(boundary, str):
+        boundary = boundary.encode('latin-1')
+    # The first delimiter has no leading CRLF; prepending one makes all alike
+    delimiter = b'\r\n--' + boundary
+    keep = len(delimiter) + 4
+
+    buffer = b'\r\n'
+    remaining = content_length
+    state = 'preamble'
+    sink = None
+    parts = 0
+
+    def fill():
+        nonlocal buffer, remaining
+        if remaining <= 0:
+            return False
+        data = stream.read(min(chunk_size, remaining))
+        if not data:
+            remaining = 0
+            return False
+        remaining -= len(data)
+        buffer += data
+        return True
+
+    while True:
+        if state == 'preamble':
+            index = buffer.find(delimiter)
+            if index < 0:
+                buffer = buffer[-keep:]
+                if not fill():
+                    raise MultipartError('Multipart boundary not found')
+                continue
+            buffer = buffer[index + len(delimiter):]
+            state = 'after-delimiter'
+
+        elif state == 'after-delimiter':
+            if len(buffer) < 2 and fill():
+                continue
+            if buffer.startswith(b'--'):
+                # Closing delimiter; drain the epilogue so the connection stays usable
+                while fill():
+                    buffer = b''
+                return parts
+            state = 'headers'
+
+        elif state == 'headers':
+            index = buffer.find(b'\r\n\r\n')
+            if index < 0:
+                if not fill():
+                    raise MultipartError('Truncated multipart headers')
+                continue
+            headers = parse_part_headers(buffer[:index])
+            buffer = buffer[index + 4:]
+            parts += 1
+            sink = on_part(headers)
+            state = 'body'
+
+        elif state == 'body':
+            index = buffer.find(delimiter)
+            if index >= 0:
+                if sink is not None:
+                    if index:
+                        sink.feed(buffer[:index])
+                    sink.close()
+                buffer = buffer[index + len(delimiter):]
+                sink = None
+                state = 'after-delimiter'
+                continue
+
+            # Hold back enough bytes to catch a delimiter split across reads
+            if len(buffer) > keep:
+                if sink is not None:
+                    sink.feed(buffer[:-keep])
+                buffer = buffer[-keep:]
+            if not fill():
+                raise MultipartError('Truncated multipart body')
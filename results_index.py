@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+RESULTS_DB = 'results_index.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    participant TEXT NOT NULL DEFAULT '',
+    test_type TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    filename TEXT NOT NULL DEFAULT '',
+    score REAL NOT NULL,
+    file_hash TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT '',
+    indexed_at TEXT NOT NULL,
+    UNIQUE (participant, file_hash)
+);
+CREATE INDEX IF NOT EXISTS results_type_time
+    ON results (test_type, taken_at, filename);
+CREATE INDEX IF NOT EXISTS results_participant_type_time
+    ON results (participant, test_type, taken_at, filename);
+CREATE INDEX IF NOT EXISTS results_hash
+    ON results (file_hash, id);
+
+-- Per-day rollups kept up to date on insert, so history queries read one
+-- row per day instead of every result. A file indexed for several
+-- participants (e.g. found by the folder scan and also uploaded) counts
+-- once in the cohort totals, as its first row.
+CREATE TABLE IF NOT EXISTS daily_scores (
+    participant TEXT NOT NULL,
+    test_type TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    min_score REAL NOT NULL,
+    max_score REAL NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (participant, test_type, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily_totals (
+    test_type TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    min_score REAL NOT NULL,
+    max_score REAL NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (test_type, day)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS results_rollup AFTER INSERT ON results
+BEGIN
+    INSERT INTO daily_scores VALUES
+        (NEW.participant, NEW.test_type, substr(NEW.taken_at, 1, 10), 1, NEW.score, NEW.score, NEW.score)
+    ON CONFLICT (participant, test_type, day) DO UPDATE SET
+        count = count + 1,
+        min_score = min(min_score, excluded.min_score),
+        max_score = max(max_score, excluded.max_score),
+        total = total + excluded.total;
+    INSERT INTO daily_totals
+        SELECT NEW.test_type, substr(NEW.taken_at, 1, 10), 1, NEW.score, NEW.score, NEW.score
+        WHERE NOT EXISTS (SELECT 1 FROM results WHERE file_hash = NEW.file_hash AND id < NEW.id)
+    ON CONFLICT (test_type, day) DO UPDATE SET
+        count = count + 1,
+        min_score = min(min_score, excluded.min_score),
+        max_score = max(max_score, excluded.max_score),
+        total = total + excluded.total;
+END;
+'''
+
+# Bumped whenever the rollups must be rebuilt from the results table
+SCHEMA_VERSION = 1
+
+# Version 0 counted every copy of a file in daily_totals
+DROP_OLD_TRIGGERS = '''
+DROP TRIGGER IF EXISTS results_rollup;
+'''
+
+# Only the first row of each file content, so shared files count once
+FIRST_COPY = ('NOT EXISTS (SELECT 1 FROM results AS earlier '
+              'WHERE earlier.file_hash = results.file_hash AND earlier.id < results.id)')
+
+# Rebuilds the rollup tables from the results table
+ROLLUP_BACKFILL = f'''
+BEGIN;
+DELETE FROM daily_scores;
+DELETE FROM daily_totals;
+INSERT INTO daily_scores
+    SELECT participant, test_type, substr(taken_at, 1, 10), COUNT(*), MIN(score), MAX(score), SUM(score)
+    FROM results GROUP BY 1, 2, 3;
+INSERT INTO daily_totals
+    SELECT test_type, substr(taken_at, 1, 10), COUNT(*), MIN(score), MAX(score), SUM(score)
+    FROM results WHERE {FIRST_COPY} GROUP BY 1, 2;
+PRAGMA user_version = {SCHEMA_VERSION};
+COMMIT;
+'''
+
+# Distinct test types via index skip-scan instead of a full table scan
+TEST_TYPES_SQL = '''
+WITH RECURSIVE types(test_type) AS (
+    SELECT MIN(test_type) FROM results
+    UNION ALL
+    SELECT (SELECT MIN(test_type) FROM results WHERE test_type > types.test_type)
+    FROM types WHERE types.test_type IS NOT NULL
+)
+SELECT test_type FROM types WHERE test_type IS NOT NULL
+'''
+
+# Bucket keys for history aggregation; weeks start on Monday
+BUCKET_EXPRESSIONS = {
+    'day': "day",
+    'week': "date(day, '-6 days', 'weekday 1')",
+}
+
+RESULT_COLUMNS = 'participant, test_type, taken_at, filename, score, file_hash, source'
+
+
+def file_hash(data):
+    """Content hash used to recognise a result file seen before"""
+    return hashlib.sha1(data).hexdigest()
+
+
+def file_hash_from_path(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def row_to_result(row):
+    participant, test_type, taken_at, filename, score, hash_value, source = row
+    return {
+        'testType': test_type,
+        'score': score,
+        'date': taken_at,
+        'filename': filename,
+        'participant': participant,
+        'fileHash': hash_value,
+        'source': source
+    }
+
+
+def downsample(buckets, max_points):
+    """Merge runs of consecutive [date, count, min, max, total] buckets so at
+    most max_points remain; each merged bucket is dated by its first member"""
+    size = -(-len(buckets) // max_points)
+    merged = []
+    for start in range(0, len(buckets), size):
+        run = buckets[start:start + size]
+        merged.append([
+            run[0][0],
+            sum(bucket[1] for bucket in run),
+            min(bucket[2] for bucket in run),
+            max(bucket[3] for bucket in run),
+            sum(bucket[4] for bucket in run)
+        ])
+    return merged
+
+
+class ResultsIndex:
+    """Persistent SQLite index of scored MCCB result files.
+
+    Rows are keyed by participant and file content hash, so re-uploading or
+    re-scanning a file is a no-op. Each thread gets its own connection.
+    version is bumped after every insert that added rows, so in-process
+    caches can tell when to refresh.
+    """
+
+    def __init__(self, path=RESULTS_DB):
+        self.path = path
+        self.local = threading.local()
+        self.version = 0
+        self.version_lock = threading.Lock()
+        connection = self.connection()
+        outdated = connection.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION
+        if outdated:
+            connection.executescript(DROP_OLD_TRIGGERS)
+        connection.executescript(SCHEMA)
+        if outdated or (connection.execute('SELECT 1 FROM daily_totals LIMIT 1').fetchone() is None and
+                        connection.execute('SELECT 1 FROM results LIMIT 1').fetchone() is not None):
+            connection.executescript(ROLLUP_BACKFILL)
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def add_results(self, results, participant='', source=''):
+        """Insert scored results (dicts with a fileHash); returns rows added"""
+        indexed_at = datetime.now().isoformat()
+        rows = [
+            (participant, result['testType'], result['date'], result.get('filename', ''),
+             float(result['score']), result['fileHash'], source, indexed_at)
+            for result in results
+        ]
+        connection = self.connection()
+        with connection:
+            cursor = connection.executemany(
+                'INSERT OR IGNORE INTO results '
+                '(participant, test_type, taken_at, filename, score, file_hash, source, indexed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            added = cursor.rowcount
+        if added:
+            with self.version_lock:
+                self.version += 1
+        return added
+
+    def has_result(self, participant, test_type, taken_at, filename):
+        """Whether a row for this file is already indexed, without hashing it"""
+        return self.connection().execute(
+            'SELECT 1 FROM results WHERE participant = ? AND test_type = ? '
+            'AND taken_at = ? AND filename = ? LIMIT 1',
+            (participant, test_type, taken_at, filename)
+        ).fetchone() is not None
+
+    def test_types(self):
+        return [row[0] for row in self.connection().execute(TEST_TYPES_SQL)]
+
+    def latest_per_type(self, participant=None, keep=1):
+        """The keep most recent results for every test type, newest first by
+        (date, filename); across participants each file is listed once"""
+        connection = self.connection()
+        latest = []
+        for test_type in self.test_types():
+            if participant is None:
+                rows = connection.execute(
+                    f'SELECT {RESULT_COLUMNS} FROM results WHERE test_type = ? AND {FIRST_COPY} '
+                    'ORDER BY taken_at DESC, filename DESC LIMIT ?',
+                    (test_type, keep)
+                )
+            else:
+                rows = connection.execute(
+                    f'SELECT {RESULT_COLUMNS} FROM results WHERE participant = ? AND test_type = ? '
+                    'ORDER BY taken_at DESC, filename DESC LIMIT ?',
+                    (participant, test_type, keep)
+                )
+            latest.extend(row_to_result(row) for row in rows)
+        return latest
+
+    def history(self, test_type, participant=None, limit=None):
+        """All results for one test type, oldest first"""
+        sql = f'SELECT {RESULT_COLUMNS} FROM results WHERE test_type = ? AND {FIRST_COPY}'
+        params = [test_type]
+        if participant is not None:
+            sql = (f'SELECT {RESULT_COLUMNS} FROM results INDEXED BY results_participant_type_time '
+                   'WHERE participant = ? AND test_type = ?')
+            params = [participant, test_type]
+        sql += ' ORDER BY taken_at, filename'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [row_to_result(row) for row in self.connection().execute(sql, params)]
+
+    def aggregate_history(self, test_type, participant=None, bucket='day',
+                          start=None, end=None, max_points=None):
+        """Score count, min, max and mean per day or week for one test type,
+        oldest first. start and end are inclusive YYYY-MM-DD dates."""
+        if bucket not in BUCKET_EXPRESSIONS:
+            raise ValueError(f'Unknown bucket: {bucket}')
+        table = 'daily_totals'
+        conditions = ['test_type = ?']
+        params = [test_type]
+        if participant is not None:
+            table = 'daily_scores'
+            conditions.insert(0, 'participant = ?')
+            params.insert(0, participant)
+        if start is not None:
+            conditions.append('day >= ?')
+            params.append(start[:10])
+        if end is not None:
+            conditions.append('day <= ?')
+            params.append(end[:10])
+
+        rows = self.connection().execute(
+            f'SELECT {BUCKET_EXPRESSIONS[bucket]} AS bucket, SUM(count), MIN(min_score), '
+            f'MAX(max_score), SUM(total) FROM {table} WHERE {" AND ".join(conditions)} '
+            'GROUP BY bucket ORDER BY bucket',
+            params
+        ).fetchall()
+        if max_points is not None and len(rows) > max_points:
+            rows = downsample(rows, max_points)
+        return [
+            {'date': day, 'count': count, 'min': low, 'max': high, 'mean': total / count}
+            for day, count, low, high, total in rows
+        ]
+
+    def count(self):
+        return self.connection().execute('SELECT COUNT(*) FROM results').fetchone()[0]
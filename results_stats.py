@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import bisect
+import math
+import threading
+from array import array
+
+from results_index import FIRST_COPY
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Batches larger than this are merged with one sort instead of insort
+INSORT_LIMIT = 32
+
+
+def percentile_of_sorted(values, percentile):
+    """Linearly interpolated percentile of a sorted sequence (numpy's default)"""
+    position = (len(values) - 1) * percentile / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def batch_moments(scores):
+    """(mean, sum of squared deviations) of a list of scores"""
+    if numpy is not None:
+        values = numpy.asarray(scores, dtype=numpy.float64)
+        mean = float(values.mean())
+        return mean, float(((values - mean) ** 2).sum())
+    mean = math.fsum(scores) / len(scores)
+    return mean, math.fsum((score - mean) ** 2 for score in scores)
+
+
+def sorted_merge(values, scores):
+    """array('d') holding the sorted values plus scores"""
+    if numpy is not None:
+        merged = numpy.concatenate((numpy.frombuffer(values, dtype=numpy.float64),
+                                    numpy.asarray(scores, dtype=numpy.float64)))
+        merged.sort(kind='stable')
+        return array('d', merged.tobytes())
+    # values is already sorted, so timsort mostly merges two runs
+    scores.sort()
+    return array('d', sorted(values.tolist() + scores))
+
+
+class ScoreColumn:
+    """Sorted scores of one test type with a running mean and variance"""
+
+    __slots__ = ('values', 'mean', 'm2')
+
+    def __init__(self):
+        self.values = array('d')
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def extend(self, scores):
+        count = len(self.values)
+        if len(scores) <= INSORT_LIMIT:
+            # Welford's update, one score at a time
+            for score in scores:
+                bisect.insort(self.values, score)
+                count += 1
+                delta = score - self.mean
+                self.mean += delta / count
+                self.m2 += delta * (score - self.mean)
+            return
+
+        # Chan et al.: combine the batch moments with the running ones
+        batch_mean, batch_m2 = batch_moments(scores)
+        total = count + len(scores)
+        delta = batch_mean - self.mean
+        self.mean += delta * len(scores) / total
+        self.m2 += batch_m2 + delta * delta * count * len(scores) / total
+        self.values = sorted_merge(self.values, scores)
+
+    def summary(self, percentiles=DEFAULT_PERCENTILES):
+        """count, mean, population std, min, max and percentiles"""
+        values = self.values
+        if not values:
+            return {'count': 0}
+        return {
+            'count': len(values),
+            'mean': self.mean,
+            'std': math.sqrt(max(self.m2, 0.0) / len(values)),
+            'min': values[0],
+            'max': values[-1],
+            'percentiles': {f'{percentile:g}': percentile_of_sorted(values, percentile)
+                            for percentile in percentiles}
+        }
+
+
+def z_score(score, summary):
+    if summary.get('count', 0) < 2 or not summary['std']:
+        return None
+    return (score - summary['mean']) / summary['std']
+
+
+class CohortStatistics:
+    """Per-test-type cohort statistics over every result in a ResultsIndex.
+
+    Scores live in memory as one sorted ScoreColumn per test type, caught up
+    from the index by row id whenever its version changes, so an ingest only
+    reads and merges the rows it added. A file indexed more than once, say
+    scanned and also uploaded, is counted once. Summaries are cached per set
+    of requested percentiles and dropped on every catch-up.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.columns = {}
+        self.last_id = 0
+        self.version = None
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def catch_up(self):
+        version = self.index.version
+        if version == self.version:
+            return
+        rows = self.index.connection().execute(
+            f'SELECT id, test_type, score FROM results WHERE id > ? AND {FIRST_COPY} ORDER BY id',
+            (self.last_id,)
+        )
+        new_scores = {}
+        for row_id, test_type, score in rows:
+            scores = new_scores.get(test_type)
+            if scores is None:
+                scores = new_scores[test_type] = []
+            scores.append(score)
+            self.last_id = row_id
+        for test_type, scores in new_scores.items():
+            column = self.columns.get(test_type)
+            if column is None:
+                column = self.columns[test_type] = ScoreColumn()
+            column.extend(scores)
+        self.version = version
+        self.cache = {}
+
+    def summaries(self, percentiles=DEFAULT_PERCENTILES):
+        """Summary dict per test type"""
+        percentiles = tuple(percentiles)
+        with self.lock:
+            self.catch_up()
+            cached = self.cache.get(percentiles)
+            if cached is None:
+                cached = self.cache[percentiles] = {
+                    test_type: column.summary(percentiles)
+                    for test_type, column in sorted(self.columns.items())
+                }
+            return cached
+
+    def participant_z_scores(self, participant, summaries):
+        """z-score of the participant's latest result for every test type"""
+        scores = {}
+        for result in self.index.latest_per_type(participant):
+            summary = summaries.get(result['testType'])
+            if summary is not None:
+                scores[result['testType']] = {
+                    'score': result['score'],
+                    'date': result['date'],
+                    'z': z_score(result['score'], summary)
+                }
+        return scores
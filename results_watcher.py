@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+# Events arriving this soon after the first one are handled in the same pass
+SETTLE_DELAY = 0.1
+
+
+class InotifyWatch:
+    """Directory watch backed by Linux inotify, called through ctypes"""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.paths = {}
+
+    def add(self, path):
+        """Watch path; returns False if it does not exist (yet)"""
+        if path in self.paths.values():
+            return True
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            return False
+        self.paths[wd] = path
+        return True
+
+    def wait(self, timeout):
+        """Block until something changes; returns the set of changed directories"""
+        changed = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            data = os.read(self.fd, 64 * 1024)
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size + length
+                path = self.paths.get(wd)
+                if path is None:
+                    continue
+                changed.add(path)
+                if mask & IN_IGNORED:
+                    # Directory removed or moved away; re-added once it returns
+                    del self.paths[wd]
+            ready, _, _ = select.select([self.fd], [], [], SETTLE_DELAY)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatch:
+    """Fallback watch comparing directory mtimes every interval.
+
+    Only sees files being added, removed or renamed; a file rewritten in
+    place is picked up the next time its directory changes.
+    """
+
+    def __init__(self):
+        self.mtimes = {}
+
+    def stat(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def add(self, path):
+        if path not in self.mtimes:
+            self.mtimes[path] = self.stat(path)
+        return self.mtimes[path] is not None
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        changed = set()
+        for path, mtime in self.mtimes.items():
+            current = self.stat(path)
+            if current != mtime:
+                self.mtimes[path] = current
+                changed.add(path)
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_watch():
+    """Use inotify where available, polling everywhere else"""
+    try:
+        return InotifyWatch()
+    except (OSError, AttributeError, TypeError) as e:
+        print(f"inotify unavailable ({e}), polling test folders instead")
+        return PollingWatch()
+
+
+class ResultsWatcher:
+    """Keeps TestFolderScanner results precomputed in a background thread.
+
+    The test folders are watched for new result files; on every change the
+    affected directories are invalidated in the scanner and a scan runs in
+    the background, which also scores and indexes new files. latest() then
+    only returns the stored results.
+    """
+
+    def __init__(self, scanner, interval=2.0, watch=None):
+        self.scanner = scanner
+        self.interval = interval
+        self.watch = watch
+        self.results = None
+        self.version = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def watched_paths(self):
+        base_dir = self.scanner.base_dir
+        paths = [base_dir]
+        for folder_path in self.scanner.test_folders.values():
+            folder_path = os.path.join(base_dir, folder_path)
+            parent = os.path.dirname(folder_path)
+            if parent not in paths:
+                paths.append(parent)
+            paths.append(folder_path)
+            paths.append(os.path.join(folder_path, 'data'))
+        return paths
+
+    def add_watches(self):
+        for path in self.watched_paths():
+            self.watch.add(path)
+
+    def refresh(self):
+        results = self.scanner.scan()
+        if results != self.results:
+            self.results = results
+            self.version += 1
+
+    def latest(self, keep=1):
+        """Most recent scan results; scans inline until the first refresh and
+        for anything but the newest file per folder"""
+        results = self.results
+        if results is None or keep != 1:
+            return self.scanner.scan(keep)
+        return results
+
+    def run(self):
+        self.add_watches()
+        while not self.stopped.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing test folder results: {e}")
+
+            changed = set()
+            while not changed and not self.stopped.is_set():
+                changed = self.watch.wait(self.interval)
+            for path in changed:
+                self.scanner.invalidate(path)
+            self.add_watches()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        if self.watch is None:
+            self.watch = open_watch()
+        self.thread = threading.Thread(target=self.run, name='results-watcher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.watch is not None:
+            self.watch.close()
+            self.watch = None
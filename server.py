@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import json
 import os
@@ -7,6 +7,18 @@ import xml.etree.ElementTree as ET
 from datetime import datetime
 import threading
 import time
+from activity_log import ActivityLog
+from customer_store import CustomerRepository
+from message_archive import MessageArchive, MessageRetention, archive_page_params, archive_page_response
+from sqlite_store import open_store
+
+customer_repository = CustomerRepository('customers.xml')
+users_store = open_store('users', 'users.json')
+messages_store = open_store('messages', 'messages.json')
+activity_store = open_store('activity', 'activity.json')
+activity_log = ActivityLog(activity_store)
+message_archive = MessageArchive()
+message_retention = MessageRetention(messages_store, message_archive)
 
 class CustomerHandler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -84,6 +96,11 @@ class CustomerHandler(BaseHTTPRequestHandler):
                 self.get_messages()
             else:
                 self.send_json_response({'error': 'Authentication required'}, 401)
+        elif parsed_path.path == '/api/messages/archive':
+            if self.is_authenticated():
+                self.get_message_archive()
+            else:
+                self.send_json_response({'error': 'Authentication required'}, 401)
         elif parsed_path.path == '/api/online-users':
             if self.is_authenticated():
                 self.get_online_users()
@@ -134,7 +151,7 @@ class CustomerHandler(BaseHTTPRequestHandler):
             self.update_user_access()
         elif parsed_path.path.startswith('/api/users/delete'):
             self.delete_user()
-elif parsed_path.path == '/api/messages':
+        elif parsed_path.path == '/api/messages':
             # Temporarily skip auth check for GET to debug
             if self.command == 'GET' or self.is_authenticated():
                 self.get_messages()
@@ -419,7 +436,7 @@ elif parsed_path.path == '/api/messages':
     
     def load_users(self):
         """Load users from file"""
-        if not os.path.exists('users.json'):
+        if not users_store.exists():
             # Create default users
             default_users = [
                 {'username': 'admin', 'password': 'admin123', 'email': 'admin@test.com', 'created_at': '2024-01-01'},
@@ -428,66 +445,27 @@ elif parsed_path.path == '/api/messages':
             self.save_users(default_users)
             return default_users
         
-        try:
-            with open('users.json', 'r') as f:
-                return json.load(f)
-        except:
-            return []
+        return users_store.load()
     
     def save_users(self, users):
         """Save users to file"""
-        with open('users.json', 'w') as f:
-            json.dump(users, f, indent=2)
+        users_store.save(users)
     
     def load_messages(self):
         """Load messages from file"""
-        if not os.path.exists('messages.json'):
-            return []
-        
-        try:
-            with open('messages.json', 'r') as f:
-                return json.load(f)
-        except:
-            return []
+        return messages_store.load()
     
     def load_activity_log(self):
         """Load user activity log"""
-        if not os.path.exists('activity.json'):
-            return []
-        
-        try:
-            with open('activity.json', 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    
-    def save_activity_log(self, activities):
-        """Save user activity log"""
-        with open('activity.json', 'w') as f:
-            json.dump(activities, f, indent=2)
+        return activity_log.recent()
     
     def log_activity(self, username, action):
-        """Log user login/logout activity"""
-        activities = self.load_activity_log()
-        
-        activity = {
-            'username': username,
-            'action': action,  # 'login' or 'logout'
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        activities.append(activity)
-        
-        # Keep only last 100 activities
-        if len(activities) > 100:
-            activities = activities[-100:]
-        
-        self.save_activity_log(activities)
+        """Log user login/logout activity; written to disk in the background"""
+        activity_log.log(username, action)
     
     def save_messages(self, messages):
         """Save messages to file"""
-        with open('messages.json', 'w') as f:
-            json.dump(messages, f, indent=2)
+        messages_store.save(messages)
     
     def get_messages(self):
         """Get all chat messages"""
@@ -523,16 +501,8 @@ elif parsed_path.path == '/api/messages':
                 'timestamp': datetime.now().isoformat()
             }
             
-            # Load existing messages
-            messages = self.load_messages()
-            
-            # Add new message (keep last 100 messages)
-            messages.append(new_message)
-            if len(messages) > 100:
-                messages = messages[-100:]
-            
-            # Save messages
-            self.save_messages(messages)
+            # Older messages are rolled into the archive rather than dropped
+            message_retention.append(new_message)
             
             self.send_json_response({
                 'message': 'Message sent successfully',
@@ -544,29 +514,22 @@ elif parsed_path.path == '/api/messages':
         except Exception as e:
             self.send_json_response({'error': 'Server error'}, 500)
     
+    def get_message_archive(self):
+        """Archived messages older than ?before=, oldest first"""
+        try:
+            before, limit = archive_page_params(parse_qs(urlparse(self.path).query))
+        except ValueError:
+            self.send_json_response({'error': 'limit must be a positive integer'}, 400)
+            return
+        try:
+            self.send_json_response(archive_page_response(message_archive, before, limit))
+        except Exception as e:
+            print(f"Error in get_message_archive: {e}")
+            self.send_json_response({'error': f'Server error: {str(e)}'}, 500)
+    
     def get_online_users(self):
-        """Get list of currently online users (based on recent logins)"""
-        activities = self.load_activity_log()
-        
-        # Get users who logged in recently and haven't logged out
-        ten_minutes_ago = datetime.now().timestamp() - 600
-        online_users = set()
-        
-        # Process activities in reverse order (newest first)
-        for activity in reversed(activities):
-            try:
-                activity_time = datetime.fromisoformat(activity['timestamp'].replace('Z', '+00:00')).timestamp()
-                if activity_time < ten_minutes_ago:
-                    continue  # Too old, skip
-                    
-                if activity['action'] == 'login':
-                    online_users.add(activity['username'])
-                elif activity['action'] == 'logout' and activity['username'] in online_users:
-                    online_users.remove(activity['username'])
-            except:
-                continue
-        
-        online_list = [{'username': user} for user in online_users]
+        """Get list of currently online users (latest activity a login in the last ten minutes)"""
+        online_list = [{'username': user} for user in activity_log.online_users()]
         self.send_json_response(online_list)
     
     def get_users(self):
@@ -592,10 +555,28 @@ elif parsed_path.path == '/api/messages':
         self.send_json_response({'error': 'User not found'}, 404)
     
     def get_customers(self):
-        customers = self.parse_xml_customers()
-        self.send_json_response(customers)
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            offset = int(query.get('offset', ['0'])[0])
+            limit = int(query['limit'][0]) if 'limit' in query else None
+        except ValueError:
+            self.send_json_response({'error': 'Invalid offset or limit'}, 400)
+            return
+        if offset < 0 or (limit is not None and limit <= 0):
+            self.send_json_response({'error': 'Invalid offset or limit'}, 400)
+            return
+
+        search = query.get('q', [''])[0].strip()
+        if search:
+            customers = customer_repository.search(search, offset, limit)
+        else:
+            # Paged requests only parse as far as the requested page
+            customers = customer_repository.page(offset, limit)
+        self.send_json_response([customer.to_dict() for customer in customers])
     
     def serve_xml(self):
+        # Fold pending registrations into the export before serving it
+        customer_repository.checkpoint()
         if not os.path.exists('customers.xml'):
             self.create_empty_xml()
         
@@ -613,32 +594,7 @@ elif parsed_path.path == '/api/messages':
         tree.write('customers.xml', encoding='utf-8', xml_declaration=True)
     
     def parse_xml_customers(self):
-        if not os.path.exists('customers.xml'):
-            return []
-        
-        tree = ET.parse('customers.xml')
-        root = tree.getroot()
-        
-        customers = []
-        for customer_elem in root.findall('customer'):
-            id_elem = customer_elem.find('id')
-            name_elem = customer_elem.find('name')
-            surname_elem = customer_elem.find('surname')
-            email_elem = customer_elem.find('email')
-            newsletter_elem = customer_elem.find('newsletter')
-            timestamp_elem = customer_elem.find('timestamp')
-            
-            customer = {
-                'id': int(id_elem.text) if id_elem is not None and id_elem.text else 0,
-                'name': name_elem.text if name_elem is not None and name_elem.text else '',
-                'surname': surname_elem.text if surname_elem is not None and surname_elem.text else '',
-                'email': email_elem.text if email_elem is not None and email_elem.text else '',
-                'newsletter': (newsletter_elem.text or 'false').lower() == 'true' if newsletter_elem is not None else False,
-                'timestamp': timestamp_elem.text if timestamp_elem is not None and timestamp_elem.text else ''
-            }
-            customers.append(customer)
-        
-        return customers
+        return [customer.to_dict() for customer in customer_repository.all()]
     
     def add_customer(self):
         try:
@@ -665,54 +621,21 @@ elif parsed_path.path == '/api/messages':
             self.send_json_response({'error': 'Server error'}, 500)
     
     def add_customer_to_xml(self, data):
-        # Load existing XML or create new
-        if os.path.exists('customers.xml'):
-            tree = ET.parse('customers.xml')
-            root = tree.getroot()
-        else:
-            root = ET.Element('customers')
-            tree = ET.ElementTree(root)
-        
-        # Get next ID
-        customers = self.parse_xml_customers()
-        next_id = max([c['id'] for c in customers], default=0) + 1
-        
-        # Create customer element
-        customer_elem = ET.SubElement(root, 'customer')
-        
-        id_elem = ET.SubElement(customer_elem, 'id')
-        id_elem.text = str(next_id)
-        
-        name_elem = ET.SubElement(customer_elem, 'name')
-        name_elem.text = data['name']
-        
-        surname_elem = ET.SubElement(customer_elem, 'surname')
-        surname_elem.text = data['surname']
-        
-        email_elem = ET.SubElement(customer_elem, 'email')
-        email_elem.text = data['email']
-        
-        newsletter_elem = ET.SubElement(customer_elem, 'newsletter')
-        newsletter_elem.text = str(data.get('newsletter', False)).lower()
-        
-        timestamp_elem = ET.SubElement(customer_elem, 'timestamp')
-        timestamp_elem.text = datetime.now().isoformat()
-        
-        # Save XML
-        tree.write('customers.xml', encoding='utf-8', xml_declaration=True)
-        
-        return {
-            'id': next_id,
-            'name': data['name'],
-            'surname': data['surname'],
-            'email': data['email'],
-            'newsletter': data.get('newsletter', False),
-            'timestamp': timestamp_elem.text
-        }
+        customer = customer_repository.add(
+            data['name'],
+            data['surname'],
+            data['email'],
+            data.get('newsletter', False),
+            datetime.now().isoformat()
+        )
+        return customer.to_dict()
 
 def run_server():
     server_address = ('0.0.0.0', 8080)
-    httpd = HTTPServer(server_address, CustomerHandler)
+    httpd = ThreadingHTTPServer(server_address, CustomerHandler)
+    customer_repository.start_checkpointer()
+    activity_log.start_writer()
+    threading.Thread(target=message_retention.roll, daemon=True).start()
     print('Server running at http://0.0.0.0:8080')
     print('Login: http://100.115.92.206:8080/')
     print('Dashboard: http://100.115.92.206:8080/dashboard')
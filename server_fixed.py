@@ -1,17 +1,70 @@
 #!/usr/bin/env python3
 import http.server
-import socketserver
 import json
 import os
 from urllib.parse import urlparse, parse_qs
 import http.cookies
 import cgi
 import io
+import itertools
 import re
+import threading
+from analytics.server import MOUNT_PREFIX, AnalyticsRoutes
+from sqlite_store import open_store
+from message_archive import MessageArchive, MessageRetention, archive_page_params, archive_page_response
+from message_search import MessageSearchIndex, search_params
+from mccb_results import (ParseExecutor, TestFolderScanner, UploadedResultBatch,
+                          determine_test_type, extract_score_from_xml, get_file_date)
+from multipart_stream import read_multipart
+from results_index import ResultsIndex
+from results_stats import DEFAULT_PERCENTILES, CohortStatistics
+from results_watcher import ResultsWatcher
 
-class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
-    # Class variable to track active sessions
+def create_services():
+    """Build the stores and services the handler uses.
+
+    Not done at import: the parse pool spawns its workers, which re-run this
+    file as __mp_main__, and they must not open the stores again.
+    """
+    global parse_executor, results_index, results_statistics, test_folder_scanner, test_folder_watcher
+    global users_store, messages_store, private_messages_store
+    global message_index, message_archive, message_retention
+    parse_executor = ParseExecutor()
+    results_index = ResultsIndex()
+    results_statistics = CohortStatistics(results_index)
+    test_folder_scanner = TestFolderScanner(executor=parse_executor, index=results_index)
+    test_folder_watcher = ResultsWatcher(test_folder_scanner)
+    users_store = open_store('users', 'users.json')
+    messages_store = open_store('messages', 'messages.json')
+    private_messages_store = open_store('private_messages', 'private_messages.json', default=dict)
+    message_index = MessageSearchIndex()
+    message_archive = MessageArchive(on_prune=message_index.remove_public_until)
+    message_retention = MessageRetention(messages_store, message_archive)
+    AnalyticsRoutes.create_state()
+
+
+class ResultFileSink:
+    """Collects one uploaded result XML and queues it for scoring.
+
+    The file is held whole until its batch is scored; UploadedResultBatch
+    bounds how much is buffered at once.
+    """
+    
+    def __init__(self, filename, batch):
+        self.filename = filename
+        self.batch = batch
+        self.chunks = []
+    
+    def feed(self, data):
+        self.chunks.append(data)
+    
+    def close(self):
+        self.batch.add(self.filename, b''.join(self.chunks))
+
+class CustomerListHandler(AnalyticsRoutes, http.server.SimpleHTTPRequestHandler):
+    # Class variable to track active sessions; request threads share it
     active_sessions = {}
+    sessions_lock = threading.Lock()
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -45,6 +98,14 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             else:
                 self.redirect_to_login()
                 return
+        elif parsed_path.path.startswith(MOUNT_PREFIX + '/'):
+            # Analytics backend routes, sharing this process's jobs and caches
+            if self.is_authenticated():
+                if not self.handle_analytics_get(parsed_path.path, parsed_path.query):
+                    self.send_json_response({'error': 'Endpoint not found'}, 404)
+            else:
+                self.send_json_response({'error': 'Authentication required'}, 401)
+            return
         elif parsed_path.path.startswith('/analytics/'):
             # Protect analytics directory - require authentication
             if self.is_authenticated():
@@ -60,6 +121,18 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
         elif parsed_path.path == '/api/messages':
             self.handle_get_messages()
             return
+        elif parsed_path.path == '/api/messages/archive':
+            if self.is_authenticated():
+                self.handle_get_message_archive()
+            else:
+                self.send_json_response({'error': 'Authentication required'}, 401)
+            return
+        elif parsed_path.path == '/api/messages/search':
+            if self.is_authenticated():
+                self.handle_search_messages()
+            else:
+                self.send_json_response({'error': 'Authentication required'}, 401)
+            return
         elif parsed_path.path == '/api/users':
             self.handle_get_users()
             return
@@ -78,6 +151,24 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
         elif parsed_path.path == '/api/online-users':
             self.handle_get_online_users()
             return
+        elif parsed_path.path == '/api/results/latest':
+            if self.is_authenticated():
+                self.handle_get_latest_results()
+            else:
+                self.send_json_response({'error': 'Authentication required'}, 401)
+            return
+        elif parsed_path.path == '/api/results/history':
+            if self.is_authenticated():
+                self.handle_get_results_history()
+            else:
+                self.send_json_response({'error': 'Authentication required'}, 401)
+            return
+        elif parsed_path.path == '/api/results/statistics':
+            if self.is_authenticated():
+                self.handle_get_results_statistics()
+            else:
+                self.send_json_response({'error': 'Authentication required'}, 401)
+            return
         elif parsed_path.path == '/api/logout':
             if self.is_authenticated():
                 self.handle_logout()
@@ -131,17 +222,8 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             # Try to serve static files
             return super().do_GET()
     
-    def send_cors_headers(self):
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-    
     def send_json_response(self, data, status_code=200):
-        self.send_response(status_code)
-        self.send_header('Content-type', 'application/json')
-        self.send_cors_headers()
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.send_json(data, status_code)
     
     def is_authenticated(self):
         """Check if user is authenticated via session cookie"""
@@ -222,12 +304,14 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
                         print(f"Found username in form data: {username}")
                         
                         # Verify this user has recent session activity
-                        if username in CustomerListHandler.active_sessions:
+                        with CustomerListHandler.sessions_lock:
+                            session_users = list(CustomerListHandler.active_sessions.keys())
+                        if username in session_users:
                             print(f"User {username} has active session")
-                            print(f"Active sessions: {list(CustomerListHandler.active_sessions.keys())}")
+                            print(f"Active sessions: {session_users}")
                         else:
                             print(f"User {username} has no active session")
-                            print(f"Available sessions: {list(CustomerListHandler.active_sessions.keys())}")
+                            print(f"Available sessions: {session_users}")
                             username = None
                     else:
                         print("No auth_username found in form data")
@@ -244,7 +328,9 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
                 cutoff_time = datetime.now() - timedelta(minutes=15)
                 
                 # If any session was active recently, allow authentication
-                for session_user, last_seen in CustomerListHandler.active_sessions.items():
+                with CustomerListHandler.sessions_lock:
+                    sessions = list(CustomerListHandler.active_sessions.items())
+                for session_user, last_seen in sessions:
                     last_seen_time = datetime.fromisoformat(last_seen)
                     if last_seen_time > cutoff_time:
                         print(f"Found recent active session for: {session_user}")
@@ -272,9 +358,19 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
     def update_session_activity(self, username):
         """Update user's session activity to prevent timeout"""
         from datetime import datetime
-        CustomerListHandler.active_sessions[username] = datetime.now().isoformat()
+        with CustomerListHandler.sessions_lock:
+            CustomerListHandler.active_sessions[username] = datetime.now().isoformat()
         print(f"Updated session activity for: {username}")
     
+    def end_session(self, username, last_seen=None):
+        """Drop a user's session; with last_seen, only if it was not renewed since"""
+        with CustomerListHandler.sessions_lock:
+            current = CustomerListHandler.active_sessions.get(username)
+            if current is None or (last_seen is not None and current != last_seen):
+                return False
+            del CustomerListHandler.active_sessions[username]
+            return True
+    
     def redirect_to_login(self):
         """Redirect user to login page"""
         self.send_response(302)
@@ -305,25 +401,22 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             username = data.get('username')
             password = data.get('password')
             
-            # Load users from file
-            users = self.load_users()
-            
-            user_found = False
-            logged_user = None
-            for user in users:
-                if user['username'] == username and user['password'] == password:
-                    user_found = True
-                    logged_user = user
-                    break
+            from datetime import datetime
             
-            if user_found and logged_user:
+            def record_login(users):
                 # Update lastSeen for the logged-in user
-                from datetime import datetime
-                logged_user['lastSeen'] = datetime.now().isoformat()
-                self.save_users(users)
-                
+                for user in users:
+                    if user['username'] == username and user['password'] == password:
+                        user['lastSeen'] = datetime.now().isoformat()
+                        return user
+                return None
+            
+            logged_user = self.update_users(record_login)
+            
+            if logged_user:
                 # Track active session
-                CustomerListHandler.active_sessions[username] = datetime.now().isoformat()
+                with CustomerListHandler.sessions_lock:
+                    CustomerListHandler.active_sessions[username] = datetime.now().isoformat()
                 
                 # Add login notification to chat
                 self.add_system_message(f"{username} has logged in")
@@ -351,6 +444,38 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
         except Exception as e:
             self.send_json_response({'error': str(e)}, 500)
     
+    def handle_get_message_archive(self):
+        """Archived messages older than ?before=, oldest first"""
+        try:
+            before, limit = archive_page_params(parse_qs(urlparse(self.path).query))
+        except ValueError:
+            self.send_json_response({'error': 'limit must be a positive integer'}, 400)
+            return
+        try:
+            self.send_json_response(archive_page_response(message_archive, before, limit))
+        except Exception as e:
+            self.send_json_response({'error': str(e)}, 500)
+    
+    def handle_search_messages(self):
+        """Public and the caller's private messages matching ?q=, newest first"""
+        try:
+            q, offset, limit, scope = search_params(parse_qs(urlparse(self.path).query))
+        except ValueError as e:
+            self.send_json_response({'error': str(e)}, 400)
+            return
+        try:
+            hits, has_more = message_index.search(q, self.get_username_from_cookie(), offset, limit, scope)
+            self.send_json_response({
+                'query': q,
+                'scope': scope,
+                'offset': offset,
+                'limit': limit,
+                'hasMore': has_more,
+                'hits': [{'type': kind, 'message': message} for message, kind in hits]
+            })
+        except Exception as e:
+            self.send_json_response({'error': str(e)}, 500)
+    
     def handle_add_message(self):
         try:
             content_type = self.headers.get('Content-Type', '')
@@ -432,9 +557,7 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
                 post_data = self.rfile.read(content_length)
                 message_data = json.loads(post_data.decode('utf-8'))
             
-            messages = self.load_messages()
-            messages.append(message_data)
-            self.save_messages(messages)
+            self.append_message(message_data)
             
             # For file uploads, always set the session cookie to preserve authentication
             if 'multipart/form-data' in content_type:
@@ -465,14 +588,12 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
     def add_system_message(self, content):
         try:
             from datetime import datetime
-            messages = self.load_messages()
             system_message = {
                 'username': 'SYSTEM',
                 'content': content,
                 'timestamp': datetime.now().isoformat()
             }
-            messages.append(system_message)
-            self.save_messages(messages)
+            self.append_message(system_message)
         except Exception as e:
             print(f"Error adding system message: {e}")
     
@@ -491,20 +612,22 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             cutoff_time = datetime.now() - timedelta(minutes=15)
             active_usernames = []
             
-            print(f"Active sessions before cleanup: {len(CustomerListHandler.active_sessions)}")
+            with CustomerListHandler.sessions_lock:
+                sessions = list(CustomerListHandler.active_sessions.items())
+            print(f"Active sessions before cleanup: {len(sessions)}")
             
-            for username, last_seen in CustomerListHandler.active_sessions.items():
+            for username, last_seen in sessions:
                 try:
                     last_seen_time = datetime.fromisoformat(last_seen)
                     if last_seen_time > cutoff_time:
                         active_usernames.append(username)
                     else:
-                        # Remove inactive session
-                        del CustomerListHandler.active_sessions[username]
+                        # Remove inactive session, unless it was renewed meanwhile
+                        self.end_session(username, last_seen)
                         print(f"Removed inactive session for: {username}")
                 except:
                     # Remove malformed session
-                    del CustomerListHandler.active_sessions[username]
+                    self.end_session(username, last_seen)
                     print(f"Removed malformed session for: {username}")
             
             print(f"Active sessions after cleanup: {len(active_usernames)}")
@@ -580,22 +703,17 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             self.send_json_response({'error': str(e)}, 500)
     
     def load_users(self):
-        try:
-            with open('users.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
+        return users_store.load()
     
     def load_messages(self):
-        try:
-            with open('messages.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
+        return messages_store.load()
     
     def save_messages(self, messages):
-        with open('messages.json', 'w') as f:
-            json.dump(messages, f, indent=2)
+        messages_store.save(messages)
+    
+    def append_message(self, message):
+        message_retention.append(message)
+        message_index.add_public(message)
     
     def load_customers(self):
         try:
@@ -626,17 +744,14 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             username = data.get('username')
             access_granted = data.get('accessGranted')
             
-            users = self.load_users()
-            user_found = False
-            
-            for user in users:
-                if user['username'] == username:
-                    user['accessGranted'] = access_granted
-                    user_found = True
-                    break
+            def grant_access(users):
+                for user in users:
+                    if user['username'] == username:
+                        user['accessGranted'] = access_granted
+                        return True
+                return False
             
-            if user_found:
-                self.save_users(users)
+            if self.update_users(grant_access):
                 self.send_json_response({'success': True, 'message': 'Access updated successfully'})
             else:
                 self.send_json_response({'error': 'User not found'}, 404)
@@ -653,14 +768,6 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             email = data.get('email')
             password = data.get('password')
             
-            users = self.load_users()
-            
-            # Check if user already exists
-            for user in users:
-                if user['username'] == username:
-                    self.send_json_response({'error': 'Username already exists'}, 400)
-                    return
-            
             # Create new user
             from datetime import datetime
             new_user = {
@@ -672,8 +779,16 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
                 'created_at': data.get('createdAt', datetime.now().isoformat())
             }
             
-            users.append(new_user)
-            self.save_users(users)
+            def add_user(users):
+                # Check if user already exists
+                if any(user['username'] == username for user in users):
+                    return False
+                users.append(new_user)
+                return True
+            
+            if not self.update_users(add_user):
+                self.send_json_response({'error': 'Username already exists'}, 400)
+                return
             
             self.send_json_response({'success': True, 'message': 'User registered successfully'})
         except Exception as e:
@@ -687,14 +802,14 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             
             username = data.get('username')
             
-            users = self.load_users()
-            original_length = len(users)
+            def remove_user(users):
+                remaining = [user for user in users if user['username'] != username]
+                if len(remaining) == len(users):
+                    return False
+                users[:] = remaining
+                return True
             
-            # Remove user
-            users = [user for user in users if user['username'] != username]
-            
-            if len(users) < original_length:
-                self.save_users(users)
+            if self.update_users(remove_user):
                 self.send_json_response({'success': True, 'message': f'User "{username}" deleted successfully'})
             else:
                 self.send_json_response({'error': 'User not found'}, 404)
@@ -702,8 +817,11 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             self.send_json_response({'error': str(e)}, 500)
     
     def save_users(self, users):
-        with open('users.json', 'w') as f:
-            json.dump(users, f, indent=2)
+        users_store.save(users)
+    
+    def update_users(self, fn):
+        """Read-modify-write the users list under the store lock; see JSONStore.update"""
+        return users_store.update(fn)
     
     def handle_logout(self):
         try:
@@ -712,8 +830,7 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             
             if username:
                 # Remove from active sessions
-                if username in CustomerListHandler.active_sessions:
-                    del CustomerListHandler.active_sessions[username]
+                if self.end_session(username):
                     print(f"Logged out and removed session for: {username}")
                 
                 # Add logout notification to chat
@@ -721,7 +838,7 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             
             # Remove from active sessions
             if username != "Unknown user":
-                CustomerListHandler.active_sessions.pop(username, None)
+                self.end_session(username)
             
             # Add logout notification to chat
             self.add_system_message(f"{username} has logged out")
@@ -838,25 +955,12 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
                 from datetime import datetime
                 message_data['timestamp'] = datetime.now().isoformat()
             
-            # Save private message
-            private_messages = self.load_private_messages()
+            # Save private message, plus a copy in the sender's sent messages
             to_user = message_data['to_user']
-            
-            if to_user not in private_messages:
-                private_messages[to_user] = []
-            
-            private_messages[to_user].append(message_data)
-            
-            # Also save to sender's sent messages
-            if from_user not in private_messages:
-                private_messages[from_user] = []
-            
-            # Mark as sent message for sender
             sender_message = message_data.copy()
             sender_message['sent'] = 'true'
-            private_messages[from_user].append(sender_message)
-            
-            self.save_private_messages(private_messages)
+            self.append_private_messages([(to_user, message_data), (from_user, sender_message)])
+            message_index.add_private(message_data)
             
             print(f"Private message sent: {message_data}")
             self.send_json_response({'success': True, 'message': message_data})
@@ -899,23 +1003,30 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
         
         return None
     
+    def analytics_user(self, requested):
+        """Analytics data is stored under the logged-in user"""
+        return self.get_username_from_cookie() or super().analytics_user(requested)
+    
+    def analytics_is_admin(self):
+        """Clearing data and listing every job are for admins on the shared deployment"""
+        username = self.get_username_from_cookie()
+        return bool(username) and self.is_admin(username)
+    
     def load_private_messages(self):
         """Load private messages from file"""
-        try:
-            import os
-            if os.path.exists('private_messages.json'):
-                with open('private_messages.json', 'r') as f:
-                    return json.load(f)
-        except:
-            pass
-        return {}
+        return private_messages_store.load()
     
     def save_private_messages(self, messages):
         """Save private messages to file"""
         try:
-            import os
-            with open('private_messages.json', 'w') as f:
-                json.dump(messages, f, indent=2)
+            private_messages_store.save(messages)
+        except Exception as e:
+            print(f"Error saving private messages: {e}")
+    
+    def append_private_messages(self, pairs):
+        """File each (owner, message) pair under its owner's conversation"""
+        try:
+            private_messages_store.append_to(pairs)
         except Exception as e:
             print(f"Error saving private messages: {e}")
     
@@ -935,9 +1046,11 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
                 # Update last seen time for this session
                 from datetime import datetime
                 current_time = datetime.now().isoformat()
-                CustomerListHandler.active_sessions[username] = current_time
+                with CustomerListHandler.sessions_lock:
+                    CustomerListHandler.active_sessions[username] = current_time
+                    session_count = len(CustomerListHandler.active_sessions)
                 print(f"Heartbeat from {username} at {current_time}")
-                print(f"Total active sessions: {len(CustomerListHandler.active_sessions)}")
+                print(f"Total active sessions: {session_count}")
                 self.send_json_response({'status': 'active', 'timestamp': current_time})
             else:
                 cookie_header = self.headers.get('Cookie', 'No cookie')
@@ -949,81 +1062,28 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             traceback.print_exc()
             self.send_json_response({'error': str(e)}, 500)
     
+    def get_keep_param(self):
+        """?keep=k on the result endpoints: how many results to keep per test type"""
+        keep = int(parse_qs(urlparse(self.path).query).get('keep', ['1'])[0])
+        if keep < 1:
+            raise ValueError('keep must be at least 1')
+        return keep
+    
     def handle_scan_test_folders(self):
         """Scan test folders and find latest test results to determine pass/fail status"""
         try:
-            import os
-            import glob
-            from datetime import datetime
-            import xml.etree.ElementTree as ET
-            
-            # Define test folder mappings
-            test_folders = {
-                'BACS Symbol Coding': 'tests/mccb-001-symbol-coding',
-                'Animal Naming': 'tests/mccb-002-animal_naming',
-                'Trail Making': 'tests/mccb-003-trail-making',
-                'CPT-IP': 'tests/mccb-004-cpt-ip',
-                'WMS-III Spatial Span': 'tests/mccb-005-wms-iii-spatial-span',
-                'Letter-Number Span': 'tests/mccb-006-letter-number-span',
-                'HVLT-R': 'tests/mccb-007-hvlt-r',
-                'BVMT-R': 'tests/mccb-008-bvmt-r',
-                'NAB Mazes': 'tests/mccb-009-nab-mazes'
-            }
-            
-            results = []
-            
-            for test_name, folder_path in test_folders.items():
-                if not os.path.exists(folder_path):
-                    continue
-                
-                # Find XML files in main folder first
-                xml_files = glob.glob(os.path.join(folder_path, '*.xml'))
-                
-                # If no XML files in main folder, check data subdirectory
-                if not xml_files:
-                    data_path = os.path.join(folder_path, 'data')
-                    if os.path.exists(data_path):
-                        xml_files = glob.glob(os.path.join(data_path, '*.xml'))
-                if not xml_files:
-                    results.append({
-                        'testType': test_name,
-                        'score': 0,
-                        'date': 'No data',
-                        'status': 'No file found'
-                    })
-                    continue
-                
-                # Get the latest file by modification time
-                latest_file = max(xml_files, key=os.path.getmtime)
-                file_date = datetime.fromtimestamp(os.path.getmtime(latest_file)).strftime('%Y-%m-%d')
-                
-                # Parse XML to extract score
-                try:
-                    tree = ET.parse(latest_file)
-                    root = tree.getroot()
-                    
-                    # Extract score based on test type
-                    score = self.extract_score_from_xml(root, test_name)
-                    
-                    results.append({
-                        'testType': test_name,
-                        'score': score,
-                        'date': file_date,
-                        'status': 'Found data'
-                    })
-                    
-                except Exception as e:
-                    results.append({
-                        'testType': test_name,
-                        'score': 0,
-                        'date': file_date,
-                        'status': f'Parse error: {str(e)}'
-                    })
+            keep = self.get_keep_param()
+        except ValueError:
+            self.send_json_response({'error': 'keep must be a positive integer'}, 400)
+            return
+        
+        try:
+            results = test_folder_watcher.latest(keep)
             
             self.send_json_response({
                 'success': True,
                 'results': results,
-                'message': f'Scanned {len(results)} test folders'
+                'message': f'Scanned {len(set(result["testType"] for result in results))} test folders'
             })
             
         except Exception as e:
@@ -1034,72 +1094,116 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
     
     def extract_score_from_xml(self, root, test_type):
         """Extract percentage score from XML based on test type"""
+        return extract_score_from_xml(root, test_type)
+    
+    def is_admin(self, username):
+        for user in self.load_users():
+            if user['username'] == username:
+                return user.get('role') == 'admin'
+        return False
+    
+    def get_results_participant(self, query):
+        """Participant whose results a request may read, None meaning everyone.
+        
+        Admins may ask for any participant or all of them; everyone else
+        only gets their own results. Raises PermissionError when a non-admin
+        asks for someone else.
+        """
+        requested = query.get('participant', [None])[0]
+        username = self.get_username_from_cookie()
+        if username and self.is_admin(username):
+            return requested
+        if requested is not None and requested != username:
+            raise PermissionError('Only admins can read other participants\' results')
+        return username or ''
+    
+    def handle_get_latest_results(self):
+        """Latest indexed result per test type, optionally for one participant"""
         try:
-            if test_type == 'BACS Symbol Coding':
-                percentage_elem = root.find('.//Percentage')
-                return float(percentage_elem.text) if percentage_elem is not None else 0
-            
-            elif test_type == 'Animal Naming':
-                # Look for percentage or calculate from correct/total
-                percentage_elem = root.find('.//Percentage')
-                if percentage_elem is not None:
-                    return float(percentage_elem.text)
-                
-                # Alternative: calculate from score/max
-                score_elem = root.find('.//Score')
-                max_elem = root.find('.//Max')
-                if score_elem is not None and max_elem is not None:
-                    return (float(score_elem.text) / float(max_elem.text)) * 100
-                return 0
-            
-            elif test_type == 'Trail Making':
-                percentage_elem = root.find('.//Percentage')
-                return float(percentage_elem.text) if percentage_elem is not None else 0
-            
-            elif test_type == 'CPT-IP':
-                percentage_elem = root.find('.//Percentage')
-                return float(percentage_elem.text) if percentage_elem is not None else 0
-            
-            elif test_type == 'WMS-III Spatial Span':
-                score_elem = root.find('.//Score')
-                max_elem = root.find('.//Max')
-                if score_elem is not None and max_elem is not None:
-                    return (float(score_elem.text) / float(max_elem.text)) * 100
-                return 0
-            
-            elif test_type == 'Letter-Number Span':
-                score_elem = root.find('.//Score')
-                max_elem = root.find('.//Max')
-                if score_elem is not None and max_elem is not None:
-                    return (float(score_elem.text) / float(max_elem.text)) * 100
-                return 0
-            
-            elif test_type == 'HVLT-R':
-                percentage_elem = root.find('.//Percentage')
-                return float(percentage_elem.text) if percentage_elem is not None else 0
-            
-            elif test_type == 'BVMT-R':
-                percentage_elem = root.find('.//Percentage')
-                return float(percentage_elem.text) if percentage_elem is not None else 0
-            
-            elif test_type == 'NAB Mazes':
-                score_elem = root.find('.//Score')
-                max_elem = root.find('.//Max')
-                if score_elem is not None and max_elem is not None:
-                    return (float(score_elem.text) / float(max_elem.text)) * 100
-                return 0
-            
-            return 0
-            
-        except Exception:
-            return 0
+            keep = self.get_keep_param()
+        except ValueError:
+            self.send_json_response({'error': 'keep must be a positive integer'}, 400)
+            return
+        
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            participant = self.get_results_participant(query)
+        except PermissionError as e:
+            self.send_json_response({'error': str(e)}, 403)
+            return
+        
+        try:
+            results = results_index.latest_per_type(participant, keep)
+            self.send_json_response({'success': True, 'results': results})
+        except Exception as e:
+            self.send_json_response({'success': False, 'error': str(e)}, 500)
+    
+    def handle_get_results_history(self):
+        """Score time series per test type, aggregated per day or week"""
+        query = parse_qs(urlparse(self.path).query)
+        test_type = query.get('testType', [None])[0]
+        try:
+            participant = self.get_results_participant(query)
+        except PermissionError as e:
+            self.send_json_response({'error': str(e)}, 403)
+            return
+        bucket = query.get('bucket', ['day'])[0]
+        start = query.get('from', [None])[0]
+        end = query.get('to', [None])[0]
+        try:
+            max_points = query.get('points', [None])[0]
+            if max_points is not None:
+                max_points = int(max_points)
+                if max_points < 1:
+                    raise ValueError
+        except ValueError:
+            self.send_json_response({'error': 'points must be a positive integer'}, 400)
+            return
+        if bucket not in ('day', 'week'):
+            self.send_json_response({'error': 'bucket must be day or week'}, 400)
+            return
+        
+        try:
+            test_types = [test_type] if test_type else results_index.test_types()
+            series = {
+                name: results_index.aggregate_history(name, participant, bucket, start, end, max_points)
+                for name in test_types
+            }
+            self.send_json_response({'success': True, 'bucket': bucket, 'series': series})
+        except Exception as e:
+            self.send_json_response({'success': False, 'error': str(e)}, 500)
+    
+    def handle_get_results_statistics(self):
+        """Cohort statistics per test type, with z-scores for one participant"""
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            participant = self.get_results_participant(query) if 'participant' in query else None
+        except PermissionError as e:
+            self.send_json_response({'error': str(e)}, 403)
+            return
+        try:
+            percentiles = DEFAULT_PERCENTILES
+            if 'percentiles' in query:
+                percentiles = [float(value) for value in query['percentiles'][0].split(',')]
+                if not all(0 <= value <= 100 for value in percentiles):
+                    raise ValueError
+        except ValueError:
+            self.send_json_response({'error': 'percentiles must be numbers between 0 and 100'}, 400)
+            return
+        
+        try:
+            statistics = results_statistics.summaries(percentiles)
+            response = {'success': True, 'statistics': statistics}
+            if participant is not None:
+                response['participant'] = participant
+                response['zScores'] = results_statistics.participant_z_scores(participant, statistics)
+            self.send_json_response(response)
+        except Exception as e:
+            self.send_json_response({'success': False, 'error': str(e)}, 500)
     
     def handle_process_folder_files(self):
         """Process XML files from user-selected folder"""
         try:
-            import io
-            import cgi
-            
             # Parse multipart form data
             content_type = self.headers.get('Content-Type', '')
             
@@ -1108,103 +1212,39 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
                 return
             
             # Extract boundary from content type
-            boundary = content_type.split('boundary=')[1].encode()
-            
-            # Read and parse the multipart data
+            boundary = content_type.split('boundary=')[1].split(';')[0].strip('"')
             content_length = int(self.headers['Content-Length'])
-            data = self.rfile.read(content_length)
-            
-            # Simple parsing to extract files
-            all_results = []
-            parts = data.split(b'--' + boundary)
-            
-            for part in parts:
-                if b'Content-Disposition: form-data' in part and b'filename=' in part:
-                    # Extract filename and content
-                    lines = part.split(b'\r\n')
-                    filename = None
-                    file_content = None
-                    
-                    for line in lines:
-                        if b'filename=' in line:
-                            # Extract filename
-                            filename_part = line.split(b'filename=')[1]
-                            filename = filename_part.strip(b'"').decode('utf-8')
-                        elif line.strip() == b'' and file_content is None:
-                            # Found empty line, content starts after this
-                            content_start = lines.index(line) + 1
-                            file_content = b'\r\n'.join(lines[content_start:])
-                            # Remove trailing boundary markers
-                            if file_content.endswith(b'\r\n'):
-                                file_content = file_content[:-2]
-                            break
-                    
-                    with open('debug.log', 'a') as f:
-                        f.write(f"Final filename: {filename}\n")
-                        f.write(f"Ends with .xml: {filename.endswith('.xml') if filename else 'No filename'}\n")
-                    
-                    if filename and filename.endswith('.xml'):
-                        # Parse XML content to extract score
-                        try:
-                            import xml.etree.ElementTree as ET
-                            # Convert bytes to string for XML parsing
-                            xml_string = file_content.decode('utf-8') if file_content else ''
-                            print(f"XML content length for {filename}: {len(xml_string)}")
-                            
-                            root = ET.fromstring(xml_string)
-                            
-                            # Determine test type and extract score
-                            test_type = self.determine_test_type(filename, root)
-                            score = self.extract_score_from_xml(root, test_type)
-                            file_date = self.get_file_date(filename)
-                            
-                            result = {
-                                'testType': test_type,
-                                'score': score,
-                                'date': file_date,
-                                'filename': filename,
-                                'status': 'Processed'
-                            }
-                            all_results.append(result)
-                            print(f"Added result: {result}")
-                            
-                        except Exception as e:
-                            print(f"Error parsing XML {filename}: {e}")
-                            xml_string = file_content.decode('utf-8') if file_content else ''
-                            preview = xml_string[:200] if xml_string else 'No content'
-                            print(f"XML content preview: {preview}")
-                            print(f"XML content preview: {xml_string[:200] if xml_string else 'No content'}")
-
             
-            # Group by test type and keep only the most recent result for each
-            results_by_type = {}
-            
-            for result in all_results:
-                test_type = result['testType']
-                if test_type not in results_by_type:
-                    results_by_type[test_type] = []
-                results_by_type[test_type].append(result)
-            
-            # Keep only most recent result for each test type
-            final_results = []
-            for test_type, results in results_by_type.items():
-                if len(results) == 1:
-                    final_results.append(results[0])
-                else:
-                    # Sort by date (most recent first) and take the first one
-                    sorted_results = sorted(results, key=lambda x: (
-                        x['date'],  # Primary sort by date
-                        x.get('filename', '')  # Secondary sort by filename as fallback
-                    ), reverse=True)
-                    final_results.append(sorted_results[0])
+            try:
+                keep = self.get_keep_param()
+            except ValueError:
+                self.send_json_response({'error': 'keep must be a positive integer'}, 400)
+                return
             
-            results = final_results
+            # Parts are read from the socket one at a time and scored in
+            # batches, fanned out to the parse pool when a batch is large.
+            # Every scored batch goes to the results index; only the keep
+            # most recent results per test type are held for the response.
+            participant = self.get_username_from_cookie() or ''
+            batch = UploadedResultBatch(
+                parse_executor, keep,
+                on_scored=lambda scored: results_index.add_results(scored, participant, source='upload')
+            )
+            
+            def on_part(headers):
+                filename = headers.get('filename')
+                if not filename or not filename.endswith('.xml'):
+                    return None
+                return ResultFileSink(filename, batch)
+            
+            read_multipart(self.rfile, boundary, content_length, on_part)
+            results = batch.flush()
             
             self.send_json_response({
                 'success': True,
                 'results': results,
                 'processed': len(results),
-                'message': f'Processed {len(results)} XML files ({len(all_results)} total files, kept most recent per test type)'
+                'message': f'Processed {len(results)} XML files ({batch.processed} total files, kept most recent per test type)'
             })
             
         except Exception as e:
@@ -1218,56 +1258,11 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
     
     def determine_test_type(self, filename, root):
         """Determine test type based on filename or XML content"""
-        filename_lower = filename.lower()
-        
-        if 'bacs' in filename_lower or 'symbol' in filename_lower:
-            return 'BACS Symbol Coding'
-        elif 'animal' in filename_lower:
-            return 'Animal Naming'
-        elif 'trail' in filename_lower:
-            return 'Trail Making'
-        elif 'cpt' in filename_lower:
-            return 'CPT-IP'
-        elif 'wms' in filename_lower or 'spatial' in filename_lower:
-            return 'WMS-III Spatial Span'
-        elif 'letter' in filename_lower or 'span' in filename_lower:
-            return 'Letter-Number Span'
-        elif 'hvlt' in filename_lower:
-            return 'HVLT-R'
-        elif 'bvmt' in filename_lower:
-            return 'BVMT-R'
-        elif 'nab' in filename_lower or 'maze' in filename_lower:
-            return 'NAB Mazes'
-        else:
-            return 'Unknown Test'
+        return determine_test_type(filename, root)
     
     def get_file_date(self, filename):
         """Extract date from filename or use current date"""
-        import re
-        from datetime import datetime
-        
-        # Look for date patterns in filename
-        date_patterns = [
-            r'(\d{4}-\d{2}-\d{2})',  # YYYY-MM-DD
-            r'(\d{2}-\d{2}-\d{4})',  # MM-DD-YYYY
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, filename)
-            if match:
-                date_str = match.group(1)
-                try:
-                    # Try to parse and format consistently
-                    if len(date_str.split('-')[0]) == 4:  # YYYY-MM-DD
-                        return date_str
-                    else:  # MM-DD-YYYY, convert to YYYY-MM-DD
-                        parts = date_str.split('-')
-                        return f"{parts[2]}-{parts[0]:0>2}-{parts[1]:0>2}"
-                except:
-                    pass
-        
-        # Return current date if no date found
-        return datetime.now().strftime('%Y-%m-%d')
+        return get_file_date(filename)
     
     def do_POST(self):
         parsed_path = urlparse(self.path)
@@ -1349,6 +1344,15 @@ class CustomerListHandler(http.server.SimpleHTTPRequestHandler):
             else:
                 self.send_json_response({'error': 'Authentication required'}, 401)
             return
+        elif parsed_path.path.startswith(MOUNT_PREFIX + '/'):
+            if self.is_authenticated():
+                content_length = int(self.headers.get('Content-Length', 0))
+                post_data = self.rfile.read(content_length)
+                if not self.handle_analytics_post(parsed_path.path, post_data):
+                    self.send_json_response({'error': 'Endpoint not found'}, 404)
+            else:
+                self.send_json_response({'error': 'Authentication required'}, 401)
+            return
         elif parsed_path.path == '/api/process-folder-files':
             with open('debug.log', 'a') as f:
                 f.write(f"Received POST to /api/process-folder-files\n")
@@ -1384,7 +1388,21 @@ if __name__ == '__main__':
     hostname = socket.gethostname()
     local_ip = socket.gethostbyname(hostname)
     
-    with socketserver.TCPServer(("", PORT), Handler) as httpd:
+    create_services()
+    # Keep test folder scan results precomputed in the background
+    test_folder_watcher.start()
+    # Index chat history added since the last run, then roll what is beyond
+    # the hot window into the archive
+    indexed = message_index.build(itertools.chain(message_archive.messages(), messages_store.load()),
+                                  private_messages_store.load())
+    print(f"Indexed {indexed} new chat messages for search")
+    threading.Thread(target=message_retention.roll, daemon=True).start()
+    # Load the cohort score columns before the first statistics request
+    threading.Thread(target=results_statistics.summaries, daemon=True).start()
+    
+    # One thread per request, so analytics job polling and quick API calls
+    # are not queued behind slow uploads or scans
+    with http.server.ThreadingHTTPServer(("", PORT), Handler) as httpd:
         print(f"Server running on port {PORT}")
         print(f"Local access: http://localhost:{PORT}")
         print(f"Network access: http://{local_ip}:{PORT}")
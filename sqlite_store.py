@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+import copy
+import json
+import os
+import sqlite3
+import threading
+
+from json_store import JSONStore
+
+STORAGE_DB = 'mccb_storage.db'
+
+# Every table holds one JSON document per row, plus the columns it is
+# looked up by; owner is the conversation a private message is filed under
+RECORD_TABLES = ('users', 'messages', 'private_messages', 'activity')
+
+TABLE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT '',
+    username TEXT NOT NULL DEFAULT '',
+    timestamp TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {table}_username ON {table} (username, timestamp);
+CREATE INDEX IF NOT EXISTS {table}_timestamp ON {table} (timestamp);
+'''
+
+SCHEMA = '''
+-- Stores written at least once, so an emptied table is not mistaken for a new one
+CREATE TABLE IF NOT EXISTS stores (name TEXT PRIMARY KEY) WITHOUT ROWID;
+''' + ''.join(TABLE_SCHEMA.format(table=table) for table in RECORD_TABLES) + '''
+CREATE INDEX IF NOT EXISTS private_messages_owner ON private_messages (owner, id);
+'''
+
+
+def record_row(item, owner=''):
+    username = item.get('username') or item.get('from_user') or ''
+    return (owner, username, item.get('timestamp') or '', json.dumps(item))
+
+
+class StorageDatabase:
+    """SQLite database behind the SQLite stores; one connection per thread,
+    WAL mode so readers never wait for the writer"""
+
+    def __init__(self, path=STORAGE_DB):
+        self.path = path
+        self.local = threading.local()
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+
+class SQLiteListStore:
+    """A list of JSON records in one table, with the JSONStore interface.
+
+    load() returns an in-memory copy filled from the table on first use;
+    append() inserts a single row instead of rewriting everything. Like
+    ResultsIndex, the copy assumes this process is the only writer.
+    """
+
+    def __init__(self, database, table):
+        if table not in RECORD_TABLES:
+            raise ValueError(f'Unknown table: {table}')
+        self.database = database
+        self.table = table
+        self.data = None
+        # Reentrant so update() can load and save while holding it
+        self.lock = threading.RLock()
+
+    def exists(self):
+        row = self.database.connection().execute(
+            'SELECT 1 FROM stores WHERE name = ?', (self.table,)
+        ).fetchone()
+        return row is not None
+
+    def read(self):
+        rows = self.database.connection().execute(f'SELECT data FROM {self.table} ORDER BY id')
+        return [json.loads(data) for (data,) in rows]
+
+    def load(self):
+        with self.lock:
+            if self.data is None:
+                self.data = self.read()
+            return self.data
+
+    def write(self, connection, rows):
+        connection.execute(f'DELETE FROM {self.table}')
+        connection.executemany(
+            f'INSERT INTO {self.table} (owner, username, timestamp, data) VALUES (?, ?, ?, ?)', rows
+        )
+        connection.execute('INSERT OR IGNORE INTO stores VALUES (?)', (self.table,))
+
+    def save(self, data):
+        with self.lock:
+            connection = self.database.connection()
+            with connection:
+                self.write(connection, [record_row(item) for item in data])
+            self.data = data
+
+    def append(self, item):
+        with self.lock:
+            connection = self.database.connection()
+            with connection:
+                connection.execute(
+                    f'INSERT INTO {self.table} (owner, username, timestamp, data) VALUES (?, ?, ?, ?)',
+                    record_row(item)
+                )
+                connection.execute('INSERT OR IGNORE INTO stores VALUES (?)', (self.table,))
+            if self.data is not None:
+                self.data.append(item)
+
+    def update(self, fn):
+        """Change the records under the store lock, as JSONStore.update()"""
+        with self.lock:
+            data = copy.deepcopy(self.load())
+            result = fn(data)
+            if result:
+                self.save(data)
+            return result
+
+
+class SQLiteGroupedStore(SQLiteListStore):
+    """A dict of record lists (private messages by conversation owner)"""
+
+    def read(self):
+        grouped = {}
+        rows = self.database.connection().execute(f'SELECT owner, data FROM {self.table} ORDER BY id')
+        for owner, data in rows:
+            records = grouped.get(owner)
+            if records is None:
+                records = grouped[owner] = []
+            records.append(json.loads(data))
+        return grouped
+
+    def save(self, data):
+        with self.lock:
+            connection = self.database.connection()
+            with connection:
+                self.write(connection, [record_row(item, owner)
+                                        for owner, records in data.items() for item in records])
+            self.data = data
+
+    def append_to(self, pairs):
+        """Add each (owner, item) pair in one transaction"""
+        with self.lock:
+            connection = self.database.connection()
+            with connection:
+                connection.executemany(
+                    f'INSERT INTO {self.table} (owner, username, timestamp, data) VALUES (?, ?, ?, ?)',
+                    [record_row(item, owner) for owner, item in pairs]
+                )
+                connection.execute('INSERT OR IGNORE INTO stores VALUES (?)', (self.table,))
+            if self.data is not None:
+                for owner, item in pairs:
+                    self.data.setdefault(owner, []).append(item)
+
+
+databases = {}
+databases_lock = threading.Lock()
+
+
+def storage_database(path=None):
+    """The StorageDatabase for path (MCCB_SQLITE_PATH by default), shared by all stores"""
+    path = path or os.environ.get('MCCB_SQLITE_PATH', STORAGE_DB)
+    with databases_lock:
+        database = databases.get(path)
+        if database is None:
+            database = databases[path] = StorageDatabase(path)
+        return database
+
+
+def open_store(table, json_path, default=list):
+    """Store for one of the server's data files: the JSON file itself, or
+    its SQLite table when MCCB_STORAGE=sqlite"""
+    if os.environ.get('MCCB_STORAGE', 'json').lower() != 'sqlite':
+        return JSONStore(json_path, default)
+    if default is dict:
+        return SQLiteGroupedStore(storage_database(), table)
+    return SQLiteListStore(storage_database(), table)